@@ -1,7 +1,8 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
+from functools import lru_cache
 import os
 
 load_dotenv()
@@ -13,6 +14,106 @@ class Settings(BaseSettings):
     salt_price: int
     card_number: str  # Новое поле для номера карты
 
+    # База данных
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 500  # кэш prepared statements asyncpg на соединение
+
+    # Рассылка
+    broadcast_workers: int = 20
+    broadcast_rate: float = 25  # сообщений в секунду, чуть ниже глобального лимита Telegram
+    broadcast_chunk_size: int = 500
+    broadcast_progress_interval: float = 3.0
+
+    catalog_cache_ttl: float = 300
+
+    # Страница отзывов
+    reviews_page_size: int = 5
+    reviews_cache_pages: int = 100
+    reviews_cache_ttl: float = 600
+
+    pending_page_size: int = 5
+    questions_page_size: int = 5
+    admin_digest_window: float = 10.0  # окно, за которое уведомления админам сводятся в один дайджест
+
+    # "Мои заказы"
+    my_orders_limit: int = 5
+    my_orders_cache_size: int = 10_000
+    my_orders_cache_ttl: float = 600
+
+    # Хранилище FSM: postgres (общее для всех процессов) или memory
+    fsm_storage: str = "postgres"
+    fsm_cache_size: int = 10_000
+    fsm_cache_ttl: float = 1.0
+
+    # Режим запуска: polling или webhook (aiohttp)
+    run_mode: str = "polling"
+    webhook_base_url: str = ""  # https://example.com — пусто, чтобы не регистрировать вебхук
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str = ""
+    webhook_workers: int = 8
+    webhook_queue_size: int = 1000
+
+    # Логи: JSON в stdout через очередь; уровни и доля выборки — по имени логгера
+    log_level: str = "INFO"
+    log_format: str = "json"  # json или text
+    log_levels: Dict[str, str] = {"aiogram.event": "WARNING", "aiohttp.access": "WARNING"}
+    log_sample_rates: Dict[str, float] = {"app.broadcast.delivery": 0.01}
+
+    # Outbox: уведомления клиентам о статусе заказа
+    outbox_batch_size: int = 50
+    outbox_interval: float = 2.0
+    outbox_max_attempts: int = 8
+    outbox_backoff_base: float = 5.0
+
+    # Планировщик апдейтов: порядок внутри чата, общий лимит параллельности и бэклога
+    scheduler_enabled: bool = True
+    scheduler_max_concurrent: int = 100
+    scheduler_max_backlog: int = 1000
+    scheduler_max_per_chat: int = 20  # сверх этого апдейты одного чата отбрасываются
+
+    # Антифлуд: действие -> [токенов в секунду, размер бакета]; действие задаётся флагом throttle хендлера
+    throttle_enabled: bool = True
+    throttle_policies: Dict[str, Tuple[float, float]] = {
+        "catalog": (0.5, 5),
+        "cart": (2, 6),
+        "checkout": (0.2, 2),
+        "input": (3, 10),
+        "default": (2, 8),
+    }
+    throttle_max_users: int = 50_000
+    throttle_idle_ttl: float = 600
+
+    # Метрики: /metrics в формате Prometheus и команда /perf
+    metrics_enabled: bool = True
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9100  # отдельный сервер в обоих режимах; 0 — не поднимать
+
+    # Выгрузка заказов в Google Sheets
+    sheets_sync_enabled: bool = False
+    google_credentials_file: str = "credentials.json"  # ключ сервисного аккаунта
+    sheets_spreadsheet_key: str = ""
+    sheets_worksheet: str = "Заказы"
+    sheets_sync_interval: float = 30.0
+    sheets_sync_batch_size: int = 500
+    sheets_sync_timeout: float = 30.0  # на запрос к Google API и на всю запись пачки
+
+    # Партиции orders/order_items и архивация холодных данных
+    retention_enabled: bool = True
+    retention_interval: float = 6 * 3600
+    retention_batch_size: int = 5000
+    partitions_ahead_months: int = 3
+    archive_orders_after_days: int = 180  # отправленные и отклонённые заказы вместе с order_summaries
+    archive_questions_after_days: int = 90  # отвеченные и закрытые вопросы
+    archive_feedback_after_days: int = 90  # так и не подтверждённые отзывы
+    outbox_keep_days: int = 14  # отправленные и окончательно не доставленные сообщения outbox
+
     @field_validator("admin_ids", mode="before")
     @classmethod
     def split_admins(cls, v):
@@ -24,5 +125,6 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
 
+@lru_cache
 def load_config() -> Settings:
     return Settings()
\ No newline at end of file
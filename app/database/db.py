@@ -1,18 +1,103 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from app.database.models import Base
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import load_config
+from app.services.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.waited = 0  # выдачи, ждавшие дольше 1 мс (пул исчерпан)
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        if timed_out:
+            self.timeouts += 1
+            return
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        if wait > 0.001:
+            self.waited += 1
+
+
+pool_stats = PoolStats()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    # Замеряет, сколько запрос ждал свободное соединение
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> AsyncEngine:
+    # Единственный движок на процесс, создаётся при первом обращении
+    global _engine
+    if _engine is None:
+        config = load_config()
+        _engine = create_async_engine(
+            config.postgres_dsn,
+            poolclass=MeteredPool,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+            pool_recycle=config.db_pool_recycle,
+            pool_pre_ping=config.db_pool_pre_ping,
+            connect_args={"prepared_statement_cache_size": config.db_statement_cache_size},
+        )
+        if config.metrics_enabled:
+            instrument_engine(_engine.sync_engine)
+    return _engine
+
+
+def AsyncSessionLocal(**kwargs) -> AsyncSession:
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+    return _sessionmaker(**kwargs)
+
+
+def pool_snapshot() -> dict:
+    pool = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": load_config().db_max_overflow,
+        "checkouts": pool_stats.checkouts,
+        "waited": pool_stats.waited,
+        "timeouts": pool_stats.timeouts,
+        "wait_avg_ms": pool_stats.wait_total / pool_stats.checkouts * 1000 if pool_stats.checkouts else 0.0,
+        "wait_max_ms": pool_stats.wait_max * 1000,
+    }
 
-config = load_config()
-engine = create_async_engine(config.postgres_dsn, echo=True)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def init_db():
-    print("Tables in metadata:", Base.metadata.tables.keys())  # Дебаг
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("Database initialization completed.")
+    from app.database.migrations import migrate
+    await migrate()
+    logger.info("Database initialization completed")
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(init_db())
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(init_db())
@@ -0,0 +1,149 @@
+import copy
+import datetime
+from typing import Any, Callable, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import JSONB, Insert, insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database.models import FSMRecord
+from app.services.cache import LRUCache
+
+
+def _key_columns(key: StorageKey) -> dict:
+    return {
+        "bot_id": key.bot_id,
+        "chat_id": key.chat_id,
+        "user_id": key.user_id,
+        "thread_id": key.thread_id or 0,
+        "destiny": key.destiny,
+    }
+
+
+_CURRENT = (
+    "(CASE WHEN jsonb_typeof(fsm_states.data -> CAST(:field AS text)) = 'object' "
+    "THEN fsm_states.data -> CAST(:field AS text) ELSE '{}'::jsonb END)"
+)
+_NEW_VALUE = f"COALESCE(({_CURRENT} ->> CAST(:member AS text))::int, 0) + CAST(:delta AS integer)"
+
+_UPDATE_COUNTER_SQL = text(f"""
+    INSERT INTO fsm_states (bot_id, chat_id, user_id, thread_id, destiny, state, data, updated_at)
+    VALUES (
+        :bot_id, :chat_id, :user_id, :thread_id, :destiny, NULL,
+        CASE WHEN CAST(:delta AS integer) > 0
+            THEN jsonb_build_object(CAST(:field AS text), jsonb_build_object(CAST(:member AS text), CAST(:delta AS integer)))
+            ELSE '{{}}'::jsonb
+        END,
+        timezone('utc', now())
+    )
+    ON CONFLICT (bot_id, chat_id, user_id, thread_id, destiny) DO UPDATE SET
+        data = jsonb_set(
+            fsm_states.data,
+            ARRAY[CAST(:field AS text)],
+            CASE WHEN {_NEW_VALUE} > 0
+                THEN {_CURRENT} || jsonb_build_object(CAST(:member AS text), {_NEW_VALUE})
+                ELSE {_CURRENT} - CAST(:member AS text)
+            END
+        ),
+        updated_at = timezone('utc', now())
+    RETURNING state, data
+""")
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class PostgresStorage(BaseStorage):
+    # Состояния FSM в таблице fsm_states (JSONB), общие для всех процессов бота.
+    # Запись — всегда upsert одним запросом; чтение идёт через маленький LRU с коротким TTL,
+    # чтобы повторные get_state/get_data в рамках одного апдейта не ходили в базу.
+    # При нескольких процессах TTL стоит держать на уровне длительности одного апдейта.
+    def __init__(self, engine: AsyncEngine, cache_size: int = 10_000, cache_ttl: float = 1.0):
+        self.engine = engine
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl) if cache_ttl > 0 else None
+
+    async def _load(self, key: StorageKey) -> tuple[Optional[str], Dict[str, Any]]:
+        if self.cache is not None:
+            record = self.cache.get(key)
+            if record is not None:
+                return record
+        columns = _key_columns(key)
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(FSMRecord.state, FSMRecord.data).where(
+                    *[getattr(FSMRecord, name) == value for name, value in columns.items()]
+                )
+            )
+            row = result.first()
+        record = (row.state, row.data or {}) if row else (None, {})
+        self._remember(key, record)
+        return record
+
+    def _remember(self, key: StorageKey, record: tuple[Optional[str], Dict[str, Any]]):
+        if self.cache is not None:
+            self.cache.set(key, record)
+
+    async def _delete_if_empty(self, conn, key: StorageKey, row):
+        # Пустая запись равна отсутствующей: после state.clear() строку не храним,
+        # иначе таблица растёт на строку для каждого, кто когда-либо писал боту
+        if row.state is None and not row.data:
+            await conn.execute(
+                delete(FSMRecord).where(
+                    *[getattr(FSMRecord, name) == value for name, value in _key_columns(key).items()],
+                    FSMRecord.state.is_(None),
+                    FSMRecord.data == text("'{}'::jsonb"),
+                )
+            )
+
+    async def _upsert(self, key: StorageKey, values: dict, on_conflict: Callable[[Insert], dict]):
+        stmt = insert(FSMRecord).values(**_key_columns(key), **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_key_columns(key)),
+            set_={**on_conflict(stmt), "updated_at": datetime.datetime.utcnow()},
+        ).returning(FSMRecord.state, FSMRecord.data)
+        async with self.engine.begin() as conn:
+            row = (await conn.execute(stmt)).first()
+            await self._delete_if_empty(conn, key, row)
+        self._remember(key, (row.state, row.data or {}))
+        return row
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = _state_name(state)
+        await self._upsert(key, {"state": state, "data": {}}, lambda stmt: {"state": state})
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._upsert(key, {"data": data}, lambda stmt: {"data": stmt.excluded.data})
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(key)
+        return copy.deepcopy(data)
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Слияние на стороне Postgres (jsonb || jsonb) — без гонки get/set между процессами
+        row = await self._upsert(
+            key,
+            {"data": data},
+            lambda stmt: {"data": FSMRecord.data.op("||", return_type=JSONB)(stmt.excluded.data)},
+        )
+        return copy.deepcopy(row.data or {})
+
+    async def update_counter(self, key: StorageKey, field: str, member: str, delta: int) -> Dict[str, Any]:
+        # Атомарно меняет data[field][member] на delta (<= 0 — удаляет ключ) одним upsert-ом.
+        # Используется для корзины {product_id: quantity}: параллельные нажатия не теряются.
+        params = {**_key_columns(key), "field": field, "member": member, "delta": delta}
+        async with self.engine.begin() as conn:
+            row = (await conn.execute(_UPDATE_COUNTER_SQL, params)).first()
+            await self._delete_if_empty(conn, key, row)
+        self._remember(key, (row.state, row.data or {}))
+        return copy.deepcopy(row.data or {})
+
+    async def close(self) -> None:
+        if self.cache is not None:
+            self.cache.clear()
@@ -1,15 +1,12 @@
 from app.database.models import Order, Feedback
 from app.database.db import AsyncSessionLocal
-from sqlalchemy import select
-from app.database.models import Order, OrderItem
-
-async def save_order_to_db(order_data: dict):
-    order_data.pop("cart", None)
-
-    async with AsyncSessionLocal() as session:
-        order = Order(**order_data)
-        session.add(order)
-        await session.commit()
+from sqlalchemy import select, update, any_, bindparam, column, values, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.database.models import Order, OrderItem, OrderSummary, OutboxMessage, Product, UserQuestion
+from app.services.phone import normalize_phone
+from app.services import my_orders
+import datetime
+from typing import Optional
 
 async def save_feedback_to_db(feedback_data: dict):
     async with AsyncSessionLocal() as session:
@@ -31,22 +28,138 @@ async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
-async def save_order_to_db(data: dict):
+def products_by_ids_query(ids):
+    # Один запрос WHERE id = ANY($1) вместо session.get на каждый товар
+    return (
+        select(Product.id, Product.name, Product.price)
+        .where(Product.id == any_(bindparam("product_ids", list(ids), type_=ARRAY(Integer))))
+    )
+
+async def get_products_by_ids(ids) -> dict:
+    if not ids:
+        return {}
     async with AsyncSessionLocal() as session:
-        print("INPUT DATA:", data)
-        cart = data.get("cart", [])
-        order_data = {k: v for k, v in data.items() if k != "cart"}
-        print("ORDER DATA (без cart):", order_data)
-        order = Order(**order_data)
+        result = await session.execute(products_by_ids_query(ids))
+        return {row.id: row for row in result.all()}
+
+def render_items(rows) -> str:
+    # rows — пары (название, цена, количество)
+    text = "\n".join(f"• {name} – {price} грн × {quantity}" for name, price, quantity in rows)
+    return text or "Товары не указаны"
+
+def summary_from_order(order: Order, lines) -> OrderSummary:
+    return OrderSummary(
+        order_id=order.id,
+        user_id=order.user_id,
+        name=order.name,
+        phone=order.phone,
+        phone_normalized=normalize_phone(order.phone),
+        address=order.address,
+        payment=order.payment,
+        items_text=render_items((line.name, line.price, line.quantity) for line in lines),
+        item_count=sum(line.quantity for line in lines),
+        total=order.total,
+        status="pending",
+        created_at=order.created_at,
+    )
+
+async def update_order_summary(session, order_id: int, **values):
+    # Обновляет read model в текущей транзакции и возвращает свежую строку (или None)
+    result = await session.execute(
+        update(OrderSummary)
+        .where(OrderSummary.order_id == order_id)
+        .values(updated_at=datetime.datetime.utcnow(), **values)
+        .returning(OrderSummary)
+    )
+    return result.scalar_one_or_none()
+
+async def bulk_update_order_status(session, order_ids, status: str, **values) -> list[OrderSummary]:
+    # Один UPDATE ... WHERE order_id = ANY(:ids) AND status = 'pending' RETURNING для всей пачки;
+    # заказы, которые уже обработал другой админ, просто не вернутся
+    result = await session.execute(
+        update(OrderSummary)
+        .where(OrderSummary.order_id == any_(bindparam("order_ids", list(order_ids), type_=ARRAY(Integer))), OrderSummary.status == "pending")
+        .values(status=status, updated_at=datetime.datetime.utcnow(), **values)
+        .returning(OrderSummary)
+        .execution_options(synchronize_session=False)
+    )
+    summaries = result.scalars().all()
+    if summaries:
+        order_values = {"confirmed": True} if status == "confirmed" else {"rejection_reason": values.get("rejection_reason")}
+        await session.execute(
+            update(Order)
+            .where(Order.id == any_(bindparam("updated_ids", [s.order_id for s in summaries], type_=ARRAY(Integer))))
+            .values(**order_values)
+            .execution_options(synchronize_session=False)
+        )
+    return summaries
+
+async def bulk_set_ttn(session, pairs: dict[int, str]) -> list[OrderSummary]:
+    # pairs: order_id -> ТТН. Только подтверждённые заказы; одно UPDATE ... FROM (VALUES ...) на таблицу
+    rows = values(column("order_id", Integer), column("ttn", String), name="v").data(list(pairs.items()))
+    result = await session.execute(
+        update(OrderSummary)
+        .where(OrderSummary.order_id == rows.c.order_id, OrderSummary.status == "confirmed")
+        .values(status="shipped", ttn=rows.c.ttn, updated_at=datetime.datetime.utcnow())
+        .returning(OrderSummary)
+        .execution_options(synchronize_session=False)
+    )
+    summaries = result.scalars().all()
+    if summaries:
+        shipped = values(column("order_id", Integer), column("ttn", String), name="v").data(
+            [(s.order_id, s.ttn) for s in summaries]
+        )
+        await session.execute(
+            update(Order)
+            .where(Order.id == shipped.c.order_id)
+            .values(ttn=shipped.c.ttn)
+            .execution_options(synchronize_session=False)
+        )
+    return summaries
+
+async def close_question(session, question_id: int, admin_id: int, answer_text: Optional[str] = None) -> Optional[UserQuestion]:
+    # Отмечаем только открытый вопрос: два админа не ответят на один и тот же дважды
+    result = await session.execute(
+        update(UserQuestion)
+        .where(UserQuestion.id == question_id, UserQuestion.answered == False)
+        .values(
+            answered=True,
+            answer_text=answer_text,
+            answered_at=datetime.datetime.utcnow(),
+            answered_by=admin_id,
+        )
+        .returning(UserQuestion)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+def enqueue_message(session, chat_id: int, text: str, parse_mode: str = "HTML"):
+    # Сообщение уйдёт только если транзакция закоммитится; отправит его OutboxRelay
+    session.add(OutboxMessage(chat_id=chat_id, text=text, parse_mode=parse_mode))
+
+# Поля заказа из FSM-данных оформления; всё прочее в data (корзина, чужие ключи) в Order не идёт
+ORDER_FIELDS = ("user_id", "name", "phone", "address", "payment", "total")
+
+async def save_order_to_db(data: dict, lines: list) -> Order:
+    # lines — позиции корзины, уже разрешённые в имена и цены (см. app.services.cart)
+    async with AsyncSessionLocal() as session:
+        order = Order(**{field: data[field] for field in ORDER_FIELDS if field in data})
+        order.quantity = sum(line.quantity for line in lines)
+        order.created_at = datetime.datetime.utcnow()
         session.add(order)
         await session.flush()
-        for item in cart:
-            order_item = OrderItem(
+        session.add_all([
+            OrderItem(
                 order_id=order.id,
-                product_id=item["id"],
-                product_name=item["name"],
-                product_price=item["price"],
-                quantity=item.get("quantity", 1)
+                product_id=line.product_id,
+                product_name=line.name,
+                product_price=line.price,
+                quantity=line.quantity,
+                created_at=order.created_at,
             )
-            session.add(order_item)
-        await session.commit()
\ No newline at end of file
+            for line in lines
+        ])
+        session.add(summary_from_order(order, lines))
+        await session.commit()
+    my_orders.invalidate(order.user_id)
+    return order
@@ -0,0 +1,345 @@
+import asyncio
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import load_config
+from app.database.db import get_engine
+from app.database.models import Base, OrderSummary, OutboxMessage, SyncCursor
+from app.database.partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Любое число, общее для всех процессов бота: миграции применяет только один из них
+LOCK_KEY = 7_340_021
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: tuple[str, ...] = ()
+    run: Optional[Callable[[AsyncConnection], Awaitable[None]]] = None
+    analyze: tuple[str, ...] = ()
+
+
+async def _baseline(conn: AsyncConnection):
+    # Схема до появления миграций; на существующей базе ничего не меняет (checkfirst)
+    await conn.run_sync(Base.metadata.create_all)
+
+
+HOT_QUERY_INDEXES = (
+    # status.check_order_status: WHERE phone = ? ORDER BY id DESC LIMIT 1
+    "CREATE INDEX IF NOT EXISTS ix_orders_phone_id ON orders (phone, id DESC)",
+    # admin.get_pending_orders: только неподтверждённые и неотклонённые
+    "CREATE INDEX IF NOT EXISTS ix_orders_pending ON orders (id DESC) "
+    "WHERE confirmed = false AND rejection_reason IS NULL",
+    # selectinload(Order.items)
+    "CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id)",
+    # feedback.show_reviews и модерация
+    "CREATE INDEX IF NOT EXISTS ix_feedback_confirmed_created ON feedback (created_at DESC) WHERE confirmed = true",
+    "CREATE INDEX IF NOT EXISTS ix_feedback_unconfirmed ON feedback (id) WHERE confirmed = false",
+    # keyset-курсор рассылки: WHERE subscribed AND user_id > ? ORDER BY user_id
+    "CREATE INDEX IF NOT EXISTS ix_subscribers_active ON subscribers (user_id) WHERE subscribed = true",
+)
+
+async def _create_order_summaries(conn: AsyncConnection):
+    await conn.run_sync(OrderSummary.__table__.create, checkfirst=True)
+
+
+ORDER_SUMMARIES = (
+    "CREATE INDEX IF NOT EXISTS ix_order_summaries_phone ON order_summaries (phone, order_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_order_summaries_pending ON order_summaries (order_id DESC) "
+    "WHERE status = 'pending'",
+    # Заполнение read model для заказов, созданных до её появления
+    """
+    INSERT INTO order_summaries (
+        order_id, user_id, name, phone, address, payment, items_text, item_count,
+        total, status, ttn, rejection_reason, created_at, updated_at
+    )
+    SELECT o.id, o.user_id, o.name, o.phone, o.address, o.payment,
+           COALESCE(
+               string_agg('• ' || i.product_name || ' – ' || i.product_price || ' грн × ' || i.quantity,
+                          E'\\n' ORDER BY i.id),
+               'Товары не указаны'
+           ),
+           COALESCE(sum(i.quantity), 0),
+           o.total,
+           CASE
+               WHEN o.rejection_reason IS NOT NULL THEN 'rejected'
+               WHEN NOT COALESCE(o.confirmed, false) THEN 'pending'
+               WHEN o.ttn IS NULL THEN 'confirmed'
+               ELSE 'shipped'
+           END,
+           o.ttn, o.rejection_reason, o.created_at, timezone('utc', now())
+    FROM orders o
+    LEFT JOIN order_items i ON i.order_id = o.id
+    GROUP BY o.id
+    ON CONFLICT (order_id) DO NOTHING
+    """,
+)
+
+MY_ORDERS = (
+    "ALTER TABLE order_summaries ADD COLUMN IF NOT EXISTS phone_normalized varchar",
+    # То же, что app.services.phone.normalize_phone
+    r"""
+    UPDATE order_summaries SET phone_normalized = CASE
+        WHEN length(d) = 10 AND d LIKE '0%' THEN '38' || d
+        WHEN length(d) = 11 AND d LIKE '80%' THEN '3' || d
+        WHEN length(d) = 9 THEN '380' || d
+        ELSE d
+    END
+    FROM (SELECT order_id AS id, regexp_replace(coalesce(phone, ''), '\D', '', 'g') AS d FROM order_summaries) AS p
+    WHERE p.id = order_summaries.order_id AND order_summaries.phone_normalized IS NULL
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_order_summaries_user ON order_summaries (user_id, order_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_order_summaries_phone_normalized "
+    "ON order_summaries (phone_normalized, order_id DESC)",
+    "DROP INDEX IF EXISTS ix_order_summaries_phone",
+)
+
+PRODUCT_SKU = (
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS sku varchar",
+    # Товарам, заведённым до импорта, выдаём SKU по id — так их можно выгрузить и загрузить обратно
+    "UPDATE products SET sku = 'auto-' || id WHERE sku IS NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS products_sku_key ON products (sku)",
+)
+
+async def _create_sync_cursors(conn: AsyncConnection):
+    await conn.run_sync(SyncCursor.__table__.create, checkfirst=True)
+
+
+async def _create_outbox(conn: AsyncConnection):
+    await conn.run_sync(OutboxMessage.__table__.create, checkfirst=True)
+
+
+OUTBOX = (
+    # OutboxRelay: очередные к отправке и "голова" каждого чата
+    "CREATE INDEX IF NOT EXISTS ix_outbox_pending ON outbox_messages (next_attempt_at, id) WHERE status = 'pending'",
+    "CREATE INDEX IF NOT EXISTS ix_outbox_pending_chat ON outbox_messages (chat_id, id) WHERE status = 'pending'",
+)
+
+QUESTION_ANSWERS = (
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS answered boolean NOT NULL DEFAULT false",
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS answer_text text",
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS answered_at timestamp",
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS answered_by bigint",
+    # admin.send_questions: keyset по id только среди открытых вопросов
+    "CREATE INDEX IF NOT EXISTS ix_questions_unanswered ON questions (id DESC) WHERE answered = false",
+)
+
+ORDER_COLUMNS = (
+    "id, user_id, name, phone, address, salt_type, quantity, total, payment, "
+    "confirmed, ttn, rejection_reason, created_at"
+)
+ORDER_ITEM_COLUMNS = "id, order_id, product_id, product_name, product_price, quantity, created_at"
+
+# Ключ партиционирования входит в первичный ключ, поэтому PK — (id, created_at);
+# уникальность id по-прежнему обеспечивает последовательность
+PARTITIONED_ORDERS_DDL = (
+    """
+    CREATE TABLE orders (
+        id integer NOT NULL DEFAULT nextval('orders_id_seq'),
+        user_id bigint,
+        name varchar,
+        phone varchar,
+        address varchar,
+        salt_type varchar,
+        quantity integer,
+        total integer,
+        payment varchar,
+        confirmed boolean,
+        ttn varchar,
+        rejection_reason varchar,
+        created_at timestamp NOT NULL DEFAULT timezone('utc', now()),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    """
+    CREATE TABLE order_items (
+        id integer NOT NULL DEFAULT nextval('order_items_id_seq'),
+        order_id integer,
+        product_id integer,
+        product_name varchar,
+        product_price integer,
+        quantity integer,
+        created_at timestamp NOT NULL DEFAULT timezone('utc', now()),
+        PRIMARY KEY (id, created_at),
+        FOREIGN KEY (order_id, created_at) REFERENCES orders (id, created_at) ON DELETE CASCADE
+    ) PARTITION BY RANGE (created_at)
+    """,
+    # Страховка на случай, если партиция месяца не создана заранее
+    "CREATE TABLE orders_default PARTITION OF orders DEFAULT",
+    "CREATE TABLE order_items_default PARTITION OF order_items DEFAULT",
+    "CREATE INDEX ix_orders_phone_id ON orders (phone, id DESC)",
+    "CREATE INDEX ix_orders_pending ON orders (id DESC) WHERE confirmed = false AND rejection_reason IS NULL",
+    "CREATE INDEX ix_order_items_order_id ON order_items (order_id, created_at)",
+)
+
+PARTITION_ORDERS_PREPARE = (
+    "UPDATE orders SET created_at = timezone('utc', now()) WHERE created_at IS NULL",
+    "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS created_at timestamp",
+    "UPDATE order_items AS i SET created_at = o.created_at FROM orders AS o WHERE o.id = i.order_id",
+    "UPDATE order_items SET created_at = timezone('utc', now()) WHERE created_at IS NULL",
+    # Старые таблицы остаются до конца переноса; их имена ограничений и индексов освобождаем
+    "ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_order_id_fkey",
+    "ALTER TABLE orders RENAME TO orders_legacy",
+    "ALTER TABLE order_items RENAME TO order_items_legacy",
+    "ALTER TABLE orders_legacy RENAME CONSTRAINT orders_pkey TO orders_legacy_pkey",
+    "ALTER TABLE order_items_legacy RENAME CONSTRAINT order_items_pkey TO order_items_legacy_pkey",
+    "DROP INDEX IF EXISTS ix_orders_phone_id",
+    "DROP INDEX IF EXISTS ix_orders_pending",
+    "DROP INDEX IF EXISTS ix_order_items_order_id",
+    # Иначе последовательности удалятся вместе со старыми таблицами
+    "ALTER SEQUENCE orders_id_seq OWNED BY NONE",
+    "ALTER SEQUENCE order_items_id_seq OWNED BY NONE",
+)
+
+PARTITION_ORDERS_FINISH = (
+    f"INSERT INTO orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM orders_legacy",
+    f"INSERT INTO order_items ({ORDER_ITEM_COLUMNS}) SELECT {ORDER_ITEM_COLUMNS} FROM order_items_legacy",
+    "ALTER SEQUENCE orders_id_seq OWNED BY orders.id",
+    "ALTER SEQUENCE order_items_id_seq OWNED BY order_items.id",
+    "DROP TABLE order_items_legacy",
+    "DROP TABLE orders_legacy",
+)
+
+
+async def _partition_orders(conn: AsyncConnection):
+    # Перестраивает orders и order_items в таблицы с помесячными партициями и переносит данные
+    kind = await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('orders')"))
+    if kind == "p":
+        return
+    since = await conn.scalar(text("SELECT min(created_at) FROM orders")) or datetime.datetime.utcnow()
+    for statement in (*PARTITION_ORDERS_PREPARE, *PARTITIONED_ORDERS_DDL):
+        await conn.execute(text(statement))
+    await ensure_partitions(conn, since, months_ahead=load_config().partitions_ahead_months)
+    for statement in PARTITION_ORDERS_FINISH:
+        await conn.execute(text(statement))
+
+
+ARCHIVE_TABLES = (
+    # Холодные данные, которые выносит app.services.retention; столбцы — как у живых таблиц
+    "CREATE TABLE IF NOT EXISTS orders_archive (LIKE orders)",
+    "CREATE TABLE IF NOT EXISTS order_items_archive (LIKE order_items)",
+    "CREATE TABLE IF NOT EXISTS questions_archive (LIKE questions)",
+    "CREATE TABLE IF NOT EXISTS feedback_archive (LIKE feedback)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_archive_id ON orders_archive (id)",
+    "CREATE INDEX IF NOT EXISTS ix_order_items_archive_order_id ON order_items_archive (order_id)",
+    # Поиск открытых кандидатов на архивацию
+    "CREATE INDEX IF NOT EXISTS ix_questions_answered_at ON questions (answered_at) WHERE answered = true",
+    "CREATE INDEX IF NOT EXISTS ix_feedback_unconfirmed_created ON feedback (created_at) WHERE confirmed = false",
+)
+
+SHEETS_SYNC_UPDATES = (
+    # Отметка по времени изменения: выгрузка подхватывает и новые заказы, и смену статуса
+    "ALTER TABLE sync_cursors ADD COLUMN IF NOT EXISTS last_updated_at timestamp",
+    "CREATE INDEX IF NOT EXISTS ix_order_summaries_updated ON order_summaries (updated_at, order_id)",
+)
+
+OUTBOX_CLEANUP = (
+    # RetentionJob: обработанные сообщения по возрасту; очередь pending сюда не попадает
+    "CREATE INDEX IF NOT EXISTS ix_outbox_done_created ON outbox_messages (created_at) WHERE status <> 'pending'",
+)
+
+BROADCAST_LEASES = (
+    "ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS owner varchar",
+    "ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS lease_until timestamp",
+)
+
+SYNC_CURSOR_LEASES = (
+    "ALTER TABLE sync_cursors ADD COLUMN IF NOT EXISTS owner varchar",
+    "ALTER TABLE sync_cursors ADD COLUMN IF NOT EXISTS lease_until timestamp",
+)
+
+ORDER_SUMMARIES_ARCHIVE = (
+    # Read model архивируется вместе с заказом: иначе order_summaries с именами, телефонами
+    # и адресами росла бы без предела
+    "CREATE TABLE IF NOT EXISTS order_summaries_archive (LIKE order_summaries)",
+    "CREATE INDEX IF NOT EXISTS ix_order_summaries_archive_order_id ON order_summaries_archive (order_id)",
+)
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "baseline", run=_baseline),
+    Migration(
+        2,
+        "hot_query_indexes",
+        statements=HOT_QUERY_INDEXES,
+        analyze=("orders", "order_items", "feedback", "subscribers"),
+    ),
+    Migration(
+        3,
+        "order_summaries",
+        run=_create_order_summaries,
+        statements=ORDER_SUMMARIES,
+        analyze=("order_summaries",),
+    ),
+    Migration(4, "my_orders", statements=MY_ORDERS, analyze=("order_summaries",)),
+    Migration(5, "product_sku", statements=PRODUCT_SKU),
+    Migration(6, "sync_cursors", run=_create_sync_cursors),
+    Migration(7, "outbox", run=_create_outbox, statements=OUTBOX),
+    Migration(8, "question_answers", statements=QUESTION_ANSWERS, analyze=("questions",)),
+    Migration(9, "partition_orders", run=_partition_orders, analyze=("orders", "order_items")),
+    Migration(10, "archive_tables", statements=ARCHIVE_TABLES),
+    # Пустые записи FSM, накопленные до того, как хранилище стало их удалять
+    Migration(11, "purge_empty_fsm_states", statements=(
+        "DELETE FROM fsm_states WHERE state IS NULL AND data = '{}'::jsonb",
+    )),
+    Migration(12, "sheets_sync_updates", statements=SHEETS_SYNC_UPDATES, analyze=("order_summaries",)),
+    Migration(13, "outbox_cleanup", statements=OUTBOX_CLEANUP),
+    Migration(14, "broadcast_leases", statements=BROADCAST_LEASES),
+    Migration(15, "sync_cursor_leases", statements=SYNC_CURSOR_LEASES),
+    Migration(16, "order_summaries_archive", statements=ORDER_SUMMARIES_ARCHIVE),
+]
+
+
+async def _ensure_version_table(conn: AsyncConnection):
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version integer PRIMARY KEY,"
+        " name varchar NOT NULL,"
+        " applied_at timestamp NOT NULL DEFAULT timezone('utc', now()))"
+    ))
+
+
+async def applied_versions(conn: AsyncConnection) -> set[int]:
+    await _ensure_version_table(conn)
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return set(result.scalars().all())
+
+
+async def apply_migration(conn: AsyncConnection, migration: Migration):
+    if migration.run is not None:
+        await migration.run(conn)
+    for statement in migration.statements:
+        await conn.execute(text(statement))
+    for table in migration.analyze:
+        await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def migrate(engine: Optional[AsyncEngine] = None) -> list[int]:
+    # Каждая миграция — отдельная транзакция под advisory lock; повторный запуск безопасен
+    engine = engine or get_engine()
+    applied: list[int] = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+            if migration.version in await applied_versions(conn):
+                continue
+            await apply_migration(conn, migration)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": migration.version, "name": migration.name},
+            )
+        logger.info("Миграция %03d_%s применена", migration.version, migration.name)
+        applied.append(migration.version)
+    return applied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(migrate())
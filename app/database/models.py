@@ -1,10 +1,13 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, BigInteger, Boolean
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, declarative_base
 import datetime
 
 Base = declarative_base()
 
 class Order(Base):
+    # В базе таблица разбита на помесячные партиции по created_at (миграция partition_orders)
+    # с PK (id, created_at); для ORM идентичность — id, его выдаёт общая последовательность.
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True)
@@ -23,6 +26,27 @@ class Order(Base):
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete")
 
+class OrderSummary(Base):
+    # Read model заказа: готовый список товаров и текущий статус без join с order_items.
+    # Обновляется в той же транзакции, что и orders (save_order_to_db и действия админа).
+    __tablename__ = "order_summaries"
+
+    order_id = Column(Integer, primary_key=True)
+    user_id = Column(BigInteger)
+    name = Column(String)
+    phone = Column(String)
+    phone_normalized = Column(String)  # см. app.services.phone.normalize_phone
+    address = Column(String)
+    payment = Column(String)
+    items_text = Column(Text)
+    item_count = Column(Integer, default=0)
+    total = Column(Integer)
+    status = Column(String, default="pending")  # pending / confirmed / shipped / rejected
+    ttn = Column(String, nullable=True)
+    rejection_reason = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
@@ -32,6 +56,7 @@ class OrderItem(Base):
     product_name = Column(String)
     product_price = Column(Integer)
     quantity = Column(Integer)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)  # = orders.created_at, ключ партиции
 
     order = relationship("Order", back_populates="items")
 
@@ -46,6 +71,7 @@ class Subscriber(Base):
 class Product(Base):
     __tablename__ = "products"
     id = Column(Integer, primary_key=True)
+    sku = Column(String, unique=True)
     name = Column(String)
     price = Column(Integer)
     photo = Column(String)
@@ -58,6 +84,10 @@ class UserQuestion(Base):
     username = Column(String)
     question = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    answered = Column(Boolean, default=False, nullable=False)
+    answer_text = Column(Text)  # NULL у отвеченного вопроса — закрыт без ответа
+    answered_at = Column(DateTime)
+    answered_by = Column(BigInteger)
 
 class Feedback(Base):
     __tablename__ = "feedback"
@@ -67,4 +97,68 @@ class Feedback(Base):
     name = Column(String, nullable=True)
     feedback = Column(Text, nullable=False)
     confirmed = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    status = Column(String, default="running")  # running / done
+    admin_chat_id = Column(BigInteger, nullable=True)
+    progress_message_id = Column(BigInteger, nullable=True)
+    last_user_id = Column(BigInteger, default=0)  # чекпоинт: все подписчики с user_id <= уже взяты в работу
+    owner = Column(String, nullable=True)  # процесс, который ведёт рассылку (RUNNER_ID)
+    lease_until = Column(DateTime, nullable=True)  # после этого рассылку может забрать другой процесс
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    blocked = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class BroadcastDelivery(Base):
+    __tablename__ = "broadcast_deliveries"
+
+    job_id = Column(Integer, ForeignKey("broadcast_jobs.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    status = Column(String, default="sending")  # sending / sent / failed / blocked / unknown
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class FSMRecord(Base):
+    __tablename__ = "fsm_states"
+
+    bot_id = Column(BigInteger, primary_key=True)
+    chat_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    thread_id = Column(BigInteger, primary_key=True, default=0)
+    destiny = Column(String, primary_key=True, default="default")
+    state = Column(String, nullable=True)
+    data = Column(JSONB, nullable=False, default=dict)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class SyncCursor(Base):
+    __tablename__ = "sync_cursors"
+
+    # Высшая отметка внешней выгрузки: всё до (last_updated_at, last_id) включительно уже передано
+    name = Column(String, primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    last_updated_at = Column(DateTime, nullable=True)
+    owner = Column(String, nullable=True)  # проход, который сейчас выгружает
+    lease_until = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class OutboxMessage(Base):
+    # Сообщения клиентам, записанные в одной транзакции с изменением заказа; отправляет OutboxRelay
+    __tablename__ = "outbox_messages"
+
+    id = Column(BigInteger, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=False)
+    parse_mode = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # pending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
\ No newline at end of file
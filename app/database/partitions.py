@@ -0,0 +1,106 @@
+import datetime
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Месячные партиции по created_at. У order_items created_at — это created_at заказа,
+# поэтому позиции всегда лежат в партиции того же месяца, что и заказ.
+# Порядок важен: orders — родитель внешнего ключа order_items.
+PARTITIONED_TABLES = ("orders", "order_items")
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(moment: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime.datetime, months: int) -> datetime.datetime:
+    year, index = divmod(month.month - 1 + months, 12)
+    return datetime.datetime(month.year + year, index + 1, 1)
+
+
+def partition_name(table: str, month: datetime.datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _bounds(month: datetime.datetime) -> str:
+    return f"FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+async def partition_months(conn: AsyncConnection, table: str) -> list[datetime.datetime]:
+    # Месяцы существующих партиций таблицы (default-партиция не считается)
+    result = await conn.execute(text("""
+        SELECT c.relname FROM pg_inherits AS i
+        JOIN pg_class AS c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+    """), {"table": table})
+    months = []
+    for name in result.scalars():
+        match = _PARTITION_NAME.search(name)
+        if match:
+            months.append(datetime.datetime(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def _create_month(conn: AsyncConnection, month: datetime.datetime):
+    params = {"lo": month, "hi": add_months(month, 1)}
+    stray = await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM orders_default WHERE created_at >= :lo AND created_at < :hi)"
+    ), params)
+    if not stray:
+        for table in PARTITIONED_TABLES:
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} FOR VALUES {_bounds(month)}"
+            ))
+        return
+
+    # Строки этого месяца уже попали в default-партицию (обслуживание долго не запускалось).
+    # Партицию нельзя создать поверх них: переносим строки в отдельную таблицу и подключаем её.
+    for table in PARTITIONED_TABLES:
+        await conn.execute(text(f"CREATE TABLE {partition_name(table, month)} (LIKE {table} INCLUDING DEFAULTS)"))
+    for table in reversed(PARTITIONED_TABLES):
+        await conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {table}_default WHERE created_at >= :lo AND created_at < :hi RETURNING *
+            )
+            INSERT INTO {partition_name(table, month)} SELECT * FROM moved
+        """), params)
+    for table in PARTITIONED_TABLES:
+        await conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, month)} FOR VALUES {_bounds(month)}"
+        ))
+
+
+async def ensure_partitions(conn: AsyncConnection, since: datetime.datetime, months_ahead: int) -> list[str]:
+    # Партиции от месяца since до текущего + months_ahead; уже существующие пропускаются
+    existing = set(await partition_months(conn, "orders"))
+    created = []
+    month = month_start(since)
+    last = add_months(month_start(datetime.datetime.utcnow()), months_ahead)
+    while month <= last:
+        if month not in existing:
+            await _create_month(conn, month)
+            created.extend(partition_name(table, month) for table in PARTITIONED_TABLES)
+        month = add_months(month, 1)
+    return created
+
+
+async def drop_empty_partitions(conn: AsyncConnection, before: datetime.datetime) -> list[str]:
+    # Старые месяцы, из которых архивация вынесла все строки; новых строк в них уже не будет
+    dropped = []
+    for month in await partition_months(conn, "orders"):
+        if add_months(month, 1) > before:
+            break
+        names = [partition_name(table, month) for table in PARTITIONED_TABLES]
+        empty = await conn.scalar(text(
+            "SELECT " + " AND ".join(f"NOT EXISTS (SELECT 1 FROM {name})" for name in names)
+        ))
+        if empty:
+            # Сначала отсоединяем: внешний ключ order_items ссылается на партиции orders
+            for table, name in reversed(list(zip(PARTITIONED_TABLES, names))):
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            await conn.execute(text("DROP TABLE " + ", ".join(reversed(names))))
+            dropped.extend(names)
+    return dropped
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from aiogram import Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.config import load_config
+from app.database.db import get_engine
+from app.database.fsm_storage import PostgresStorage
+from app.handlers import main_menu, order, feedback, broadcast, admin, status, user
+from app.middlewares.handler_name import setup_handler_name
+from app.middlewares.log_context import setup_log_context
+from app.middlewares.metrics import setup_metrics
+from app.middlewares.scheduler import setup_scheduler
+from app.middlewares.throttling import ThrottlingMiddleware, setup_throttling
+
+
+def create_storage() -> BaseStorage:
+    config = load_config()
+    if config.fsm_storage == "memory":
+        return MemoryStorage()
+    return PostgresStorage(get_engine(), cache_size=config.fsm_cache_size, cache_ttl=config.fsm_cache_ttl)
+
+
+def create_dispatcher(storage: Optional[BaseStorage] = None) -> Dispatcher:
+    # Роутеры — модульные синглтоны, поэтому диспетчер в процессе может быть только один
+    config = load_config()
+    dp = Dispatcher(storage=storage or create_storage())
+    # Планировщик встаёт перед встроенными middleware диспетчера: всё остальное, включая чтение
+    # состояния FSM, выполняется уже внутри очереди чата
+    if config.scheduler_enabled:
+        setup_scheduler(
+            dp, config.scheduler_max_concurrent, config.scheduler_max_backlog, config.scheduler_max_per_chat,
+        )
+    for router in [main_menu.router, order.router, user.router, feedback.router, broadcast.router, admin.router, status.router]:
+        dp.include_router(router)
+    setup_log_context(dp)
+    if config.metrics_enabled:
+        setup_metrics(dp)
+    setup_handler_name(dp)
+    if config.throttle_enabled:
+        setup_throttling(dp, ThrottlingMiddleware(
+            config.throttle_policies,
+            exempt_ids=config.admin_ids,
+            maxsize=config.throttle_max_users,
+            idle_ttl=config.throttle_idle_ttl,
+        ))
+    return dp
@@ -1,22 +1,40 @@
 from aiogram import Router, F
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from aiogram.filters import Command
+from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, BufferedInputFile
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy import select, delete
-from sqlalchemy.orm import selectinload
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy import select, delete, func, update
 from sqlalchemy.exc import OperationalError
-from app.database.db import AsyncSessionLocal
-from app.database.models import Order, Subscriber, Product, UserQuestion, Feedback
+from app.database.db import AsyncSessionLocal, pool_snapshot
+from app.middlewares.scheduler import UpdateScheduler
+from app.services.metrics import handler_summary, scheduler_wait
+from app.database.models import Order, OrderSummary, Product, UserQuestion, Feedback
+from app.database.functions import (
+    bulk_set_ttn, bulk_update_order_status, close_question, enqueue_message, update_order_summary,
+)
 from app.keyboards.main import get_main_menu
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_io import CatalogImportError, parse_products, import_products, export_products
+from app.services.my_orders import invalidate as invalidate_my_orders
+from app.services.reviews import reviews_cache
+from app.services.outbox import outbox_relay
+from app.services.broadcaster import Broadcaster, create_job, render_progress, start_broadcast as launch_broadcast
 from app.config import load_config
 from dotenv import load_dotenv
-import os, re
+import html, logging, os, re, time
+from dataclasses import replace
+from typing import Optional
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 router = Router()
 config = load_config()
 
+IMPORT_MAX_BYTES = 5 * 1024 * 1024
+BULK_TTN_MAX_LINES = 200
+BULK_TTN_LINE = re.compile(r"#?(\d+)[\s,;:]+(\d{10,14})")
+
 def is_admin(user_id: int) -> bool:
     return user_id in config.admin_ids
 
@@ -25,6 +43,9 @@ class AddProduct(StatesGroup):
     price = State()
     photo = State()
 
+class ImportProducts(StatesGroup):
+    waiting_for_file = State()
+
 class DeleteProduct(StatesGroup):
     choosing = State()
 
@@ -35,10 +56,19 @@ class Broadcast(StatesGroup):
 class OrderAction(StatesGroup):
     rejection_reason = State()
     ttn_input = State()
+    bulk_rejection_reason = State()
+    bulk_ttn_input = State()
 
 class AnswerUser(StatesGroup):
     answering = State()
 
+ADMIN_STATUS_LABELS = {
+    "pending": lambda summary: "⏳ Ожидает подтверждения",
+    "confirmed": lambda summary: "✅ Подтверждён",
+    "shipped": lambda summary: f"🚚 Отправлен, ТТН {summary.ttn}",
+    "rejected": lambda summary: f"❌ Отклонён: {summary.rejection_reason}",
+}
+
 @router.message(Command("orders"))
 async def get_orders(message: Message):
     if not is_admin(message.from_user.id):
@@ -48,84 +78,373 @@ async def get_orders(message: Message):
     try:
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(Order)
-                .options(selectinload(Order.items))
-                .order_by(Order.id.desc())
-                .limit(5)
+                select(OrderSummary).order_by(OrderSummary.order_id.desc()).limit(5)
             )
-            orders = result.scalars().all()
-            print(f"Found {len(orders)} orders for admin {message.from_user.id}")
+            summaries = result.scalars().all()
+        logger.debug("Found %d orders for admin", len(summaries))
 
-            if not orders:
-                await message.answer("❗ Заказов пока нет.")
-                return
+        if not summaries:
+            await message.answer("❗ Заказов пока нет.")
+            return
 
-            for order in orders:
-                cart_text = "Товары не указаны" if not order.items else "\n".join(
-                    [f"• {item.product_name} – {item.product_price} грн × {item.quantity}" for item in order.items]
-                )
-                status = "✅ Подтверждён" if order.confirmed else "⏳ Ожидает подтверждения"
-                if order.rejection_reason:
-                    status = f"❌ Отклонён: {order.rejection_reason}"
-                text = (
-                    f"🧾 <b>Заказ #{order.id}</b>\n"
-                    f"{cart_text}\n\n"
-                    f"👤 {order.name}\n"
-                    f"📞 {order.phone}\n"
-                    f"🚚 {order.address}\n"
-                    f"💳 {order.payment}\n"
-                    f"💰 {order.total} грн\n"
-                    f"📦 Статус: {status}\n"
-                    f"🕒 {order.created_at}"
-                )
-                await message.answer(text, parse_mode="HTML")
+        for summary in summaries:
+            text = (
+                f"🧾 <b>Заказ #{summary.order_id}</b>\n"
+                f"{summary.items_text}\n\n"
+                f"👤 {summary.name}\n"
+                f"📞 {summary.phone}\n"
+                f"🚚 {summary.address}\n"
+                f"💳 {summary.payment}\n"
+                f"💰 {summary.total} грн\n"
+                f"📦 Статус: {ADMIN_STATUS_LABELS[summary.status](summary)}\n"
+                f"🕒 {summary.created_at}"
+            )
+            await message.answer(text, parse_mode="HTML")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in get_orders: {e}")
+        logger.error("DB error in get_orders: %s", e)
 
 @router.message(Command("pending_orders"))
-async def get_pending_orders(message: Message):
+async def get_pending_orders(message: Message, state: FSMContext):
     if not is_admin(message.from_user.id):
         await message.answer("❌ Вы не админ.")
         return
+    await set_pending_selection(state, None)
+    await send_pending_orders(message)
+
+@router.callback_query(F.data.startswith("admin_open:"))
+async def open_from_digest(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
 
+    if callback.data == "admin_open:orders":
+        await send_pending_orders(callback.message)
+    else:
+        await send_questions(callback.message)
+    await callback.answer()
+
+def pending_order_block(summary: OrderSummary, max_items: int = 3) -> str:
+    items = summary.items_text.split("\n")
+    if len(items) > max_items:
+        items = items[:max_items] + [f"… ещё {len(items) - max_items}"]
+    return (
+        f"🧾 <b>#{summary.order_id}</b> · {summary.name} · {summary.phone}\n"
+        + "\n".join(f"  {item}" for item in items) + "\n"
+        f"  🚚 {summary.address}\n"
+        f"  💰 {summary.total} грн · {summary.payment} · 🕒 {summary.created_at.strftime('%d.%m %H:%M')}"
+    )
+
+async def send_pending_orders(
+    message: Message,
+    direction: str = "next",
+    cursor: int = 0,
+    edit: bool = False,
+    selected: Optional[set[int]] = None,
+):
+    # Инбокс: одно сообщение на страницу, keyset по order_id (новые сверху) по read model.
+    # На страницу — count(*) и выборка страницы по частичному индексу, независимо от размера очереди.
+    # selected не None — режим выбора: кнопки заказов отмечают их, действие применяется ко всем сразу.
+    page_size = config.pending_page_size
+    pending = OrderSummary.status == "pending"
     try:
         async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Order)
-                .options(selectinload(Order.items))
-                .where(Order.confirmed == False, Order.rejection_reason == None)
-                .order_by(Order.id.desc())
-            )
+            total = await session.scalar(select(func.count()).select_from(OrderSummary).where(pending))
+            query = select(OrderSummary).where(pending)
+            if direction == "prev":
+                query = query.where(OrderSummary.order_id > cursor).order_by(OrderSummary.order_id.asc())
+            else:
+                if cursor:
+                    query = query.where(OrderSummary.order_id < cursor)
+                query = query.order_by(OrderSummary.order_id.desc())
+            result = await session.execute(query.limit(page_size + 1))
             orders = result.scalars().all()
-            print(f"Found {len(orders)} pending orders for admin {message.from_user.id}")
 
-        if not orders:
-            await message.answer("❗ Нет неподтверждённых заказов.")
-            return
+        has_more = len(orders) > page_size
+        orders = orders[:page_size]
+        if direction == "prev":
+            orders = orders[::-1]
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = bool(cursor), has_more
 
-        for order in orders:
-            cart_text = "Товары не указаны" if not order.items else "\n".join(
-                [f"• {item.product_name} – {item.product_price} грн × {item.quantity}" for item in order.items]
-            )
-            text = (
-                f"🧾 <b>Заказ #{order.id}</b>\n"
-                f"{cart_text}\n\n"
-                f"👤 {order.name}\n"
-                f"📞 {order.phone}\n"
-                f"🚚 {order.address}\n"
-                f"💳 {order.payment}\n"
-                f"💰 {order.total} грн\n"
-                f"🕒 {order.created_at}"
+        if not orders:
+            text = "❗ Нет неподтверждённых заказов."
+            keyboard = None
+        else:
+            text = f"📥 <b>Ожидают подтверждения: {total}</b>\n\n" + "\n\n".join(
+                pending_order_block(order) for order in orders
             )
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="✅ Подтвердить", callback_data=f"confirm_order_{order.id}")],
-                [InlineKeyboardButton(text="❌ Отклонить", callback_data=f"reject_order_{order.id}")]
-            ])
+            # Курсор, с которого снова откроется эта же страница (после отметки или смены режима)
+            anchor = orders[0].order_id + 1
+            if selected is None:
+                rows = [
+                    [
+                        InlineKeyboardButton(text=f"✅ #{order.order_id}", callback_data=f"confirm_order_{order.order_id}"),
+                        InlineKeyboardButton(text=f"❌ #{order.order_id}", callback_data=f"reject_order_{order.order_id}"),
+                    ]
+                    for order in orders
+                ]
+                rows.append([InlineKeyboardButton(text="☑️ Выбрать несколько", callback_data=f"pending_mode:on:{anchor}")])
+            else:
+                rows = [
+                    [InlineKeyboardButton(
+                        text=f"{'☑️' if order.order_id in selected else '⬜'} #{order.order_id} · {order.total} грн",
+                        callback_data=f"pending_sel:{order.order_id}:{anchor}",
+                    )]
+                    for order in orders
+                ]
+                rows.append([
+                    InlineKeyboardButton(text=f"✅ Подтвердить ({len(selected)})", callback_data=f"pending_bulk:confirm:{anchor}"),
+                    InlineKeyboardButton(text=f"❌ Отклонить ({len(selected)})", callback_data=f"pending_bulk:reject:{anchor}"),
+                ])
+                rows.append([InlineKeyboardButton(text="✖️ Выйти из выбора", callback_data=f"pending_mode:off:{anchor}")])
+            nav = []
+            if has_prev:
+                nav.append(InlineKeyboardButton(text="◀️ Новее", callback_data=f"pending_page:prev:{orders[0].order_id}"))
+            nav.append(InlineKeyboardButton(text="🔄", callback_data="pending_page:next:0"))
+            if has_next:
+                nav.append(InlineKeyboardButton(text="Старше ▶️", callback_data=f"pending_page:next:{orders[-1].order_id}"))
+            rows.append(nav)
+            keyboard = InlineKeyboardMarkup(inline_keyboard=rows)
+
+        if edit:
+            await message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        else:
             await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in get_pending_orders: {e}")
+        logger.error("DB error in get_pending_orders: %s", e)
+
+# Отметки мультивыбора живут под отдельным destiny FSM: state.clear() других сценариев их не
+# трогает, а в данные оформления заказа (save_order_to_db) они не попадают
+PENDING_SELECTION_DESTINY = "pending_selection"
+
+def selection_context(state: FSMContext) -> FSMContext:
+    return FSMContext(storage=state.storage, key=replace(state.key, destiny=PENDING_SELECTION_DESTINY))
+
+async def pending_selection(state: FSMContext) -> Optional[set[int]]:
+    selected = (await selection_context(state).get_data()).get("selected")
+    return None if selected is None else set(selected)
+
+async def set_pending_selection(state: FSMContext, selected: Optional[set[int]]):
+    # None — режим выбора выключен; пустые данные хранилище удаляет целиком
+    await selection_context(state).set_data({} if selected is None else {"selected": sorted(selected)})
+
+async def redraw_pending_orders(callback: CallbackQuery, direction: str, cursor: int, selected: Optional[set[int]]):
+    try:
+        await send_pending_orders(callback.message, direction, cursor, edit=True, selected=selected)
+    except TelegramBadRequest:
+        # Обновление без изменений: "message is not modified"
+        pass
+
+@router.callback_query(F.data.startswith("pending_page:"))
+async def flip_pending_orders(callback: CallbackQuery, state: FSMContext):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
+
+    _, direction, cursor = callback.data.split(":")
+    await redraw_pending_orders(callback, direction, int(cursor), await pending_selection(state))
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("pending_mode:"))
+async def toggle_pending_select_mode(callback: CallbackQuery, state: FSMContext):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
+
+    _, mode, anchor = callback.data.split(":")
+    selected = set() if mode == "on" else None
+    await set_pending_selection(state, selected)
+    await redraw_pending_orders(callback, "next", int(anchor), selected)
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("pending_sel:"))
+async def toggle_pending_order(callback: CallbackQuery, state: FSMContext):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
+
+    _, order_id, anchor = callback.data.split(":")
+    selected = await pending_selection(state) or set()
+    selected ^= {int(order_id)}
+    # Отметки живут в FSM админа, поэтому переживают листание страниц
+    await set_pending_selection(state, selected)
+    await redraw_pending_orders(callback, "next", int(anchor), selected)
+    await callback.answer()
+
+async def apply_bulk_status(order_ids: list[int], status: str, **values) -> tuple[list[OrderSummary], list[int]]:
+    # Одна транзакция на пачку: UPDATE ... RETURNING и уведомления в outbox коммитятся вместе
+    render = confirmed_text if status == "confirmed" else rejected_text
+    async with AsyncSessionLocal() as session:
+        summaries = await bulk_update_order_status(session, order_ids, status, **values)
+        for summary in summaries:
+            enqueue_message(session, summary.user_id, render(summary))
+        await session.commit()
+    for summary in summaries:
+        invalidate_my_orders(summary.user_id)
+    # Релей шлёт по одному сообщению на чат параллельно, так что вся пачка уходит разом
+    outbox_relay.wake()
+    updated = {summary.order_id for summary in summaries}
+    return summaries, [order_id for order_id in order_ids if order_id not in updated]
+
+def bulk_report(title: str, summaries: list[OrderSummary], skipped: list[int]) -> str:
+    text = f"{title}: {len(summaries)}"
+    if summaries:
+        text += "\n" + ", ".join(f"#{summary.order_id}" for summary in summaries)
+    if skipped:
+        text += "\n⚠️ Уже обработаны или не найдены: " + ", ".join(f"#{order_id}" for order_id in skipped)
+    return text
+
+@router.callback_query(F.data.startswith("pending_bulk:"))
+async def bulk_pending_action(callback: CallbackQuery, state: FSMContext):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
+
+    _, action, anchor = callback.data.split(":")
+    selected = await pending_selection(state)
+    if not selected:
+        await callback.answer("❗ Отметьте хотя бы один заказ.", show_alert=True)
+        return
+    order_ids = sorted(selected)
+
+    if action == "reject":
+        await state.set_state(OrderAction.bulk_rejection_reason)
+        await callback.message.answer(
+            f"❌ Укажите причину отклонения для {len(order_ids)} заказов "
+            f"({', '.join(f'#{order_id}' for order_id in order_ids)}):"
+        )
+        await callback.answer()
+        return
+
+    try:
+        summaries, skipped = await apply_bulk_status(order_ids, "confirmed")
+    except OperationalError as e:
+        await callback.message.answer("❌ Ошибка базы данных.")
+        logger.error("DB error in bulk_pending_action: %s", e)
+        await callback.answer()
+        return
+    logger.info("Orders confirmed in bulk", extra={"order_ids": [s.order_id for s in summaries]})
+
+    await set_pending_selection(state, set())
+    await redraw_pending_orders(callback, "next", int(anchor), set())
+    await callback.message.answer(
+        bulk_report("✅ Подтверждено", summaries, skipped)
+        + ("\n\n🚚 ТТН можно добавить пачкой: /bulk_ttn" if summaries else "")
+    )
+    await callback.answer()
+
+@router.message(OrderAction.bulk_rejection_reason)
+async def set_bulk_rejection_reason(message: Message, state: FSMContext):
+    reason = (message.text or "").strip()
+    if len(reason) < 5:
+        await message.answer("❗ Укажите корректную причину (минимум 5 символов).")
+        return
+
+    order_ids = sorted(await pending_selection(state) or ())
+    try:
+        summaries, skipped = await apply_bulk_status(order_ids, "rejected", rejection_reason=reason)
+    except OperationalError as e:
+        await message.answer("❌ Ошибка базы данных.")
+        logger.error("DB error in set_bulk_rejection_reason: %s", e)
+        await state.clear()
+        return
+    logger.info("Orders rejected in bulk", extra={"order_ids": [s.order_id for s in summaries]})
+    await message.answer(bulk_report(f"✅ Отклонено с причиной «{reason}»", summaries, skipped))
+    await set_pending_selection(state, None)
+    await state.clear()
+
+@router.message(Command("bulk_ttn"))
+async def start_bulk_ttn(message: Message, state: FSMContext):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Вы не админ.")
+        return
+
+    await state.set_state(OrderAction.bulk_ttn_input)
+    await message.answer(
+        f"🚚 Отправьте строки вида <code>номер_заказа ТТН</code>, по одной на заказ (до {BULK_TTN_MAX_LINES}):\n"
+        "<code>1024 20450123456789\n1025 20450123456790</code>",
+        parse_mode="HTML",
+    )
+
+@router.message(OrderAction.bulk_ttn_input)
+async def set_bulk_ttn(message: Message, state: FSMContext):
+    lines = [line.strip() for line in (message.text or "").splitlines() if line.strip()]
+    pairs: dict[int, str] = {}
+    invalid = []
+    for line in lines:
+        match = BULK_TTN_LINE.fullmatch(line)
+        if match:
+            pairs[int(match.group(1))] = match.group(2)
+        else:
+            invalid.append(line)
+    if invalid or not pairs:
+        await message.answer(
+            "❗ Не разобраны строки (нужно: номер заказа и ТТН из 10-14 цифр):\n"
+            + "\n".join(invalid[:10] or ["—"])
+        )
+        return
+    if len(pairs) > BULK_TTN_MAX_LINES:
+        await message.answer(f"❗ Не больше {BULK_TTN_MAX_LINES} заказов за раз.")
+        return
+
+    try:
+        async with AsyncSessionLocal() as session:
+            summaries = await bulk_set_ttn(session, pairs)
+            for summary in summaries:
+                enqueue_message(session, summary.user_id, shipped_text(summary))
+            await session.commit()
+    except OperationalError as e:
+        await message.answer("❌ Ошибка базы данных.")
+        logger.error("DB error in set_bulk_ttn: %s", e)
+        await state.clear()
+        return
+    for summary in summaries:
+        invalidate_my_orders(summary.user_id)
+    outbox_relay.wake()
+    logger.info("TTN set in bulk", extra={"order_ids": [s.order_id for s in summaries]})
+
+    updated = {summary.order_id for summary in summaries}
+    skipped = [order_id for order_id in pairs if order_id not in updated]
+    text = bulk_report("🚚 Отправлено", summaries, [])
+    if skipped:
+        text += "\n⚠️ Не подтверждены или не найдены: " + ", ".join(f"#{order_id}" for order_id in skipped)
+    await message.answer(text)
+    await state.clear()
+
+def confirmed_text(summary: OrderSummary) -> str:
+    text = (
+        f"✅ Ваш заказ #{summary.order_id} подтверждён!\n\n"
+        f"{summary.items_text}\n\n"
+        f"💰 Сумма: {summary.total} грн\n"
+        f"📞 Телефон: {summary.phone}\n"
+        f"🚚 Адрес: {summary.address}\n"
+        f"💳 Оплата: {summary.payment}"
+    )
+    if summary.payment == "💳 Предоплата на карту":
+        text += f"\n\n💳 Пожалуйста, переведите {summary.total} грн на карту: <b>{config.card_number}</b>"
+    elif summary.payment == "📦 Наложенный платёж":
+        text += "\n\n📦 Оплата при получении. Подготовьте сумму на месте."
+    return text
+
+def shipped_text(summary: OrderSummary) -> str:
+    return (
+        f"🚚 Ваш заказ #{summary.order_id} отправлен!\n"
+        f"📦 ТТН: <b>{summary.ttn}</b>\n"
+        f"Проверьте статус доставки на сайте Новой Почты."
+    )
+
+def rejected_text(summary: OrderSummary) -> str:
+    return (
+        f"❌ Ваш заказ #{summary.order_id} отклонён.\n\n"
+        f"Причина: {summary.rejection_reason}\n\n"
+        f"{summary.items_text}\n"
+        f"💰 Сумма: {summary.total} грн\n"
+        f"📞 Телефон: {summary.phone}\n"
+        f"🚚 Адрес: {summary.address}"
+    )
 
 @router.callback_query(F.data.startswith("confirm_order_"))
 async def confirm_order(callback: CallbackQuery, state: FSMContext):
@@ -135,43 +454,27 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
 
     order_id = int(callback.data.split("_")[-1])
     try:
-        print(f"Processing confirm for order {order_id} by admin {callback.from_user.id}")
+        logger.debug("Processing confirm for order %s", order_id)
         async with AsyncSessionLocal() as session:
-            order = await session.get(Order, order_id, options=[selectinload(Order.items)])
-            if not order:
-                await callback.message.edit_text("❗ Заказ не найден.")
-                await callback.answer()
-                return
-
-            order.confirmed = True
-            await session.commit()
-            print(f"Order {order_id} confirmed")
-
-            # Уведомление пользователю внутри сессии
-            cart_text = "Товары не указаны" if not order.items else "\n".join(
-                [f"• {item.product_name} – {item.product_price} грн × {item.quantity}" for item in order.items]
-            )
-            user_text = (
-                f"✅ Ваш заказ #{order.id} подтверждён!\n\n"
-                f"{cart_text}\n\n"
-                f"💰 Сумма: {order.total} грн\n"
-                f"📞 Телефон: {order.phone}\n"
-                f"🚚 Адрес: {order.address}\n"
-                f"💳 Оплата: {order.payment}"
-            )
-            if order.payment == "💳 Предоплата на карту":
-                user_text += f"\n\n💳 Пожалуйста, переведите {order.total} грн на карту: <b>{config.card_number}</b>"
-            elif order.payment == "📦 Наложенный платёж":
-                user_text += "\n\n📦 Оплата при получении. Подготовьте сумму на месте."
-            await callback.bot.send_message(order.user_id, user_text, parse_mode="HTML")
+            await session.execute(update(Order).where(Order.id == order_id).values(confirmed=True))
+            summary = await update_order_summary(session, order_id, status="confirmed")
+            if summary:
+                enqueue_message(session, summary.user_id, confirmed_text(summary))
+                await session.commit()
+        if not summary:
+            await callback.answer("❗ Заказ не найден.", show_alert=True)
+            return
+        logger.info("Order confirmed", extra={"order_id": order_id})
+        invalidate_my_orders(summary.user_id)
+        outbox_relay.wake()
 
-        await callback.message.edit_text(f"✅ Заказ #{order_id} подтверждён. Введите ТТН для отправки:")
+        await callback.message.answer(f"✅ Заказ #{order_id} подтверждён. Введите ТТН для отправки:")
         await state.set_state(OrderAction.ttn_input)
         await state.update_data(order_id=order_id)
         await callback.answer()
     except OperationalError as e:
         await callback.message.edit_text("❌ Ошибка базы данных.")
-        print(f"DB Error in confirm_order: {e}")
+        logger.error("DB error in confirm_order: %s", e)
         await callback.answer()
 
 @router.message(OrderAction.ttn_input)
@@ -184,29 +487,24 @@ async def set_ttn(message: Message, state: FSMContext):
     data = await state.get_data()
     order_id = data.get("order_id")
     try:
-        print(f"Setting TTN for order {order_id}")
+        logger.debug("Setting TTN for order %s", order_id)
         async with AsyncSessionLocal() as session:
-            order = await session.get(Order, order_id)
-            if not order:
-                await message.answer("❗ Заказ не найден.")
-                await state.clear()
-                return
-
-            order.ttn = ttn
-            await session.commit()
-            print(f"TTN {ttn} set for order {order_id}")
-
-            # Уведомление пользователю
-            user_text = (
-                f"🚚 Ваш заказ #{order.id} отправлен!\n"
-                f"📦 ТТН: <b>{ttn}</b>\n"
-                f"Проверьте статус доставки на сайте Новой Почты."
-            )
-            await message.bot.send_message(order.user_id, user_text, parse_mode="HTML")
-            await message.answer(f"✅ ТТН {ttn} добавлен к заказу #{order_id}.")
+            await session.execute(update(Order).where(Order.id == order_id).values(ttn=ttn))
+            summary = await update_order_summary(session, order_id, status="shipped", ttn=ttn)
+            if summary:
+                enqueue_message(session, summary.user_id, shipped_text(summary))
+                await session.commit()
+        if not summary:
+            await message.answer("❗ Заказ не найден.")
+            await state.clear()
+            return
+        logger.info("TTN set", extra={"order_id": order_id, "ttn": ttn})
+        invalidate_my_orders(summary.user_id)
+        outbox_relay.wake()
+        await message.answer(f"✅ ТТН {ttn} добавлен к заказу #{order_id}.")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in set_ttn: {e}")
+        logger.error("DB error in set_ttn: %s", e)
 
     await state.clear()
 
@@ -218,21 +516,20 @@ async def reject_order(callback: CallbackQuery, state: FSMContext):
 
     order_id = int(callback.data.split("_")[-1])
     try:
-        print(f"Processing reject for order {order_id} by admin {callback.from_user.id}")
+        logger.debug("Processing reject for order %s", order_id)
         async with AsyncSessionLocal() as session:
             order = await session.get(Order, order_id)
             if not order:
-                await callback.message.edit_text("❗ Заказ не найден.")
-                await callback.answer()
+                await callback.answer("❗ Заказ не найден.", show_alert=True)
                 return
 
-        await callback.message.edit_text("❌ Укажите причину отклонения заказа:")
+        await callback.message.answer(f"❌ Укажите причину отклонения заказа #{order_id}:")
         await state.set_state(OrderAction.rejection_reason)
         await state.update_data(order_id=order_id)
         await callback.answer()
     except OperationalError as e:
         await callback.message.edit_text("❌ Ошибка базы данных.")
-        print(f"DB Error in reject_order: {e}")
+        logger.error("DB error in reject_order: %s", e)
         await callback.answer()
 
 @router.message(OrderAction.rejection_reason)
@@ -245,35 +542,24 @@ async def set_rejection_reason(message: Message, state: FSMContext):
     data = await state.get_data()
     order_id = data.get("order_id")
     try:
-        print(f"Setting rejection reason for order {order_id}")
+        logger.debug("Setting rejection reason for order %s", order_id)
         async with AsyncSessionLocal() as session:
-            order = await session.get(Order, order_id, options=[selectinload(Order.items)])
-            if not order:
-                await message.answer("❗ Заказ не найден.")
-                await state.clear()
-                return
-
-            order.rejection_reason = reason
-            await session.commit()
-            print(f"Rejection reason set for order {order_id}")
-
-            # Уведомление пользователю
-            cart_text = "Товары не указаны" if not order.items else "\n".join(
-                [f"• {item.product_name} – {item.product_price} грн × {item.quantity}" for item in order.items]
-            )
-            user_text = (
-                f"❌ Ваш заказ #{order.id} отклонён.\n\n"
-                f"Причина: {reason}\n\n"
-                f"{cart_text}\n"
-                f"💰 Сумма: {order.total} грн\n"
-                f"📞 Телефон: {order.phone}\n"
-                f"🚚 Адрес: {order.address}"
-            )
-            await message.bot.send_message(order.user_id, user_text, parse_mode="HTML")
-            await message.answer(f"✅ Заказ #{order_id} отклонён с причиной: {reason}")
+            await session.execute(update(Order).where(Order.id == order_id).values(rejection_reason=reason))
+            summary = await update_order_summary(session, order_id, status="rejected", rejection_reason=reason)
+            if summary:
+                enqueue_message(session, summary.user_id, rejected_text(summary))
+                await session.commit()
+        if not summary:
+            await message.answer("❗ Заказ не найден.")
+            await state.clear()
+            return
+        logger.info("Order rejected", extra={"order_id": order_id})
+        invalidate_my_orders(summary.user_id)
+        outbox_relay.wake()
+        await message.answer(f"✅ Заказ #{order_id} отклонён с причиной: {reason}")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in set_rejection_reason: {e}")
+        logger.error("DB error in set_rejection_reason: %s", e)
 
     await state.clear()
 
@@ -312,39 +598,33 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     text = data["text"]
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(Subscriber).where(Subscriber.subscribed == True))
-            subscribers = result.scalars().all()
-
-        if not subscribers:
+        job = await create_job(text, callback.message.chat.id, callback.message.message_id)
+        if not job:
             await callback.message.edit_text("❗ Нет активных подписчиков.")
             await callback.answer()
             await state.clear()
             return
 
-        sent_count = 0
-        failed_count = 0
-        for subscriber in subscribers:
-            try:
-                print(f"Отправка подписчику {subscriber.user_id}")
-                await callback.bot.send_message(
-                    chat_id=subscriber.user_id,
-                    text=text,
-                    parse_mode="HTML"
-                )
-                sent_count += 1
-            except Exception as e:
-                print(f"Ошибка отправки подписчику {subscriber.user_id}: {e}")
-                failed_count += 1
-
-        await callback.message.edit_text(
-            f"✅ Рассылка завершена.\n"
-            f"Отправлено: {sent_count} из {len(subscribers)}\n"
-            f"Ошибок: {failed_count}"
+        broadcaster = Broadcaster(
+            callback.bot,
+            job,
+            workers=config.broadcast_workers,
+            rate=config.broadcast_rate,
+            chunk_size=config.broadcast_chunk_size,
+            progress_interval=config.broadcast_progress_interval,
         )
+        try:
+            await callback.message.edit_text(render_progress(broadcaster.stats))
+        except TelegramBadRequest as e:
+            # Прогресс обновит сам рассыльщик; запись в broadcast_jobs уже создана, запускаем
+            logger.warning("Не удалось показать прогресс рассылки #%s: %s", job.id, e)
+        launch_broadcast(broadcaster)
     except OperationalError as e:
         await callback.message.edit_text("❌ Ошибка базы данных.")
-        print(f"DB Error in confirm_broadcast: {e}")
+        logger.error("DB error in confirm_broadcast: %s", e)
+    except Exception:
+        await callback.message.answer("❌ Не удалось запустить рассылку.")
+        logger.exception("Ошибка запуска рассылки")
     await callback.answer()
     await state.clear()
 
@@ -390,19 +670,88 @@ async def product_photo(message: Message, state: FSMContext):
         photo = message.photo[-1].file_id
 
         async with AsyncSessionLocal() as session:
-            session.add(Product(name=name, price=price, photo=photo))
+            product = Product(name=name, price=price, photo=photo)
+            session.add(product)
+            await session.flush()
+            # Тот же формат, что у товаров до появления SKU (миграция product_sku)
+            product.sku = f"auto-{product.id}"
             await session.commit()
+        catalog_cache.invalidate()
 
         await message.answer(f"✅ Товар «{name}» успешно добавлен!")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in product_photo: {e}")
+        logger.error("DB error in product_photo: %s", e)
     await state.clear()
 
 @router.message(AddProduct.photo)
 async def invalid_photo(message: Message):
     await message.answer("🚫 Пожалуйста, отправьте именно фото.")
 
+@router.message(Command("import_products"))
+async def start_import_products(message: Message, state: FSMContext):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Вы не админ.")
+        return
+    await message.answer(
+        "📥 Отправьте файл .csv или .json с колонками sku, name, price, photo.\n"
+        "Товары с существующим sku обновятся, новые — добавятся. "
+        "Пустое фото у существующего товара оставляет текущее.\n"
+        "Шаблон можно получить командой /export_products."
+    )
+    await state.set_state(ImportProducts.waiting_for_file)
+
+@router.message(ImportProducts.waiting_for_file, F.document)
+async def import_products_file(message: Message, state: FSMContext):
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await message.answer(f"🚫 Файл слишком большой (максимум {IMPORT_MAX_BYTES // 1024 // 1024} МБ).")
+        return
+
+    try:
+        content = await message.bot.download(document)
+        rows = parse_products(document.file_name or "", content.read())
+        result = await import_products(rows)
+    except CatalogImportError as e:
+        await message.answer(f"🚫 Импорт отменён: {e}")
+        return
+    except OperationalError as e:
+        await message.answer("❌ Ошибка базы данных.")
+        logger.error("DB error in import_products_file: %s", e)
+        await state.clear()
+        return
+
+    catalog_cache.invalidate()
+    await message.answer(
+        f"✅ Импорт завершён за {result.duration * 1000:.0f} мс\n"
+        f"Строк: {result.rows}, добавлено: {result.inserted}, обновлено: {result.updated}"
+    )
+    await state.clear()
+
+@router.message(ImportProducts.waiting_for_file)
+async def invalid_import_file(message: Message):
+    await message.answer("🚫 Пожалуйста, отправьте файл .csv или .json.")
+
+@router.message(Command("export_products"))
+async def export_products_file(message: Message, command: CommandObject):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Вы не админ.")
+        return
+
+    fmt = "json" if (command.args or "").strip().lower() == "json" else "csv"
+    started = time.perf_counter()
+    try:
+        content, count = await export_products(fmt)
+    except OperationalError as e:
+        await message.answer("❌ Ошибка базы данных.")
+        logger.error("DB error in export_products_file: %s", e)
+        return
+
+    await message.answer_document(
+        BufferedInputFile(content, filename=f"products.{fmt}"),
+        caption=f"📤 Товаров: {count}, {(time.perf_counter() - started) * 1000:.0f} мс",
+    )
+
 @router.message(Command("dell_product"))
 async def choose_product_to_delete(message: Message, state: FSMContext):
     if not is_admin(message.from_user.id):
@@ -428,9 +777,10 @@ async def choose_product_to_delete(message: Message, state: FSMContext):
         await state.set_state(DeleteProduct.choosing)
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in choose_product_to_delete: {e}")
+        logger.error("DB error in choose_product_to_delete: %s", e)
 
-@router.callback_query(F.data.startswith("delete_"))
+# Только delete_<id>: delete_fb_<id> обрабатывает delete_feedback
+@router.callback_query(F.data.regexp(r"^delete_\d+$"))
 async def delete_product_callback(callback: CallbackQuery, state: FSMContext):
     if not is_admin(callback.from_user.id):
         await callback.answer("⛔ У вас нет доступа", show_alert=True)
@@ -446,42 +796,178 @@ async def delete_product_callback(callback: CallbackQuery, state: FSMContext):
                 return
             await session.delete(product)
             await session.commit()
+        catalog_cache.invalidate()
         await callback.message.edit_text(f"✅ Товар «{product.name}» удалён.")
     except OperationalError as e:
         await callback.message.edit_text("❌ Ошибка базы данных.")
-        print(f"DB Error in delete_product_callback: {e}")
+        logger.error("DB error in delete_product_callback: %s", e)
     await callback.answer()
     await state.clear()
 
+@router.message(Command("catalog_cache"))
+async def show_catalog_cache_stats(message: Message):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Вы не админ.")
+        return
+
+    stats = catalog_cache.stats()
+    age = "не загружен" if stats["age"] is None else f"{int(stats['age'])} сек."
+    await message.answer(
+        f"🗂 Кэш каталога (версия {stats['version']})\n"
+        f"Товаров: {stats['products']}\n"
+        f"Попаданий: {stats['hits']} / промахов: {stats['misses']} ({stats['hit_rate']:.0%})\n"
+        f"Возраст: {age}"
+    )
+
+@router.message(Command("perf"))
+async def show_perf(message: Message, scheduler: Optional[UpdateScheduler] = None):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Вы не админ.")
+        return
+
+    rows = handler_summary()[:15]
+    if not rows:
+        await message.answer("📈 Метрик пока нет.")
+        return
+
+    lines = ["📈 <b>Хендлеры</b> (среднее на апдейт)"]
+    for row in rows:
+        lines.append(
+            f"<code>{row['handler']}</code> ×{row['count']}\n"
+            f"  {row['avg_ms']:.0f} мс (p95 {row['p95_ms']:.0f}) · "
+            f"БД {row['db_queries']:.1f} / {row['db_ms']:.0f} мс · "
+            f"API {row['api_calls']:.1f} / {row['api_ms']:.0f} мс"
+        )
+    if scheduler is not None:
+        wait_p95 = (scheduler_wait.quantile(0.95) or 0.0) * 1000
+        lines.append(
+            f"\n🧮 Планировщик: выполняется {scheduler.running} из {scheduler.max_concurrent}, "
+            f"в плане {scheduler.pending} из {scheduler.max_backlog}, ожидание p95 {wait_p95:.0f} мс"
+        )
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+@router.message(Command("db_pool"))
+async def show_db_pool(message: Message):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Вы не админ.")
+        return
+
+    stats = pool_snapshot()
+    await message.answer(
+        f"🗄 Пул соединений\n"
+        f"Размер: {stats['size']}, занято: {stats['checked_out']}, свободно: {stats['checked_in']}\n"
+        f"Overflow: {stats['overflow']} из {stats['max_overflow']}\n"
+        f"Выдач: {stats['checkouts']}, с ожиданием: {stats['waited']}, таймаутов: {stats['timeouts']}\n"
+        f"Ожидание: среднее {stats['wait_avg_ms']:.2f} мс, максимум {stats['wait_max_ms']:.1f} мс"
+    )
+
 @router.message(Command("questions"))
 async def list_questions(message: Message):
     if not is_admin(message.from_user.id):
         await message.answer("❌ Вы не админ.")
         return
-
+    await send_questions(message)
+
+def question_block(question: UserQuestion, max_chars: int = 500) -> str:
+    text = question.question
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + "…"
+    return (
+        f"❓ <b>#{question.id}</b> · @{html.escape(question.username or '—')} (ID: {question.user_id})"
+        f" · 🕐 {question.created_at.strftime('%d.%m %H:%M')}\n"
+        f"{html.escape(text)}"
+    )
+
+async def send_questions(message: Message, direction: str = "next", cursor: int = 0, edit: bool = False):
+    # Инбокс открытых вопросов: одно сообщение на страницу, keyset по id (новые сверху)
+    # по частичному индексу — стоимость зависит от числа открытых вопросов, а не от всей истории.
+    page_size = config.questions_page_size
+    unanswered = UserQuestion.answered == False
     try:
         async with AsyncSessionLocal() as session:
-            result = await session.execute(select(UserQuestion))
+            total = await session.scalar(select(func.count()).select_from(UserQuestion).where(unanswered))
+            query = select(UserQuestion).where(unanswered)
+            if direction == "prev":
+                query = query.where(UserQuestion.id > cursor).order_by(UserQuestion.id.asc())
+            else:
+                if cursor:
+                    query = query.where(UserQuestion.id < cursor)
+                query = query.order_by(UserQuestion.id.desc())
+            result = await session.execute(query.limit(page_size + 1))
             questions = result.scalars().all()
 
-        if not questions:
-            await message.answer("❗ Нет вопросов от пользователей.")
-            return
+        has_more = len(questions) > page_size
+        questions = questions[:page_size]
+        if direction == "prev":
+            questions = questions[::-1]
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = bool(cursor), has_more
 
-        for q in questions:
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="✉️ Ответить", callback_data=f"answer_{q.id}")]
-            ])
-            await message.answer(
-                f"👤 @{q.username} (ID: {q.user_id})\n"
-                f"🕐 {q.created_at.strftime('%Y-%m-%d %H:%M')}\n\n"
-                f"❓ {q.question}",
-                reply_markup=keyboard,
-                parse_mode="HTML"
-            )
+        if not questions:
+            text = "❗ Нет неотвеченных вопросов."
+            keyboard = None
+        else:
+            text = f"💬 <b>Ждут ответа: {total}</b>\n\n" + "\n\n".join(question_block(q) for q in questions)
+            rows = [
+                [
+                    InlineKeyboardButton(text=f"✉️ #{q.id}", callback_data=f"answer_{q.id}"),
+                    InlineKeyboardButton(text=f"🗑 #{q.id}", callback_data=f"question_close_{q.id}"),
+                ]
+                for q in questions
+            ]
+            nav = []
+            if has_prev:
+                nav.append(InlineKeyboardButton(text="◀️ Новее", callback_data=f"questions_page:prev:{questions[0].id}"))
+            nav.append(InlineKeyboardButton(text="🔄", callback_data="questions_page:next:0"))
+            if has_next:
+                nav.append(InlineKeyboardButton(text="Старше ▶️", callback_data=f"questions_page:next:{questions[-1].id}"))
+            rows.append(nav)
+            keyboard = InlineKeyboardMarkup(inline_keyboard=rows)
+
+        if edit:
+            await message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        else:
+            await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in list_questions: {e}")
+        logger.error("DB error in list_questions: %s", e)
+
+@router.callback_query(F.data.startswith("questions_page:"))
+async def flip_questions(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
+
+    _, direction, cursor = callback.data.split(":")
+    try:
+        await send_questions(callback.message, direction, int(cursor), edit=True)
+    except TelegramBadRequest:
+        # Обновление без изменений: "message is not modified"
+        pass
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("question_close_"))
+async def dismiss_question(callback: CallbackQuery):
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ У вас нет доступа", show_alert=True)
+        return
+
+    question_id = int(callback.data.split("_")[-1])
+    try:
+        async with AsyncSessionLocal() as session:
+            question = await close_question(session, question_id, callback.from_user.id)
+            await session.commit()
+    except OperationalError as e:
+        await callback.message.answer("❌ Ошибка базы данных.")
+        logger.error("DB error in dismiss_question: %s", e)
+        await callback.answer()
+        return
+
+    await callback.answer(
+        f"🗑 Вопрос #{question_id} закрыт без ответа." if question else "❗ Вопрос уже закрыт.",
+        show_alert=question is None,
+    )
 
 @router.callback_query(F.data.startswith("answer_"))
 async def start_answering(callback: CallbackQuery, state: FSMContext):
@@ -492,34 +978,41 @@ async def start_answering(callback: CallbackQuery, state: FSMContext):
     question_id = int(callback.data.split("_")[1])
     await state.set_state(AnswerUser.answering)
     await state.update_data(question_id=question_id)
-    await callback.message.answer("✍️ Напишите ответ на вопрос:")
+    await callback.message.answer(f"✍️ Напишите ответ на вопрос #{question_id}:")
     await callback.answer()
 
 @router.message(AnswerUser.answering)
 async def send_answer_to_user(message: Message, state: FSMContext):
+    answer = (message.text or "").strip()
+    if not answer:
+        await message.answer("❗ Ответ должен быть текстом.")
+        return
+
     data = await state.get_data()
     question_id = data.get("question_id")
     try:
         async with AsyncSessionLocal() as session:
-            question = await session.get(UserQuestion, question_id)
-            if not question:
-                await message.answer("🚫 Вопрос не найден.")
-                await state.clear()
-                return
-
-            try:
-                await message.bot.send_message(
-                    chat_id=question.user_id,
-                    text=f"📬 Ответ администратора на ваш вопрос:\n\n❓ {question.question}\n\n💬 {message.text}",
-                    parse_mode="HTML"
+            question = await close_question(session, question_id, message.from_user.id, answer)
+            if question:
+                # Ответ уходит через outbox в той же транзакции, что и отметка "отвечен"
+                enqueue_message(
+                    session,
+                    question.user_id,
+                    f"📬 Ответ администратора на ваш вопрос:\n\n❓ {html.escape(question.question)}\n\n💬 {html.escape(answer)}",
                 )
-                await message.answer("✅ Ответ успешно отправлен пользователю.")
-            except Exception as e:
-                await message.answer("❌ Не удалось отправить ответ пользователю.")
-                print(f"Error sending answer to user {question.user_id}: {e}")
+                await session.commit()
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in send_answer_to_user: {e}")
+        logger.error("DB error in send_answer_to_user: %s", e)
+        await state.clear()
+        return
+
+    if question:
+        outbox_relay.wake()
+        logger.info("Question answered", extra={"question_id": question_id})
+        await message.answer(f"✅ Ответ на вопрос #{question_id} отправлен пользователю.")
+    else:
+        await message.answer("🚫 Вопрос не найден или уже отвечен.")
     await state.clear()
 
 @router.message(Command("feedbacks"))
@@ -551,7 +1044,7 @@ async def list_feedbacks_for_moderation(message: Message):
             )
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных.")
-        print(f"DB Error in list_feedbacks_for_moderation: {e}")
+        logger.error("DB error in list_feedbacks_for_moderation: %s", e)
 
 @router.callback_query(F.data.startswith("confirm_fb_"))
 async def confirm_feedback(callback: CallbackQuery):
@@ -566,6 +1059,7 @@ async def confirm_feedback(callback: CallbackQuery):
             if feedback:
                 feedback.confirmed = True
                 await session.commit()
+                reviews_cache.invalidate()
                 await callback.message.edit_text(
                     f"✅ Отзыв от {feedback.name} подтверждён!\n\n📝 {feedback.feedback}",
                     parse_mode="HTML"
@@ -574,7 +1068,7 @@ async def confirm_feedback(callback: CallbackQuery):
                 await callback.message.edit_text("❗ Отзыв не найден.")
     except OperationalError as e:
         await callback.message.edit_text("❌ Ошибка базы данных.")
-        print(f"DB Error in confirm_feedback: {e}")
+        logger.error("DB error in confirm_feedback: %s", e)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("delete_fb_"))
@@ -590,6 +1084,9 @@ async def delete_feedback(callback: CallbackQuery):
             if feedback:
                 await session.delete(feedback)
                 await session.commit()
+                # Неподтверждённые отзывы на страницу не попадают
+                if feedback.confirmed:
+                    reviews_cache.invalidate()
                 await callback.message.edit_text(
                     f"🗑 Отзыв от {feedback.name} удалён!\n\n📝 {feedback.feedback}",
                     parse_mode="HTML"
@@ -598,5 +1095,5 @@ async def delete_feedback(callback: CallbackQuery):
                 await callback.message.edit_text("❗ Отзыв не найден.")
     except OperationalError as e:
         await callback.message.edit_text("❌ Ошибка базы данных.")
-        print(f"DB Error in delete_feedback: {e}")
+        logger.error("DB error in delete_feedback: %s", e)
     await callback.answer()
\ No newline at end of file
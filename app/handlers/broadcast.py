@@ -4,7 +4,9 @@ from aiogram.filters import Command
 from sqlalchemy import select
 from app.database.models import Subscriber
 from app.database.db import AsyncSessionLocal
+import logging
 
+logger = logging.getLogger(__name__)
 router = Router()
 
 def get_subscription_keyboard():
@@ -52,13 +54,10 @@ async def unsubscribe_user(message: Message):
 @router.callback_query(F.data == "subscribe")
 async def handle_subscribe(callback: CallbackQuery):
     user_id = callback.from_user.id
-    print(f"Subscribe attempt for user_id: {user_id}")
     async with AsyncSessionLocal() as session:
         subscriber = await session.get(Subscriber, user_id)
-        print(f"Subscriber found: {subscriber}")
         if subscriber:
             if subscriber.subscribed:
-                print("User already subscribed")
                 await callback.message.edit_text(
                     "📬 Ви вже підписані на розсилку!",
                     reply_markup=get_subscription_keyboard()
@@ -66,12 +65,10 @@ async def handle_subscribe(callback: CallbackQuery):
                 await callback.answer()
                 return
             subscriber.subscribed = True
-            print("Reactivating subscription")
         else:
             session.add(Subscriber(user_id=user_id))
-            print("Adding new subscriber")
         await session.commit()
-    print("Subscription successful")
+    logger.info("User subscribed")
     await callback.message.edit_text(
         "✅ Ви успішно підписалися на розсилку!",
         reply_markup=get_subscription_keyboard()
@@ -81,20 +78,17 @@ async def handle_subscribe(callback: CallbackQuery):
 @router.callback_query(F.data == "unsubscribe")
 async def handle_unsubscribe(callback: CallbackQuery):
     user_id = callback.from_user.id
-    print(f"Unsubscribe attempt for user_id: {user_id}")
     async with AsyncSessionLocal() as session:
         subscriber = await session.get(Subscriber, user_id)
-        print(f"Subscriber found: {subscriber}")
         if subscriber and subscriber.subscribed:
             subscriber.subscribed = False
             await session.commit()
-            print("Unsubscribed")
+            logger.info("User unsubscribed")
             await callback.message.edit_text(
                 "🚫 Ви відписалися від розсилки.",
                 reply_markup=get_subscription_keyboard()
             )
         else:
-            print("Not subscribed")
             await callback.message.edit_text(
                 "❓ Ви не підписані на розсилку.",
                 reply_markup=get_subscription_keyboard()
@@ -5,8 +5,9 @@ from aiogram.fsm.context import FSMContext
 from app.database.models import Feedback
 from app.database.db import AsyncSessionLocal
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
 from app.handlers import admin
-from sqlalchemy import select
+from app.services.reviews import reviews_cache
 
 class LeaveFeedback(StatesGroup):
     writing = State()
@@ -30,17 +31,28 @@ async def save_feedback(message: Message, state: FSMContext):
     await message.answer("✅ Дякуємо! Ваш відгук надіслано на перевірку.")
     await state.clear()
 
-@router.message(F.text == "📢 Отзывы")
+@router.message(F.text == "📢 Отзывы", flags={"throttle": "catalog"})
 async def show_reviews(message: Message):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Feedback).where(Feedback.confirmed == True).order_by(Feedback.created_at.desc()).limit(10)
-        )
-        feedbacks = result.scalars().all()
-
-    if not feedbacks:
+    text, keyboard, _ = await reviews_cache.page(1)
+    if text is None:
         await message.answer("Поки немає підтверджених відгуків.")
         return
+    await message.answer(text, reply_markup=keyboard)
+
+@router.callback_query(F.data.startswith("reviews_page:"), flags={"throttle": "catalog"})
+async def flip_reviews(callback: CallbackQuery):
+    page = callback.data.split(":")[1]
+    if page == "noop":
+        await callback.answer()
+        return
 
-    for fb in feedbacks:
-        await message.answer(f"📝 {fb.name}:\n{fb.feedback}")
+    text, keyboard, _ = await reviews_cache.page(int(page))
+    try:
+        if text is None:
+            await callback.message.edit_text("Поки немає підтверджених відгуків.")
+        else:
+            await callback.message.edit_text(text, reply_markup=keyboard)
+    except TelegramBadRequest:
+        # Страница не изменилась: "message is not modified"
+        pass
+    await callback.answer()
@@ -5,82 +5,90 @@ from app.states.order_states import OrderFSM
 from app.keyboards.main import get_main_menu
 from app.database.functions import save_order_to_db
 from app.config import load_config
+import logging
 import re
-from sqlalchemy import select
 from sqlalchemy.exc import OperationalError
-from app.database.db import AsyncSessionLocal
-from app.database.models import Product
-from aiogram.types import CallbackQuery, ReplyKeyboardRemove
-import asyncio
-
+from aiogram.types import CallbackQuery, ReplyKeyboardRemove, InputMediaPhoto
+from aiogram.exceptions import TelegramBadRequest
+from app.services.admin_notifier import admin_notifier, ORDER
+from app.services.catalog_cache import catalog_cache
+from app.services.cart import change_quantity, get_cart, normalize_cart, resolve_cart, cart_total, render_lines
+from app.services.catalog import get_neighbour, get_page, get_product_count, product_caption, carousel_keyboard
+
+logger = logging.getLogger(__name__)
 router = Router()
 config = load_config()
 
-@router.message(F.text == "📦 Каталог")
+@router.message(F.text == "📦 Каталог", flags={"throttle": "catalog"})
 async def show_catalog(message: Message):
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(Product))
-            products = result.scalars().all()
-
-        if not products:
+        product = await get_neighbour(0, "next")
+        if not product:
             await message.answer("❗ Каталог пуст.")
             return
 
-        for product in products:
-            text = (
-                f"<b>{product.name}</b>\n"
-                f"💰 Цена: {product.price} грн"
-            )
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🛒 В корзину", callback_data=f"add_to_cart:{product.id}")]
-            ])
-            await message.bot.send_photo(
-                chat_id=message.chat.id,
-                photo=product.photo,
-                caption=text,
-                reply_markup=keyboard,
-                parse_mode="HTML"
-            )
+        total = await get_product_count()
+        await message.answer_photo(
+            photo=product.photo,
+            caption=product_caption(product),
+            reply_markup=carousel_keyboard(product, 1, total),
+            parse_mode="HTML"
+        )
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных. Попробуйте позже.")
-        print(f"DB Error in show_catalog: {e}")
+        logger.error("DB error in show_catalog: %s", e)
+
+@router.callback_query(F.data == "catalog:noop")
+async def catalog_noop(callback: CallbackQuery):
+    await callback.answer()
 
-@router.callback_query(F.data.startswith("add_to_cart:"))
+@router.callback_query(F.data.startswith("catalog:"), flags={"throttle": "catalog"})
+async def flip_catalog(callback: CallbackQuery):
+    _, direction, product_id, position = callback.data.split(":")
+    try:
+        product, position, total = await get_page(int(product_id), direction, int(position))
+        if not product:
+            await callback.message.edit_caption(caption="❗ Каталог пуст.")
+            await callback.answer()
+            return
+
+        await callback.message.edit_media(
+            media=InputMediaPhoto(media=product.photo, caption=product_caption(product), parse_mode="HTML"),
+            reply_markup=carousel_keyboard(product, position, total)
+        )
+        await callback.answer()
+    except OperationalError as e:
+        await callback.answer("❌ Ошибка базы данных.", show_alert=True)
+        logger.error("DB error in flip_catalog: %s", e)
+    except TelegramBadRequest:
+        # Каталог из одного товара: листать некуда, сообщение не изменилось
+        await callback.answer()
+
+@router.callback_query(F.data.startswith("add_to_cart:"), flags={"throttle": "cart"})
 async def add_to_cart(callback: CallbackQuery, state: FSMContext):
     try:
         product_id = int(callback.data.split(":")[1])
-        async with AsyncSessionLocal() as session:
-            product = await session.get(Product, product_id)
-            if not product:
-                await callback.answer("❌ Товар не найден.", show_alert=True)
-                return
-
-        cart = (await state.get_data()).get("cart", [])
-        cart.append({
-            "id": product.id,
-            "name": product.name,
-            "price": product.price,
-            "photo": product.photo
-        })
-        await state.update_data(cart=cart)
-        await callback.answer("✅ Товар добавлен в корзину.")
+        product = await catalog_cache.get(product_id)
+        if not product:
+            await callback.answer("❌ Товар не найден.", show_alert=True)
+            return
+
+        cart = await change_quantity(state, product.id)
+        await callback.answer(f"✅ Товар добавлен в корзину ({cart.get(product.id, 1)} шт.)")
     except OperationalError as e:
         await callback.answer("❌ Ошибка базы данных.", show_alert=True)
-        print(f"DB Error in add_to_cart: {e}")
+        logger.error("DB error in add_to_cart: %s", e)
 
-@router.message(F.text == "💰 Корзина")
+@router.message(F.text == "💰 Корзина", flags={"throttle": "cart"})
 async def show_cart(message: Message, state: FSMContext):
-    data = await state.get_data()
-    cart = data.get("cart", [])
+    lines = await resolve_cart(await get_cart(state))
 
-    if not cart:
+    if not lines:
         await message.answer("🛒 Ваша корзина пуста.")
         return
 
-    total = sum(item["price"] for item in cart)
-    text = "\n".join([f"• {item['name']} – {item['price']} грн" for item in cart])
-    text += f"\n\n<b>Итого: {total} грн</b>"
+    text = render_lines(lines)
+    text += f"\n\n<b>Итого: {cart_total(lines)} грн</b>"
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="✅ Оформить заказ", callback_data="checkout")],
@@ -91,15 +99,13 @@ async def show_cart(message: Message, state: FSMContext):
 
 @router.callback_query(F.data == "clear_cart")
 async def clear_cart(callback: CallbackQuery, state: FSMContext):
-    await state.update_data(cart=[])
+    await state.update_data(cart={})
     await callback.message.edit_text("🧹 Корзина очищена.")
     await callback.answer()
 
-@router.callback_query(F.data == "checkout")
+@router.callback_query(F.data == "checkout", flags={"throttle": "checkout"})
 async def checkout_start(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    cart = data.get("cart", [])
-    if not cart:
+    if not await get_cart(state):
         await callback.message.edit_text("🛒 Корзина пуста. Добавьте товары.")
         await callback.answer()
         return
@@ -107,7 +113,7 @@ async def checkout_start(callback: CallbackQuery, state: FSMContext):
     await state.set_state(OrderFSM.name)
     await callback.answer()
 
-@router.message(OrderFSM.name)
+@router.message(OrderFSM.name, flags={"throttle": "input"})
 async def get_name(message: Message, state: FSMContext):
     name = message.text.strip()
     if not name or len(name) < 2:
@@ -117,7 +123,7 @@ async def get_name(message: Message, state: FSMContext):
     await message.answer("Ваш номер телефона:")
     await state.set_state(OrderFSM.phone)
 
-@router.message(OrderFSM.phone)
+@router.message(OrderFSM.phone, flags={"throttle": "input"})
 async def get_phone(message: Message, state: FSMContext):
     phone = message.text.strip()
     if not re.fullmatch(r"\+?\d{10,13}", phone):
@@ -127,7 +133,7 @@ async def get_phone(message: Message, state: FSMContext):
     await message.answer("Укажите город и отделение Новой Пошты / адрес доставки:")
     await state.set_state(OrderFSM.address)
 
-@router.message(OrderFSM.address)
+@router.message(OrderFSM.address, flags={"throttle": "input"})
 async def get_address(message: Message, state: FSMContext):
     address = message.text.strip()
     if not address or len(address) < 5:
@@ -146,7 +152,7 @@ async def get_address(message: Message, state: FSMContext):
     )
     await state.set_state(OrderFSM.payment)
 
-@router.message(OrderFSM.payment)
+@router.message(OrderFSM.payment, flags={"throttle": "input"})
 async def get_payment(message: Message, state: FSMContext):
     if message.text not in ["💳 Предоплата на карту", "📦 Наложенный платёж"]:
         await message.answer("❗ Выберите способ оплаты.")
@@ -154,10 +160,10 @@ async def get_payment(message: Message, state: FSMContext):
     await state.update_data(payment=message.text)
 
     data = await state.get_data()
-    cart = data.get("cart", [])
-    total = sum(item["price"] for item in cart)
+    lines = await resolve_cart(normalize_cart(data.get("cart")))
+    total = cart_total(lines)
 
-    summary = "\n".join([f"• {item['name']} – {item['price']} грн" for item in cart])
+    summary = render_lines(lines)
     summary += (
         f"\n\n👤 Имя: {data['name']}"
         f"\n📞 Телефон: {data['phone']}"
@@ -171,7 +177,7 @@ async def get_payment(message: Message, state: FSMContext):
     await message.answer(summary, parse_mode="HTML")
     await state.set_state(OrderFSM.confirm)
 
-@router.message(OrderFSM.confirm)
+@router.message(OrderFSM.confirm, flags={"throttle": "checkout"})
 async def confirm_order(message: Message, state: FSMContext):
     if message.text.lower() not in ["да", "нет"]:
         await message.answer("Введите 'да' или 'нет'.")
@@ -184,11 +190,15 @@ async def confirm_order(message: Message, state: FSMContext):
 
     data = await state.get_data()
     try:
-        await save_order_to_db(data)
+        lines = await resolve_cart(normalize_cart(data.get("cart")))
+        if not lines:
+            await message.answer("🛒 Корзина пуста. Добавьте товары.", reply_markup=get_main_menu())
+            return
+        total = cart_total(lines)
+        data["total"] = total
+        await save_order_to_db(data, lines)
 
-        cart = data.get("cart", [])
-        cart_text = "\n".join([f"• {item['name']} – {item['price']} грн" for item in cart])
-        total = data["total"]
+        cart_text = render_lines(lines)
         admin_text = (
             f"📦 Новый заказ!\n\n"
             f"{cart_text}\n\n"
@@ -199,12 +209,7 @@ async def confirm_order(message: Message, state: FSMContext):
             f"💰 Сумма: {total} грн"
         )
 
-        for admin_id in config.admin_ids:
-            try:
-                await message.bot.send_message(admin_id, admin_text, parse_mode="HTML")
-                print(f"Уведомление отправлено админу {admin_id}")
-            except Exception as e:
-                print(f"Ошибка отправки админу {admin_id}: {e}")
+        admin_notifier.notify(ORDER, admin_text)
 
         # Уведомление пользователю
         user_text = (
@@ -217,13 +222,12 @@ async def confirm_order(message: Message, state: FSMContext):
             user_text += "\n\n📦 Оплата при получении. Подготовьте сумму на месте."
 
         await message.answer(user_text, reply_markup=ReplyKeyboardRemove(), parse_mode="HTML")
-        await asyncio.sleep(0.5)  # Увеличенная задержка
         await message.answer("Главное меню:", reply_markup=get_main_menu())
     except OperationalError as e:
         await message.answer("❌ Ошибка сохранения заказа. Попробуйте позже.")
-        print(f"DB Error in confirm_order: {e}")
-    except Exception as e:
+        logger.error("DB error in confirm_order: %s", e)
+    except Exception:
         await message.answer("❌ Неизвестная ошибка. Попробуйте позже.")
-        print(f"Unexpected error in confirm_order: {e}")
+        logger.exception("Unexpected error in confirm_order")
     finally:
         await state.clear()  # Гарантированная очистка состоянияая очистка состояния
\ No newline at end of file
@@ -1,67 +1,112 @@
 from aiogram import Router, F
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import OperationalError
 from app.database.db import AsyncSessionLocal
-from app.database.models import Order
+from app.database.models import OrderSummary
+from app.services.my_orders import get_recent_orders
+from app.services.phone import normalize_phone
+import logging
 import re
 
 class OrderStatus(StatesGroup):
     waiting_for_phone = State()
 
+logger = logging.getLogger(__name__)
 router = Router()
 
-@router.message(F.text == "📦 Статус заказа")
+def render_customer_status(summary: OrderSummary) -> str:
+    text = (
+        f"🧾 <b>Заказ #{summary.order_id}</b>\n"
+        f"{summary.items_text}\n\n"
+        f"💰 Сумма: {summary.total} грн\n"
+        f"📞 Телефон: {summary.phone}\n"
+        f"🚚 Адрес: {summary.address}\n"
+        f"🕒 Создан: {summary.created_at.strftime('%Y-%m-%d %H:%M')}\n"
+    )
+    if summary.status == "rejected":
+        text += f"📦 Статус: <b>Отклонён</b>\nПричина: {summary.rejection_reason}"
+    elif summary.status == "pending":
+        text += "📦 Статус: <b>Ожидает подтверждения</b>"
+    elif summary.status == "confirmed":
+        text += "📦 Статус: <b>Подтверждён</b>\nОжидает отправки."
+    else:
+        text += f"📦 Статус: <b>Отправлен</b>\n📬 ТТН: <b>{summary.ttn}</b>"
+    return text
+
+STATUS_SHORT = {
+    "pending": "⏳ Ожидает подтверждения",
+    "confirmed": "✅ Подтверждён, ожидает отправки",
+    "shipped": "🚚 Отправлен",
+    "rejected": "❌ Отклонён",
+}
+
+def render_my_orders(summaries: list[OrderSummary]) -> str:
+    blocks = []
+    for summary in summaries:
+        block = (
+            f"🧾 <b>#{summary.order_id}</b> · {summary.created_at.strftime('%d.%m.%Y')} · {summary.total} грн\n"
+            f"{STATUS_SHORT.get(summary.status, summary.status)}"
+        )
+        if summary.status == "shipped":
+            block += f" · ТТН <b>{summary.ttn}</b>"
+        elif summary.status == "rejected":
+            block += f"\nПричина: {summary.rejection_reason}"
+        blocks.append(block)
+    return "📦 <b>Ваши последние заказы</b>\n\n" + "\n\n".join(blocks)
+
+PHONE_LOOKUP_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔎 Найти по номеру телефона", callback_data="status_by_phone")]
+])
+
+@router.message(F.text == "📦 Статус заказа", flags={"throttle": "cart"})
+async def show_my_orders(message: Message, state: FSMContext):
+    try:
+        summaries = await get_recent_orders(message.from_user.id)
+    except OperationalError as e:
+        await message.answer("❌ Ошибка базы данных. Попробуйте позже.")
+        logger.error("DB error in show_my_orders: %s", e)
+        return
+
+    if not summaries:
+        await ask_for_phone(message, state)
+        return
+    await message.answer(render_my_orders(summaries), reply_markup=PHONE_LOOKUP_KEYBOARD, parse_mode="HTML")
+
+@router.callback_query(F.data == "status_by_phone")
+async def status_by_phone(callback: CallbackQuery, state: FSMContext):
+    await ask_for_phone(callback.message, state)
+    await callback.answer()
+
 async def ask_for_phone(message: Message, state: FSMContext):
     await message.answer("📲 Введите номер телефона, указанный при заказе (например: +380501234567):")
     await state.set_state(OrderStatus.waiting_for_phone)
 
-@router.message(OrderStatus.waiting_for_phone)
+@router.message(OrderStatus.waiting_for_phone, flags={"throttle": "input"})
 async def check_order_status(message: Message, state: FSMContext):
-    phone = message.text.strip()
-    if not re.fullmatch(r"\+?\d{10,13}", phone):
+    phone = (message.text or "").strip()
+    if not re.fullmatch(r"\+?[\d\s()-]{9,18}", phone):
         await message.answer("❗ Введите корректный номер телефона (например: +380501234567).")
         return
 
     try:
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(Order)
-                .where(Order.phone == phone)
-                .options(selectinload(Order.items))
-                .order_by(Order.id.desc())
+                select(OrderSummary)
+                .where(OrderSummary.phone_normalized == normalize_phone(phone))
+                .order_by(OrderSummary.order_id.desc())
                 .limit(1)
             )
-            order = result.scalar_one_or_none()
+            summary = result.scalar_one_or_none()
 
-            if not order:
-                await message.answer("❌ Заказ не найден. Проверьте номер телефона.")
-            else:
-                cart_text = "Товары не указаны" if not order.items else "\n".join(
-                    [f"• {item.product_name} – {item.product_price} грн × {item.quantity}" for item in order.items]
-                )
-                text = (
-                    f"🧾 <b>Заказ #{order.id}</b>\n"
-                    f"{cart_text}\n\n"
-                    f"💰 Сумма: {order.total} грн\n"
-                    f"📞 Телефон: {order.phone}\n"
-                    f"🚚 Адрес: {order.address}\n"
-                    f"🕒 Создан: {order.created_at.strftime('%Y-%m-%d %H:%M')}\n"
-                )
-                if order.rejection_reason:
-                    text += f"📦 Статус: <b>Отклонён</b>\nПричина: {order.rejection_reason}"
-                elif not order.confirmed:
-                    text += "📦 Статус: <b>Ожидает подтверждения</b>"
-                elif order.confirmed and not order.ttn:
-                    text += "📦 Статус: <b>Подтверждён</b>\nОжидает отправки."
-                else:
-                    text += f"📦 Статус: <b>Отправлен</b>\n📬 ТТН: <b>{order.ttn}</b>"
-                await message.answer(text, parse_mode="HTML")
+        if not summary:
+            await message.answer("❌ Заказ не найден. Проверьте номер телефона.")
+        else:
+            await message.answer(render_customer_status(summary), parse_mode="HTML")
     except OperationalError as e:
         await message.answer("❌ Ошибка базы данных. Попробуйте позже.")
-        print(f"DB Error in check_order_status: {e}")
+        logger.error("DB error in check_order_status: %s", e)
 
     await state.clear()
\ No newline at end of file
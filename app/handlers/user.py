@@ -3,20 +3,13 @@ from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
 from aiogram.fsm.state import State, StatesGroup
-from dotenv import load_dotenv
-import os
-import ast
 from app.database.db import AsyncSessionLocal
 from app.database.models import UserQuestion
-
-load_dotenv()
+from app.services.admin_notifier import admin_notifier, QUESTION
 
 class AskAdmin(StatesGroup):
     typing_question = State()
 
-admin_ids_raw = os.getenv("ADMIN_IDS", "[]")
-ADMIN_IDS = ast.literal_eval(admin_ids_raw)
-
 router = Router()
 
 @router.message(F.text == "💬 Задать вопрос")
@@ -36,11 +29,10 @@ async def forward_question_to_admin(message: Message, state: FSMContext):
         ))
         await session.commit()
 
-    for admin_id in ADMIN_IDS:
-        await message.bot.send_message(
-            chat_id=admin_id,
-            text=f"📩 Питання від @{message.from_user.username} (ID {message.from_user.id}):\n\n{message.text}"
-        )
+    admin_notifier.notify(
+        QUESTION,
+        f"📩 Питання від @{message.from_user.username} (ID {message.from_user.id}):\n\n{message.text}"
+    )
 
     await message.answer("✅ Ваше запитання надіслано адміністратору.")
     await state.clear()
\ No newline at end of file
@@ -0,0 +1,139 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.config import Settings
+
+# Поля апдейта, которые middleware кладёт в контекст: update_id, user_id, handler
+log_context: ContextVar[Optional[dict]] = ContextVar("log_context", default=None)
+
+# Логгер поштучных результатов рассылки — по умолчанию пишется только выборка
+BROADCAST_DELIVERY_LOGGER = "app.broadcast.delivery"
+
+PII_FIELDS = {"phone", "address", "customer_name", "first_name", "last_name", "username", "card_number", "text"}
+# Украинские номера в любом написании и номера карт; user_id и номера заказов не трогаем
+PII_PATTERNS = (
+    re.compile(r"(?<!\d)(?:\+?3?8)?[\s(]*0\d{2}[\s)-]*\d{3}[\s-]*\d{2}[\s-]*\d{2}(?!\d)"),
+    re.compile(r"(?<!\d)\d{4}(?:[\s-]?\d{4}){3}(?!\d)"),
+)
+
+# Атрибуты LogRecord, которые не являются пользовательскими extra
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _mask_digits(match: re.Match) -> str:
+    digits = re.sub(r"\D", "", match.group())
+    return f"***{digits[-2:]}"
+
+
+class ContextFilter(logging.Filter):
+    # Выполняется в потоке цикла событий, пока контекст апдейта ещё доступен
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = log_context.get()
+        if context:
+            for key, value in context.items():
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Пропускает долю rate записей ниже ERROR; ошибки проходят всегда
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.ERROR or random.random() < self.rate
+
+
+class RedactingFilter(logging.Filter):
+    # Работает в потоке QueueListener: маскирует телефоны в тексте и PII-поля в extra
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = str(record.msg)
+        for pattern in PII_PATTERNS:
+            message = pattern.sub(_mask_digits, message)
+        record.msg = message
+        for key in PII_FIELDS & set(vars(record)):
+            if getattr(record, key) is not None:
+                setattr(record, key, "***")
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class EventLoopQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Трассировку форматируем сразу: объект исключения не должен уходить в другой поток.
+        # Остальное форматирование (JSON, маскирование) делает поток QueueListener.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(config: Settings) -> QueueListener:
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(sys.stdout)
+    if config.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    output.addFilter(RedactingFilter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = EventLoopQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(config.log_level.upper())
+    # echo=True у SQLAlchemy писал бы в stdout напрямую; вместо него — уровень логгера
+    if config.db_echo:
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    for name, level in config.log_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+    for name, rate in config.log_sample_rates.items():
+        logging.getLogger(name).addFilter(SamplingFilter(rate))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    # Дописывает очередь и останавливает поток; повторный вызов безопасен
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
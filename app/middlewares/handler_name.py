@@ -0,0 +1,32 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from app.logging_config import log_context
+from app.services.metrics import current_update
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    # Внутренний middleware: хендлер известен только после фильтров. Имя одно на апдейт
+    # и для контекста логов, и для метрик — внешние middleware заводят только свои объекты.
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = data["handler"].callback.__name__
+        context = log_context.get()
+        if context is not None:
+            context["handler"] = name
+        stats = current_update.get()
+        if stats is not None:
+            stats.handler = name
+        return await handler(event, data)
+
+
+def setup_handler_name(dp: Dispatcher):
+    middleware = HandlerNameMiddleware()
+    for observer in (dp.message, dp.callback_query, dp.edited_message, dp.my_chat_member):
+        observer.middleware(middleware)
@@ -0,0 +1,27 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from app.logging_config import log_context
+
+
+class UpdateContextMiddleware(BaseMiddleware):
+    # Внешний middleware на update: всё, что залогировано при обработке, получает update_id и user_id
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        token = log_context.set({"update_id": event.update_id, "user_id": user.id if user else None})
+        try:
+            return await handler(event, data)
+        finally:
+            log_context.reset(token)
+
+
+def setup_log_context(dp: Dispatcher):
+    # Имя хендлера в контекст пишет общий HandlerNameMiddleware (app.middlewares.handler_name)
+    dp.update.outer_middleware(UpdateContextMiddleware())
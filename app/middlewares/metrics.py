@@ -0,0 +1,49 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject
+
+from app.services.metrics import UpdateStats, current_update, record_api_call, record_update
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    # Внешний middleware на update: замеряет весь апдейт и собирает SQL и Bot API внутри него
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        stats = UpdateStats()
+        token = current_update.set(stats)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            record_update(stats, time.perf_counter() - started)
+            current_update.reset(token)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        started = time.perf_counter()
+        try:
+            response = await make_request(bot, method)
+        except Exception as e:
+            record_api_call(type(method).__name__, time.perf_counter() - started, type(e).__name__)
+            raise
+        record_api_call(type(method).__name__, time.perf_counter() - started)
+        return response
+
+
+def setup_metrics(dp: Dispatcher):
+    # Имя хендлера в статистику пишет общий HandlerNameMiddleware (app.middlewares.handler_name)
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.services.metrics import scheduler_backlog, scheduler_dropped, scheduler_running, scheduler_wait
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateScheduler(BaseMiddleware):
+    # Самый первый внешний middleware на update, раньше встроенных ErrorsMiddleware, UserContextMiddleware
+    # и FSMContextMiddleware: состояние FSM читается уже внутри очереди чата, после предыдущего апдейта.
+    # Апдейт не обрабатывается в вызывающей задаче, а ставится в план:
+    #  * апдейты одного чата выполняются строго по очереди (каждый ждёт предыдущий);
+    #  * разные чаты идут параллельно, но не больше max_concurrent одновременно;
+    #  * запланировано (ждут + выполняются) не больше max_backlog — дальше вызывающий ждёт;
+    #  * от одного чата в плане не больше max_per_chat — лишние апдейты отбрасываются сразу, до
+    #    антифлуда и без обращения к Bot API, иначе один флудящий чат занял бы весь бэклог.
+    # Поэтому polling запускается с handle_as_tasks=False: при полном бэклоге цикл перестаёт
+    # забирать getUpdates, а в webhook-режиме заполняется очередь воркеров и Telegram получает 429.
+    def __init__(self, max_concurrent: int = 100, max_backlog: int = 1000, max_per_chat: int = 20):
+        self.max_concurrent = max_concurrent
+        self.max_backlog = max_backlog
+        self.max_per_chat = max_per_chat
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._backlog = asyncio.Semaphore(max_backlog)
+        self._chains: dict[Hashable, asyncio.Task] = {}  # чат -> последний запланированный апдейт
+        self._queued: dict[Hashable, int] = {}  # чат -> апдейтов в плане, включая ждущих места в бэклоге
+        self._tasks: set[asyncio.Task] = set()
+        self.pending = 0
+        self.running = 0
+
+    @staticmethod
+    def _chat_key(update: Update) -> Optional[Hashable]:
+        # event_chat и event_from_user в data ещё нет: UserContextMiddleware выполняется после нас
+        chat, user, _ = UserContextMiddleware.resolve_event_context(update)
+        if chat is not None:
+            return chat.id
+        return ("user", user.id) if user is not None else None
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = self._chat_key(event)
+        if key is not None:
+            queued = self._queued.get(key, 0)
+            if queued >= self.max_per_chat:
+                scheduler_dropped.inc()
+                return None
+            self._queued[key] = queued + 1
+        try:
+            await self._backlog.acquire()
+        except BaseException:
+            self._release_chat(key)
+            raise
+        self.pending += 1
+        scheduler_backlog.set(self.pending)
+
+        previous = self._chains.get(key) if key is not None else None
+        task = asyncio.create_task(self._run(previous, handler, event, data, time.perf_counter()))
+        self._tasks.add(task)
+        if key is not None:
+            self._chains[key] = task
+        task.add_done_callback(lambda t: self._finished(key, t))
+
+    def _release_chat(self, key: Optional[Hashable]):
+        if key is None:
+            return
+        queued = self._queued[key] - 1
+        if queued:
+            self._queued[key] = queued
+        else:
+            del self._queued[key]
+
+    def _finished(self, key: Optional[Hashable], task: asyncio.Task):
+        self._tasks.discard(task)
+        if key is not None and self._chains.get(key) is task:
+            del self._chains[key]
+        self._release_chat(key)
+        self.pending -= 1
+        scheduler_backlog.set(self.pending)
+        self._backlog.release()
+
+    async def _run(self, previous: Optional[asyncio.Task], handler, event: TelegramObject, data: Dict[str, Any], enqueued: float):
+        if previous is not None:
+            # Ждём завершения, но не исключение предыдущего апдейта
+            await asyncio.wait([previous])
+        async with self._slots:
+            scheduler_wait.observe(time.perf_counter() - enqueued)
+            self.running += 1
+            scheduler_running.set(self.running)
+            try:
+                # Ошибки хендлеров до роутеров dp.errors доводит встроенный ErrorsMiddleware внутри цепочки
+                await handler(event, data)
+            except Exception:
+                logger.exception("Необработанная ошибка в апдейте %s", getattr(event, "update_id", None))
+            finally:
+                self.running -= 1
+                scheduler_running.set(self.running)
+
+    async def drain(self, timeout: float = 10):
+        # Дорабатывает запланированные апдейты при остановке
+        if self._tasks:
+            done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            if pending:
+                logger.warning("Планировщик остановлен, не завершено апдейтов: %d", len(pending))
+                for task in pending:
+                    task.cancel()
+
+
+def setup_scheduler(dp: Dispatcher, max_concurrent: int, max_backlog: int, max_per_chat: int = 20) -> UpdateScheduler:
+    scheduler = UpdateScheduler(max_concurrent=max_concurrent, max_backlog=max_backlog, max_per_chat=max_per_chat)
+    # У менеджера middleware нет вставки в начало: снимаем уже зарегистрированные (встроенные
+    # middleware диспетчера) и возвращаем их после планировщика
+    registered = list(dp.update.outer_middleware)
+    for middleware in registered:
+        dp.update.outer_middleware.unregister(middleware)
+    dp.update.outer_middleware(scheduler)
+    for middleware in registered:
+        dp.update.outer_middleware(middleware)
+    dp["scheduler"] = scheduler
+    return scheduler
@@ -0,0 +1,81 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from app.services.cache import LRUCache
+from app.services.metrics import throttled_updates
+
+DEFAULT_ACTION = "default"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    # Токен-бакет на пару (пользователь, действие). Действие задаётся флагом хендлера:
+    #   @router.message(..., flags={"throttle": "catalog"})
+    # Хендлеры без флага попадают в DEFAULT_ACTION. Состояние — ограниченный LRU:
+    # бакет простоявшего idle_ttl пользователя и так полон, поэтому его можно просто забыть.
+    def __init__(
+        self,
+        policies: Dict[str, tuple[float, float]],
+        exempt_ids: Iterable[int] = (),
+        maxsize: int = 50_000,
+        idle_ttl: float = 600,
+    ):
+        self.policies = policies  # действие -> (токенов в секунду, размер бакета)
+        self.exempt_ids = frozenset(exempt_ids)
+        self._buckets = LRUCache(maxsize=maxsize, ttl=idle_ttl)
+
+    def _allow(self, key: tuple[int, str], rate: float, burst: float) -> tuple[bool, bool]:
+        # Возвращает (пропустить, предупредить): предупреждаем только о первом отказе подряд
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [burst, now, False]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        self._buckets.set(key, bucket)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True, False
+        warn = not bucket[2]
+        bucket[2] = True
+        return False, warn
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or user.id in self.exempt_ids:
+            return await handler(event, data)
+
+        action = get_flag(data, "throttle", default=DEFAULT_ACTION)
+        policy = self.policies.get(action) or self.policies.get(DEFAULT_ACTION)
+        if policy is None:
+            return await handler(event, data)
+
+        allowed, warn = self._allow((user.id, action), *policy)
+        if allowed:
+            return await handler(event, data)
+
+        throttled_updates.inc(1, action)
+        # Отказ без обращения к БД: у callback обязательно гасим "часики", сообщение — одно на серию
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Не так быстро, попробуйте через пару секунд.")
+        elif isinstance(event, Message) and warn:
+            await event.answer("⏳ Слишком много запросов, подождите немного.")
+        return None
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def setup_throttling(dp: Dispatcher, middleware: ThrottlingMiddleware):
+    dp.message.middleware(middleware)
+    dp.callback_query.middleware(middleware)
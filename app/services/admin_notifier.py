@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.config import load_config
+
+logger = logging.getLogger(__name__)
+
+ORDER = "order"
+QUESTION = "question"
+
+OPEN_BUTTONS = {
+    ORDER: InlineKeyboardButton(text="📦 Открыть заказы", callback_data="admin_open:orders"),
+    QUESTION: InlineKeyboardButton(text="💬 Открыть вопросы", callback_data="admin_open:questions"),
+}
+
+
+def plural(count: int, one: str, few: str, many: str) -> str:
+    if count % 10 == 1 and count % 100 != 11:
+        return one
+    if 2 <= count % 10 <= 4 and not 12 <= count % 100 <= 14:
+        return few
+    return many
+
+
+def render_digest(counts: dict[str, int]) -> str:
+    parts = []
+    if counts.get(ORDER):
+        n = counts[ORDER]
+        parts.append(f"{n} {plural(n, 'новый заказ', 'новых заказа', 'новых заказов')}")
+    if counts.get(QUESTION):
+        n = counts[QUESTION]
+        parts.append(f"{n} {plural(n, 'вопрос', 'вопроса', 'вопросов')}")
+    return "🔔 " + ", ".join(parts)
+
+
+class AdminNotifier:
+    # Уведомления админам уходят не из хендлера, а через очередь: фоновый диспетчер
+    # собирает события за окно window и шлёт каждому админу одно сообщение-дайджест.
+    def __init__(self, admin_ids: Iterable[int], window: float = 10.0, queue_size: int = 10_000):
+        self.admin_ids = list(admin_ids)
+        self.window = window
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._bot: Optional[Bot] = None
+        # Пачка, уже снятая с очереди, но ещё не отправленная; переживает отмену _run
+        self._batch: list[tuple[str, str]] = []
+
+    def notify(self, kind: str, text: str):
+        try:
+            self.queue.put_nowait((kind, text))
+        except asyncio.QueueFull:
+            logger.warning("Очередь уведомлений админам переполнена, событие %s потеряно", kind)
+
+    def start(self, bot: Bot):
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # То, что успело накопиться (включая прерванную пачку), отправляем перед выходом
+        batch, self._batch = self._batch, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._send(batch)
+
+    async def _run(self):
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = time.monotonic() + self.window
+            while (timeout := deadline - time.monotonic()) > 0:
+                try:
+                    self._batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._send(self._batch)
+            except Exception:
+                logger.exception("Ошибка отправки дайджеста админам")
+            # При отмене сюда не доходим — пачку дошлёт stop()
+            self._batch = []
+
+    async def _send(self, batch: list[tuple[str, str]]):
+        counts: dict[str, int] = {}
+        for kind, _ in batch:
+            counts[kind] = counts.get(kind, 0) + 1
+
+        if len(batch) == 1:
+            kind, text = batch[0]
+        else:
+            text = render_digest(counts)
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[OPEN_BUTTONS[kind]] for kind in counts if kind in OPEN_BUTTONS])
+        await asyncio.gather(*(self._send_to(admin_id, text, keyboard) for admin_id in self.admin_ids))
+
+    async def _send_to(self, admin_id: int, text: str, keyboard: InlineKeyboardMarkup):
+        try:
+            await self._bot.send_message(admin_id, text, reply_markup=keyboard, parse_mode="HTML")
+        except Exception as e:
+            logger.warning("Ошибка отправки админу %s: %s", admin_id, e)
+
+
+config = load_config()
+admin_notifier = AdminNotifier(config.admin_ids, window=config.admin_digest_window)
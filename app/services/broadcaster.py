@@ -0,0 +1,361 @@
+import asyncio
+import datetime
+import logging
+import time
+import uuid
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.db import AsyncSessionLocal
+from app.database.models import BroadcastDelivery, BroadcastJob, Subscriber
+from app.logging_config import BROADCAST_DELIVERY_LOGGER
+
+logger = logging.getLogger(__name__)
+# Поштучные результаты доставки; по умолчанию пишется выборка (см. log_sample_rates)
+delivery_logger = logging.getLogger(BROADCAST_DELIVERY_LOGGER)
+
+# Рассылку ведёт ровно один процесс: он записан в broadcast_jobs.owner и продлевает аренду
+# с каждой пачкой. Чужую рассылку можно забрать только после истечения аренды.
+RUNNER_ID = uuid.uuid4().hex
+LEASE = datetime.timedelta(minutes=10)
+
+
+class TokenBucket:
+    # Глобальный лимит Telegram (~30 сообщений/сек) + не чаще 1 сообщения/сек в один чат.
+    # RetryAfter ставит на паузу весь бакет, а не только один воркер.
+    def __init__(self, rate: float, capacity: Optional[float] = None, per_chat_interval: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.per_chat_interval = per_chat_interval
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._chat_last_sent: dict[int, float] = {}
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    def _forget_idle_chats(self, now: float):
+        self._chat_last_sent = {
+            chat_id: sent_at
+            for chat_id, sent_at in self._chat_last_sent.items()
+            if now - sent_at < self.per_chat_interval
+        }
+
+    async def acquire(self, chat_id: int):
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    chat_wait = self._chat_last_sent.get(chat_id, 0.0) + self.per_chat_interval - now
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if chat_wait > 0:
+                        wait = chat_wait
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        self._chat_last_sent[chat_id] = now
+                        if len(self._chat_last_sent) > 4096:
+                            self._forget_idle_chats(now)
+                        return
+                    else:
+                        wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class BroadcastStats:
+    def __init__(self, total: int, sent: int = 0, failed: int = 0, blocked: int = 0):
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self.blocked = blocked
+        self.started_at = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+
+def render_progress(stats: BroadcastStats, finished: bool = False, width: int = 20) -> str:
+    share = stats.processed / stats.total if stats.total else 1
+    filled = int(width * share)
+    bar = "█" * filled + "░" * (width - filled)
+    title = "✅ Рассылка завершена." if finished else "📤 Идёт рассылка..."
+    return (
+        f"{title}\n"
+        f"[{bar}] {int(share * 100)}%\n"
+        f"Отправлено: {stats.sent} из {stats.total}\n"
+        f"Заблокировали бота: {stats.blocked}\n"
+        f"Ошибок: {stats.failed}\n"
+        f"⏱ {int(time.monotonic() - stats.started_at)} сек."
+    )
+
+
+def is_unreachable(error: Exception) -> bool:
+    if isinstance(error, TelegramForbiddenError):
+        return True
+    if isinstance(error, TelegramBadRequest):
+        message = str(error).lower()
+        return "chat not found" in message or "user is deactivated" in message
+    return False
+
+
+class Broadcaster:
+    # Рассылка хранится в broadcast_jobs: подписчики читаются пачками по user_id (keyset),
+    # перед отправкой пачка фиксируется в broadcast_deliveries вместе с чекпоинтом last_user_id.
+    # После рестарта получатели в статусе "sending" помечаются "unknown" и повторно не отправляются.
+    # Чекпоинт сдвигается только владельцем и только с ожидаемого значения (compare-and-set), а
+    # отправляется лишь тем, чью строку в broadcast_deliveries вставила именно эта пачка.
+    def __init__(
+        self,
+        bot: Bot,
+        job: BroadcastJob,
+        *,
+        workers: int = 20,
+        rate: float = 25,
+        chunk_size: int = 500,
+        progress_interval: float = 3.0,
+        max_retries: int = 3,
+    ):
+        self.bot = bot
+        self.job_id = job.id
+        self.text = job.text
+        self.last_user_id = job.last_user_id or 0
+        self.progress_chat_id = job.admin_chat_id
+        self.progress_message_id = job.progress_message_id
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.max_retries = max_retries
+        self.stats = BroadcastStats(job.total or 0, job.sent or 0, job.failed or 0, job.blocked or 0)
+        self.lost = False  # рассылку перехватил другой процесс
+        self._results: dict[int, str] = {}
+
+    async def run(self) -> BroadcastStats:
+        progress = asyncio.create_task(self._report_progress())
+        try:
+            while True:
+                chat_ids = await self._claim_chunk()
+                if chat_ids is None:
+                    break
+                if chat_ids:
+                    await self._send_chunk(chat_ids)
+                    await self._save_results()
+            if self.lost:
+                logger.warning("Рассылку #%s продолжает другой процесс", self.job_id)
+                return self.stats
+            await self._finish()
+        finally:
+            progress.cancel()
+            await asyncio.gather(progress, return_exceptions=True)
+        await self._edit_progress(finished=True)
+        return self.stats
+
+    async def _claim_chunk(self) -> Optional[list[int]]:
+        # None — подписчики кончились или рассылку забрал другой процесс (self.lost);
+        # пустой список — вся пачка уже была взята раньше, идём дальше
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Subscriber.user_id)
+                .where(Subscriber.subscribed == True, Subscriber.user_id > self.last_user_id)
+                .order_by(Subscriber.user_id)
+                .limit(self.chunk_size)
+            )
+            chat_ids = result.scalars().all()
+            if not chat_ids:
+                return None
+            moved = await session.execute(
+                update(BroadcastJob)
+                .where(
+                    BroadcastJob.id == self.job_id,
+                    BroadcastJob.status == "running",
+                    BroadcastJob.owner == RUNNER_ID,
+                    BroadcastJob.last_user_id == self.last_user_id,
+                )
+                .values(last_user_id=chat_ids[-1], lease_until=datetime.datetime.utcnow() + LEASE)
+            )
+            if moved.rowcount == 0:
+                await session.rollback()
+                self.lost = True
+                return None
+            result = await session.execute(
+                insert(BroadcastDelivery)
+                .values([{"job_id": self.job_id, "user_id": chat_id, "status": "sending"} for chat_id in chat_ids])
+                .on_conflict_do_nothing()
+                .returning(BroadcastDelivery.user_id)
+            )
+            claimed = result.scalars().all()
+            await session.commit()
+        self.last_user_id = chat_ids[-1]
+        return claimed
+
+    async def _send_chunk(self, chat_ids: list[int]):
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(chat_id)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.workers, len(chat_ids)))]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            chat_id = await queue.get()
+            try:
+                self._results[chat_id] = await self._deliver(chat_id)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, chat_id: int) -> str:
+        for _ in range(self.max_retries):
+            await self.bucket.acquire(chat_id)
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=self.text, parse_mode="HTML")
+                self.stats.sent += 1
+                delivery_logger.debug("Доставлено", extra={"job_id": self.job_id, "chat_id": chat_id})
+                return "sent"
+            except TelegramRetryAfter as e:
+                self.bucket.pause(e.retry_after)
+            except Exception as e:
+                if is_unreachable(e):
+                    self.stats.blocked += 1
+                    delivery_logger.info("Подписчик недоступен", extra={"job_id": self.job_id, "chat_id": chat_id})
+                    return "blocked"
+                self.stats.failed += 1
+                delivery_logger.warning("Ошибка отправки подписчику: %s", e, extra={"job_id": self.job_id, "chat_id": chat_id})
+                return "failed"
+        self.stats.failed += 1
+        return "failed"
+
+    async def _save_results(self):
+        results, self._results = self._results, {}
+        by_status: dict[str, list[int]] = {}
+        for chat_id, status in results.items():
+            by_status.setdefault(status, []).append(chat_id)
+
+        async with AsyncSessionLocal() as session:
+            for status, chat_ids in by_status.items():
+                await session.execute(
+                    update(BroadcastDelivery)
+                    .where(BroadcastDelivery.job_id == self.job_id, BroadcastDelivery.user_id.in_(chat_ids))
+                    .values(status=status, updated_at=datetime.datetime.utcnow())
+                )
+            if by_status.get("blocked"):
+                await session.execute(
+                    update(Subscriber).where(Subscriber.user_id.in_(by_status["blocked"])).values(subscribed=False)
+                )
+            # Счётчики прибавляются, а не перезаписываются: после перехвата рассылки их продолжает
+            # другой процесс, а эта пачка досохраняет свои результаты
+            await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == self.job_id)
+                .values(
+                    sent=BroadcastJob.sent + len(by_status.get("sent", ())),
+                    failed=BroadcastJob.failed + len(by_status.get("failed", ())),
+                    blocked=BroadcastJob.blocked + len(by_status.get("blocked", ())),
+                )
+            )
+            await session.commit()
+
+    async def _finish(self):
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == self.job_id, BroadcastJob.owner == RUNNER_ID)
+                .values(status="done", finished_at=datetime.datetime.utcnow())
+            )
+            await session.commit()
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self._edit_progress()
+
+    async def _edit_progress(self, finished: bool = False):
+        if self.progress_chat_id is None or self.progress_message_id is None:
+            return
+        try:
+            await self.bot.edit_message_text(
+                text=render_progress(self.stats, finished=finished),
+                chat_id=self.progress_chat_id,
+                message_id=self.progress_message_id,
+            )
+        except TelegramRetryAfter as e:
+            self.bucket.pause(e.retry_after)
+        except TelegramBadRequest:
+            # "message is not modified" — прогресс не изменился с прошлого раза
+            pass
+
+
+async def create_job(text: str, admin_chat_id: int, progress_message_id: int) -> Optional[BroadcastJob]:
+    async with AsyncSessionLocal() as session:
+        total = await session.scalar(
+            select(func.count()).select_from(Subscriber).where(Subscriber.subscribed == True)
+        )
+        if not total:
+            return None
+        job = BroadcastJob(
+            text=text,
+            admin_chat_id=admin_chat_id,
+            progress_message_id=progress_message_id,
+            total=total,
+            owner=RUNNER_ID,
+            lease_until=datetime.datetime.utcnow() + LEASE,
+        )
+        session.add(job)
+        await session.commit()
+        return job
+
+
+_running: set[asyncio.Task] = set()
+
+
+def start_broadcast(broadcaster: Broadcaster) -> asyncio.Task:
+    task = asyncio.create_task(broadcaster.run())
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+async def resume_broadcasts(bot: Bot, **options) -> int:
+    # Вызывается при старте: незавершённые рассылки продолжаются с чекпоинта. Забираются только
+    # рассылки без живого владельца — при rolling deploy старый процесс ещё ведёт свои.
+    now = datetime.datetime.utcnow()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(BroadcastJob)
+            .where(
+                BroadcastJob.status == "running",
+                or_(BroadcastJob.lease_until.is_(None), BroadcastJob.lease_until < now),
+            )
+            .values(owner=RUNNER_ID, lease_until=now + LEASE)
+            .returning(BroadcastJob)
+        )
+        jobs = result.scalars().all()
+        if jobs:
+            # Неизвестно, ушло ли сообщение до падения — повторно не отправляем
+            await session.execute(
+                update(BroadcastDelivery)
+                .where(
+                    BroadcastDelivery.job_id.in_([job.id for job in jobs]),
+                    BroadcastDelivery.status == "sending",
+                )
+                .values(status="unknown", updated_at=datetime.datetime.utcnow())
+            )
+            await session.commit()
+
+    for job in jobs:
+        logger.info("Возобновление рассылки #%s с user_id > %s", job.id, job.last_user_id)
+        start_broadcast(Broadcaster(bot, job, **options))
+    return len(jobs)
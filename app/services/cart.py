@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+
+from aiogram.fsm.context import FSMContext
+
+from app.database.functions import get_products_by_ids
+
+CART_KEY = "cart"
+
+
+@dataclass(frozen=True, slots=True)
+class CartLine:
+    product_id: int
+    name: str
+    price: int
+    quantity: int
+
+    @property
+    def amount(self) -> int:
+        return self.price * self.quantity
+
+
+def normalize_cart(raw) -> dict[int, int]:
+    # В состоянии корзина хранится как {"<product_id>": quantity} (ключи JSON — строки).
+    # Старый формат — список словарей с товаром на каждое нажатие — сворачивается в количества.
+    if isinstance(raw, dict):
+        return {int(product_id): int(quantity) for product_id, quantity in raw.items() if int(quantity) > 0}
+    cart: dict[int, int] = {}
+    for item in raw or []:
+        product_id = int(item["id"])
+        cart[product_id] = cart.get(product_id, 0) + int(item.get("quantity", 1))
+    return cart
+
+
+async def get_cart(state: FSMContext) -> dict[int, int]:
+    return normalize_cart((await state.get_data()).get(CART_KEY))
+
+
+async def change_quantity(state: FSMContext, product_id: int, delta: int = 1) -> dict[int, int]:
+    update_counter = getattr(state.storage, "update_counter", None)
+    if update_counter is not None:
+        data = await update_counter(state.key, CART_KEY, str(product_id), delta)
+        return normalize_cart(data.get(CART_KEY))
+
+    # MemoryStorage: get/update выполняются без переключения event loop, поэтому тоже атомарны
+    cart = await get_cart(state)
+    quantity = cart.get(product_id, 0) + delta
+    if quantity > 0:
+        cart[product_id] = quantity
+    else:
+        cart.pop(product_id, None)
+    await state.update_data({CART_KEY: {str(pid): qty for pid, qty in cart.items()}})
+    return cart
+
+
+async def resolve_cart(cart: dict[int, int]) -> list[CartLine]:
+    # Имена и цены берутся из базы на момент показа/оформления — удалённые товары выпадают
+    products = await get_products_by_ids(cart.keys())
+    return [
+        CartLine(product_id, products[product_id].name, products[product_id].price, quantity)
+        for product_id, quantity in sorted(cart.items())
+        if product_id in products
+    ]
+
+
+def cart_total(lines: list[CartLine]) -> int:
+    return sum(line.amount for line in lines)
+
+
+def render_lines(lines: list[CartLine]) -> str:
+    return "\n".join(
+        f"• {line.name} – {line.price} грн" if line.quantity == 1
+        else f"• {line.name} – {line.price} грн × {line.quantity}"
+        for line in lines
+    )
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.services.catalog_cache import CachedProduct, catalog_cache
+
+
+async def get_product_count() -> int:
+    return await catalog_cache.count()
+
+
+async def get_neighbour(product_id: int = 0, direction: str = "next") -> Optional[CachedProduct]:
+    # Keyset-навигация по Product.id поверх кэша каталога, без OFFSET и без запросов к БД.
+    return await catalog_cache.neighbour(product_id, direction)
+
+
+async def get_page(product_id: int, direction: str, position: int) -> tuple[Optional[CachedProduct], int, int]:
+    total = await get_product_count()
+    product = await get_neighbour(product_id, direction)
+    if product:
+        position += 1 if direction == "next" else -1
+    else:
+        # Листаем по кругу: после последнего товара — первый и наоборот
+        product = await get_neighbour(0, "next") if direction == "next" else await catalog_cache.last()
+        position = 1 if direction == "next" else total
+    return product, max(1, min(position, total)), total
+
+
+def product_caption(product: CachedProduct) -> str:
+    return (
+        f"<b>{product.name}</b>\n"
+        f"💰 Цена: {product.price} грн"
+    )
+
+
+def carousel_keyboard(product: CachedProduct, position: int, total: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="◀️", callback_data=f"catalog:prev:{product.id}:{position}"),
+            InlineKeyboardButton(text=f"{position} / {total}", callback_data="catalog:noop"),
+            InlineKeyboardButton(text="▶️", callback_data=f"catalog:next:{product.id}:{position}"),
+        ],
+        [InlineKeyboardButton(text="🛒 В корзину", callback_data=f"add_to_cart:{product.id}")]
+    ])
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.config import load_config
+from app.database.db import AsyncSessionLocal
+from app.database.models import Product
+
+
+@dataclass(frozen=True, slots=True)
+class CachedProduct:
+    id: int
+    name: str
+    price: int
+    photo: str
+
+
+class CatalogCache:
+    # Весь каталог в памяти: товары по id и список id в порядке показа.
+    # Админские изменения вызывают invalidate(); TTL страхует от изменений в обход бота.
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._by_id: dict[int, CachedProduct] = {}
+        self._ids: list[int] = []
+        self._loaded_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_version == self.version and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _ensure_loaded(self):
+        if self._is_fresh():
+            self.hits += 1
+            return
+        self.misses += 1
+        async with self._lock:
+            if self._is_fresh():
+                return
+            version = self.version
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(Product.id, Product.name, Product.price, Product.photo).order_by(Product.id)
+                )
+                products = [CachedProduct(*row) for row in result.all()]
+            self._by_id = {product.id: product for product in products}
+            self._ids = [product.id for product in products]
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+
+    async def get(self, product_id: int) -> Optional[CachedProduct]:
+        await self._ensure_loaded()
+        return self._by_id.get(product_id)
+
+    async def count(self) -> int:
+        await self._ensure_loaded()
+        return len(self._ids)
+
+    async def neighbour(self, product_id: int, direction: str = "next") -> Optional[CachedProduct]:
+        await self._ensure_loaded()
+        if direction == "next":
+            index = bisect_right(self._ids, product_id)
+            return self._by_id[self._ids[index]] if index < len(self._ids) else None
+        index = bisect_left(self._ids, product_id) - 1
+        return self._by_id[self._ids[index]] if index >= 0 else None
+
+    async def last(self) -> Optional[CachedProduct]:
+        await self._ensure_loaded()
+        return self._by_id[self._ids[-1]] if self._ids else None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "products": len(self._ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "age": time.monotonic() - self._loaded_at if self._loaded_version is not None else None,
+        }
+
+
+catalog_cache = CatalogCache(ttl=load_config().catalog_cache_ttl)
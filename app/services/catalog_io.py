@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+from sqlalchemy import select, func, literal_column, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.database.db import AsyncSessionLocal
+from app.database.models import Product
+
+FIELDS = ("sku", "name", "price", "photo")
+# asyncpg ограничивает число параметров в запросе (32767): 4 поля × 1000 строк с запасом
+UPSERT_CHUNK = 1000
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class ProductRow:
+    sku: str
+    name: str
+    price: int
+    photo: Optional[str] = None
+
+
+@dataclass
+class ImportResult:
+    rows: int
+    inserted: int
+    updated: int
+    duration: float
+
+
+def _row_from_dict(number: int, raw: dict) -> ProductRow:
+    sku = str(raw.get("sku") or "").strip()
+    name = str(raw.get("name") or "").strip()
+    price = str(raw.get("price") if raw.get("price") is not None else "").strip()
+    photo = str(raw.get("photo") or "").strip() or None
+    if not sku:
+        raise CatalogImportError(f"строка {number}: не указан sku")
+    if len(name) < 2:
+        raise CatalogImportError(f"строка {number}: некорректное название")
+    if not price.isdigit():
+        raise CatalogImportError(f"строка {number}: цена должна быть целым числом")
+    return ProductRow(sku=sku, name=name, price=int(price), photo=photo)
+
+
+def parse_products(filename: str, content: bytes) -> list[ProductRow]:
+    # CSV (с заголовком sku,name,price,photo; разделитель , или ;) либо JSON-массив объектов.
+    # Повторяющийся sku — побеждает последняя строка: один upsert не может дважды тронуть одну строку.
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise CatalogImportError("файл должен быть в кодировке UTF-8") from e
+
+    if filename.lower().endswith(".json"):
+        try:
+            raw_rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise CatalogImportError(f"некорректный JSON: {e}") from e
+        if not isinstance(raw_rows, list) or not all(isinstance(r, dict) for r in raw_rows):
+            raise CatalogImportError("JSON должен быть массивом объектов")
+        first_number = 1
+    elif filename.lower().endswith(".csv"):
+        try:
+            dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+        missing = {"sku", "name", "price"} - set(reader.fieldnames or ())
+        if missing:
+            raise CatalogImportError(f"в заголовке нет колонок: {', '.join(sorted(missing))}")
+        raw_rows = list(reader)
+        first_number = 2
+    else:
+        raise CatalogImportError("поддерживаются только файлы .csv и .json")
+
+    rows: dict[str, ProductRow] = {}
+    for number, raw in enumerate(raw_rows, start=first_number):
+        row = _row_from_dict(number, raw)
+        rows[row.sku] = row
+    if not rows:
+        raise CatalogImportError("в файле нет товаров")
+    return list(rows.values())
+
+
+async def import_products(rows: list[ProductRow]) -> ImportResult:
+    started = time.perf_counter()
+    inserted = updated = 0
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            # Новому товару нужно фото: без него карусель каталога не покажет карточку
+            existing = set((await session.execute(
+                select(Product.sku).where(
+                    Product.sku == any_(bindparam("skus", [row.sku for row in rows], type_=ARRAY(String)))
+                )
+            )).scalars().all())
+            without_photo = [row.sku for row in rows if row.sku not in existing and not row.photo]
+            if without_photo:
+                raise CatalogImportError(f"у новых товаров нет фото: {', '.join(without_photo[:10])}")
+
+            for start in range(0, len(rows), UPSERT_CHUNK):
+                chunk = rows[start:start + UPSERT_CHUNK]
+                stmt = insert(Product).values([asdict(row) for row in chunk])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Product.sku],
+                    set_={
+                        "name": stmt.excluded.name,
+                        "price": stmt.excluded.price,
+                        # Пустое фото в файле — оставляем уже загруженный file_id
+                        "photo": func.coalesce(stmt.excluded.photo, Product.photo),
+                    },
+                ).returning(literal_column("(xmax = 0)").label("inserted"))
+                flags = (await session.execute(stmt)).scalars().all()
+                inserted += sum(1 for flag in flags if flag)
+                updated += sum(1 for flag in flags if not flag)
+    return ImportResult(rows=len(rows), inserted=inserted, updated=updated, duration=time.perf_counter() - started)
+
+
+async def export_products(fmt: str = "csv") -> tuple[bytes, int]:
+    # Строки читаются серверным курсором, без списка ORM-объектов, но файл целиком собирается
+    # в памяти: подпись с количеством нужна до отправки, а соединение не держим на время загрузки
+    buffer = io.StringIO()
+    count = 0
+    query = select(Product.sku, Product.name, Product.price, Product.photo).order_by(Product.id)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=500))
+        if fmt == "json":
+            buffer.write("[\n")
+            async for row in result:
+                buffer.write((",\n" if count else "") + json.dumps(dict(row._mapping), ensure_ascii=False))
+                count += 1
+            buffer.write("\n]\n")
+        else:
+            writer = csv.writer(buffer)
+            writer.writerow(FIELDS)
+            async for row in result:
+                writer.writerow(tuple(row))
+                count += 1
+    return buffer.getvalue().encode("utf-8"), count
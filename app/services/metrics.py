@@ -0,0 +1,218 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Границы корзин в секундах: от быстрых запросов в БД до медленных апдейтов
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    # Минимальная гистограмма в духе Prometheus: счётчики по корзинам для каждого набора меток
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # метки -> [counts по корзинам, sum, count]
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def series(self) -> dict[tuple, tuple[list[int], float, int]]:
+        return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        # Оценка по корзинам с линейной интерполяцией, как histogram_quantile в Prometheus
+        series = self._series.get(label_values)
+        if not series or not series[2]:
+            return None
+        counts, _, count = series
+        rank = q * count
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in self._series.items():
+            pairs = [f'{name}="{value}"' for name, value in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = ",".join([*pairs, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            suffix = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, value: float = 1, *label_values: str):
+        self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def get(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in self._values.items():
+            pairs = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{pairs}}} {value}" if pairs else f"{self.name} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+update_duration = Histogram("bot_update_duration_seconds", "Время обработки апдейта", ("handler",))
+handler_db_queries = Counter("bot_handler_db_queries_total", "SQL-запросы внутри хендлера", ("handler",))
+handler_db_seconds = Counter("bot_handler_db_seconds_total", "Время SQL-запросов внутри хендлера", ("handler",))
+handler_api_calls = Counter("bot_handler_api_calls_total", "Вызовы Bot API внутри хендлера", ("handler",))
+handler_api_seconds = Counter("bot_handler_api_seconds_total", "Время вызовов Bot API внутри хендлера", ("handler",))
+db_query_duration = Histogram("db_query_duration_seconds", "Время SQL-запроса")
+api_request_duration = Histogram("bot_api_request_duration_seconds", "Время вызова Bot API", ("method",))
+api_errors = Counter("bot_api_errors_total", "Ошибки Bot API", ("method", "error"))
+throttled_updates = Counter("bot_throttled_updates_total", "Апдейты, отклонённые антифлудом", ("action",))
+scheduler_backlog = Gauge("bot_scheduler_backlog", "Запланированные апдейты: ждут очереди чата или слота + выполняются")
+scheduler_running = Gauge("bot_scheduler_running", "Апдейты, выполняющиеся прямо сейчас")
+scheduler_wait = Histogram("bot_scheduler_wait_seconds", "Ожидание апдейта в планировщике до начала обработки")
+scheduler_dropped = Counter("bot_scheduler_dropped_total", "Апдейты, отброшенные сверх лимита очереди одного чата")
+
+METRICS = (
+    update_duration, handler_db_queries, handler_db_seconds, handler_api_calls, handler_api_seconds,
+    db_query_duration, api_request_duration, api_errors, throttled_updates,
+    scheduler_backlog, scheduler_running, scheduler_wait, scheduler_dropped,
+)
+
+
+class UpdateStats:
+    __slots__ = ("handler", "db_queries", "db_time", "api_calls", "api_time")
+
+    def __init__(self):
+        self.handler = "unhandled"
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.api_calls = 0
+        self.api_time = 0.0
+
+
+# Статистика текущего апдейта; SQLAlchemy переносит контекст в свой greenlet, так что
+# события движка видят тот же объект, что и middleware
+current_update: ContextVar[Optional[UpdateStats]] = ContextVar("current_update", default=None)
+
+
+def record_update(stats: UpdateStats, duration: float):
+    update_duration.observe(duration, stats.handler)
+    handler_db_queries.inc(stats.db_queries, stats.handler)
+    handler_db_seconds.inc(stats.db_time, stats.handler)
+    handler_api_calls.inc(stats.api_calls, stats.handler)
+    handler_api_seconds.inc(stats.api_time, stats.handler)
+
+
+def record_api_call(method: str, duration: float, error: Optional[str] = None):
+    api_request_duration.observe(duration, method)
+    if error:
+        api_errors.inc(1, method, error)
+    stats = current_update.get()
+    if stats is not None:
+        stats.api_calls += 1
+        stats.api_time += duration
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    db_query_duration.observe(duration)
+    stats = current_update.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_time += duration
+
+
+def _handle_error(context):
+    # Упавший запрос не доходит до after_cursor_execute: снимаем его отметку, иначе
+    # следующий запрос на этом соединении получит чужое время старта
+    if context.connection is not None and context.execution_context is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: Engine):
+    # Для AsyncEngine передаётся engine.sync_engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def handler_summary() -> list[dict]:
+    rows = []
+    for (handler,), (_, total, count) in update_duration.series().items():
+        rows.append({
+            "handler": handler,
+            "count": count,
+            "avg_ms": total / count * 1000,
+            "p95_ms": (update_duration.quantile(0.95, handler) or 0.0) * 1000,
+            "db_queries": handler_db_queries.get(handler) / count,
+            "db_ms": handler_db_seconds.get(handler) / count * 1000,
+            "api_calls": handler_api_calls.get(handler) / count,
+            "api_ms": handler_api_seconds.get(handler) / count * 1000,
+        })
+    return sorted(rows, key=lambda row: row["avg_ms"] * row["count"], reverse=True)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    # Метрики отдаются отдельным маленьким aiohttp-сервером, не на публичном порту вебхука
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,32 @@
+from sqlalchemy import select
+
+from app.config import load_config
+from app.database.db import AsyncSessionLocal
+from app.database.models import OrderSummary
+from app.services.cache import LRUCache
+
+config = load_config()
+
+# Последние заказы пользователя по user_id. Сбрасывается при новом заказе и действиях админа;
+# TTL ограничивает устаревание, если заказ изменили из другого процесса бота.
+_cache = LRUCache(maxsize=config.my_orders_cache_size, ttl=config.my_orders_cache_ttl)
+
+
+async def get_recent_orders(user_id: int) -> list[OrderSummary]:
+    summaries = _cache.get(user_id)
+    if summaries is not None:
+        return summaries
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(OrderSummary)
+            .where(OrderSummary.user_id == user_id)
+            .order_by(OrderSummary.order_id.desc())
+            .limit(config.my_orders_limit)
+        )
+        summaries = result.scalars().all()
+    _cache.set(user_id, summaries)
+    return summaries
+
+
+def invalidate(user_id: int):
+    _cache.pop(user_id)
@@ -0,0 +1,155 @@
+import asyncio
+import datetime
+import logging
+import random
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from sqlalchemy import text, update
+
+from app.config import load_config
+from app.database.db import AsyncSessionLocal
+from app.database.models import OutboxMessage
+from app.services.broadcaster import is_unreachable
+
+logger = logging.getLogger(__name__)
+
+# Берём только "голову" каждого чата — самое раннее неотправленное сообщение, поэтому порядок
+# внутри чата сохраняется даже при повторах. Захват — это аренда: next_attempt_at сдвигается
+# на lease, транзакция сразу коммитится, и отправка идёт без открытого соединения с БД.
+_CLAIM_SQL = text("""
+    UPDATE outbox_messages AS o
+    SET next_attempt_at = :lease_until, attempts = o.attempts + 1
+    WHERE o.id IN (
+        SELECT h.id FROM outbox_messages AS h
+        WHERE h.status = 'pending' AND h.next_attempt_at <= :now
+          AND NOT EXISTS (
+              SELECT 1 FROM outbox_messages AS p
+              WHERE p.chat_id = h.chat_id AND p.status = 'pending' AND p.id < h.id
+          )
+        ORDER BY h.id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.id, o.chat_id, o.text, o.parse_mode, o.attempts
+""")
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        batch_size: int = 50,
+        interval: float = 2.0,
+        max_attempts: int = 8,
+        backoff_base: float = 5.0,
+        backoff_max: float = 600.0,
+        lease: float = 60.0,
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def start(self, bot: Bot):
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        # Вызывается после коммита, чтобы не ждать следующего интервала
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.relay_once()
+            except Exception:
+                logger.exception("Ошибка прохода outbox")
+                claimed = 0
+            if claimed == self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def relay_once(self) -> int:
+        now = datetime.datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(_CLAIM_SQL, {
+                "now": now,
+                "lease_until": now + datetime.timedelta(seconds=self.lease),
+                "limit": self.batch_size,
+            })
+            messages = result.all()
+            await session.commit()
+        if not messages:
+            return 0
+
+        # В пачке не больше одного сообщения на чат, так что отправляем параллельно
+        outcomes = await asyncio.gather(*(self._send(message) for message in messages))
+        await self._save(messages, outcomes)
+        return len(messages)
+
+    async def _send(self, message) -> tuple[str, Optional[str], float]:
+        # (статус, ошибка, задержка до повтора)
+        try:
+            await self._bot.send_message(message.chat_id, message.text, parse_mode=message.parse_mode)
+            return "sent", None, 0.0
+        except TelegramRetryAfter as e:
+            return "retry_after", str(e), float(e.retry_after)
+        except Exception as e:
+            if is_unreachable(e) or message.attempts >= self.max_attempts:
+                return "failed", str(e), 0.0
+            return "retry", str(e), self._backoff(message.attempts)
+
+    async def _save(self, messages, outcomes):
+        now = datetime.datetime.utcnow()
+        sent_ids = [message.id for message, (status, _, _) in zip(messages, outcomes, strict=True) if status == "sent"]
+        async with AsyncSessionLocal() as session:
+            if sent_ids:
+                await session.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id.in_(sent_ids))
+                    .values(status="sent", sent_at=now, last_error=None)
+                )
+            for message, (status, error, delay) in zip(messages, outcomes, strict=True):
+                if status == "sent":
+                    continue
+                values = {"last_error": error[:500]}
+                if status == "failed":
+                    values["status"] = "failed"
+                    logger.warning("Сообщение outbox %s в чат %s не отправлено: %s", message.id, message.chat_id, error)
+                else:
+                    values["next_attempt_at"] = now + datetime.timedelta(seconds=delay)
+                    if status == "retry_after":
+                        # Флуд-контроль — не ошибка сообщения, попытку не засчитываем
+                        values["attempts"] = OutboxMessage.attempts - 1
+                await session.execute(update(OutboxMessage).where(OutboxMessage.id == message.id).values(**values))
+            await session.commit()
+
+
+config = load_config()
+outbox_relay = OutboxRelay(
+    batch_size=config.outbox_batch_size,
+    interval=config.outbox_interval,
+    max_attempts=config.outbox_max_attempts,
+    backoff_base=config.outbox_backoff_base,
+)
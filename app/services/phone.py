@@ -0,0 +1,13 @@
+import re
+
+
+def normalize_phone(phone: str) -> str:
+    # Приводит украинские номера к виду 380XXXXXXXXX: "+380 50 123-45-67", "0501234567", "80501234567"
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 10 and digits.startswith("0"):
+        return "38" + digits
+    if len(digits) == 11 and digits.startswith("80"):
+        return "3" + digits
+    if len(digits) == 9:
+        return "380" + digits
+    return digits
@@ -0,0 +1,215 @@
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import load_config
+from app.database.db import get_engine
+from app.database.partitions import drop_empty_partitions, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Обслуживание партиций выполняет один процесс за раз
+LOCK_KEY = 7_340_025
+
+# Закрытые заказы: статус берём из read model, created_at ограничивает поиск старыми партициями
+_CLOSED_ORDERS = text("""
+    SELECT o.id, o.created_at FROM orders AS o
+    JOIN order_summaries AS s ON s.order_id = o.id
+    WHERE o.created_at < :cutoff AND s.status IN ('shipped', 'rejected')
+    ORDER BY o.created_at
+    LIMIT :limit
+""")
+
+_MOVE_ORDER_ITEMS = text("""
+    WITH moved AS (
+        DELETE FROM order_items AS i
+        USING unnest(CAST(:ids AS integer[]), CAST(:created AS timestamp[])) AS b (id, created_at)
+        WHERE i.order_id = b.id AND i.created_at = b.created_at AND i.created_at < :cutoff
+        RETURNING i.*
+    )
+    INSERT INTO order_items_archive SELECT * FROM moved
+""")
+
+_MOVE_ORDERS = text("""
+    WITH moved AS (
+        DELETE FROM orders AS o
+        USING unnest(CAST(:ids AS integer[]), CAST(:created AS timestamp[])) AS b (id, created_at)
+        WHERE o.id = b.id AND o.created_at = b.created_at AND o.created_at < :cutoff
+        RETURNING o.*
+    )
+    INSERT INTO orders_archive SELECT * FROM moved
+""")
+
+_MOVE_SUMMARIES = text("""
+    WITH moved AS (
+        DELETE FROM order_summaries WHERE order_id = ANY(CAST(:ids AS integer[]))
+        RETURNING *
+    )
+    INSERT INTO order_summaries_archive SELECT * FROM moved
+""")
+
+_MOVE_QUESTIONS = text("""
+    WITH moved AS (
+        DELETE FROM questions WHERE id IN (
+            SELECT id FROM questions
+            WHERE answered = true AND answered_at < :cutoff
+            ORDER BY answered_at
+            LIMIT :limit
+        )
+        RETURNING *
+    )
+    INSERT INTO questions_archive SELECT * FROM moved
+""")
+
+# Отклонённые отзывы админ удаляет сразу, поэтому в архив уходят так и не подтверждённые
+_MOVE_FEEDBACK = text("""
+    WITH moved AS (
+        DELETE FROM feedback WHERE id IN (
+            SELECT id FROM feedback
+            WHERE confirmed = false AND created_at < :cutoff
+            ORDER BY created_at
+            LIMIT :limit
+        )
+        RETURNING *
+    )
+    INSERT INTO feedback_archive SELECT * FROM moved
+""")
+
+# Отправленные и окончательно не доставленные сообщения outbox не архивируются, а удаляются:
+# после обработки они нужны только для разбора недавних сбоев
+_PURGE_OUTBOX = text("""
+    DELETE FROM outbox_messages WHERE id IN (
+        SELECT id FROM outbox_messages
+        WHERE status <> 'pending' AND created_at < :cutoff
+        ORDER BY created_at
+        LIMIT :limit
+    )
+""")
+
+
+async def archive_orders(conn: AsyncConnection, cutoff: datetime.datetime, limit: int) -> int:
+    batch = (await conn.execute(_CLOSED_ORDERS, {"cutoff": cutoff, "limit": limit})).all()
+    if not batch:
+        return 0
+    params = {
+        "ids": [row.id for row in batch],
+        "created": [row.created_at for row in batch],
+        "cutoff": cutoff,
+    }
+    # Позиции первыми: внешний ключ order_items -> orders. Read model уходит в той же транзакции,
+    # так что заказ не остаётся наполовину в архиве
+    await conn.execute(_MOVE_ORDER_ITEMS, params)
+    await conn.execute(_MOVE_ORDERS, params)
+    await conn.execute(_MOVE_SUMMARIES, {"ids": params["ids"]})
+    return len(batch)
+
+
+async def archive_questions(conn: AsyncConnection, cutoff: datetime.datetime, limit: int) -> int:
+    result = await conn.execute(_MOVE_QUESTIONS, {"cutoff": cutoff, "limit": limit})
+    return result.rowcount
+
+
+async def archive_feedback(conn: AsyncConnection, cutoff: datetime.datetime, limit: int) -> int:
+    result = await conn.execute(_MOVE_FEEDBACK, {"cutoff": cutoff, "limit": limit})
+    return result.rowcount
+
+
+async def purge_outbox(conn: AsyncConnection, cutoff: datetime.datetime, limit: int) -> int:
+    result = await conn.execute(_PURGE_OUTBOX, {"cutoff": cutoff, "limit": limit})
+    return result.rowcount
+
+
+class RetentionJob:
+    # Раз в interval: создаёт партиции на months_ahead месяцев вперёд, переносит холодные строки
+    # в *_archive пачками по batch_size (каждая — своя короткая транзакция), удаляет обработанные
+    # сообщения outbox и опустевшие старые партиции. Горячие запросы после этого видят только
+    # свежие и открытые строки.
+    def __init__(
+        self,
+        interval: float = 6 * 3600,
+        batch_size: int = 5000,
+        months_ahead: int = 3,
+        orders_after_days: int = 180,
+        questions_after_days: int = 90,
+        feedback_after_days: int = 90,
+        outbox_keep_days: int = 14,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.months_ahead = months_ahead
+        self.orders_after = datetime.timedelta(days=orders_after_days)
+        self.questions_after = datetime.timedelta(days=questions_after_days)
+        self.feedback_after = datetime.timedelta(days=feedback_after_days)
+        self.outbox_keep = datetime.timedelta(days=outbox_keep_days)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Ошибка обслуживания архива и партиций")
+            await asyncio.sleep(self.interval)
+
+    async def _maintain_partitions(self, action: Callable[[AsyncConnection], Awaitable[list[str]]]) -> list[str]:
+        async with get_engine().begin() as conn:
+            # DDL на родительской таблице ждёт блокировку; не держим за ней запросы бота
+            await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+            return await action(conn)
+
+    async def _drain(self, archive: Callable[[AsyncConnection, datetime.datetime, int], Awaitable[int]], cutoff: datetime.datetime) -> int:
+        total = 0
+        while True:
+            async with get_engine().begin() as conn:
+                moved = await archive(conn, cutoff, self.batch_size)
+            total += moved
+            if moved < self.batch_size:
+                return total
+
+    async def run_once(self) -> dict:
+        now = datetime.datetime.utcnow()
+        orders_cutoff = now - self.orders_after
+        stats = {
+            "created": await self._maintain_partitions(lambda conn: ensure_partitions(conn, now, self.months_ahead)),
+            "orders": await self._drain(archive_orders, orders_cutoff),
+            "questions": await self._drain(archive_questions, now - self.questions_after),
+            "feedback": await self._drain(archive_feedback, now - self.feedback_after),
+            "outbox": await self._drain(purge_outbox, now - self.outbox_keep),
+            "dropped": await self._maintain_partitions(lambda conn: drop_empty_partitions(conn, orders_cutoff)),
+        }
+        logger.info(
+            "Архивация: заказов %d, вопросов %d, отзывов %d; удалено сообщений outbox %d; партиции созданы %s, удалены %s",
+            stats["orders"], stats["questions"], stats["feedback"], stats["outbox"],
+            stats["created"] or "-", stats["dropped"] or "-",
+        )
+        return stats
+
+
+def create_retention_job() -> Optional[RetentionJob]:
+    config = load_config()
+    if not config.retention_enabled:
+        return None
+    return RetentionJob(
+        interval=config.retention_interval,
+        batch_size=config.retention_batch_size,
+        months_ahead=config.partitions_ahead_months,
+        orders_after_days=config.archive_orders_after_days,
+        questions_after_days=config.archive_questions_after_days,
+        feedback_after_days=config.archive_feedback_after_days,
+        outbox_keep_days=config.outbox_keep_days,
+    )
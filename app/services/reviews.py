@@ -0,0 +1,89 @@
+import html
+import math
+from typing import Optional
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import func, select
+
+from app.config import load_config
+from app.database.db import AsyncSessionLocal
+from app.database.models import Feedback
+from app.services.cache import LRUCache
+
+config = load_config()
+
+REVIEW_MAX_CHARS = 600
+
+
+def render_review(feedback: Feedback) -> str:
+    text = feedback.feedback
+    if len(text) > REVIEW_MAX_CHARS:
+        text = text[:REVIEW_MAX_CHARS].rstrip() + "…"
+    # Бот шлёт с parse_mode=HTML: имя и текст покупателя экранируем после обрезки, чтобы не разрезать сущность
+    name = html.escape(feedback.name or "Покупець")
+    return f"📝 {name} · {feedback.created_at.strftime('%d.%m.%Y')}\n{html.escape(text)}"
+
+
+def page_keyboard(page: int, pages: int) -> Optional[InlineKeyboardMarkup]:
+    if pages <= 1:
+        return None
+    nav = []
+    if page > 1:
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"reviews_page:{page - 1}"))
+    nav.append(InlineKeyboardButton(text=f"{page}/{pages}", callback_data="reviews_page:noop"))
+    if page < pages:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"reviews_page:{page + 1}"))
+    return InlineKeyboardMarkup(inline_keyboard=[nav])
+
+
+class ReviewsCache:
+    # Готовые страницы (текст + клавиатура) по номеру. Набор подтверждённых отзывов меняет
+    # только модерация, она вызывает invalidate(); TTL страхует от правок в обход бота.
+    def __init__(self, page_size: int = 5, maxsize: int = 100, ttl: float = 600):
+        self.page_size = page_size
+        self.version = 0
+        self._pages = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def invalidate(self):
+        self.version += 1
+        self._pages.clear()
+
+    async def page(self, page: int) -> tuple[Optional[str], Optional[InlineKeyboardMarkup], int]:
+        # (текст, клавиатура, номер страницы); текст None — подтверждённых отзывов нет
+        cached = self._pages.get(page)
+        if cached is not None:
+            return cached
+
+        version = self.version
+        async with AsyncSessionLocal() as session:
+            total = await session.scalar(select(func.count()).select_from(Feedback).where(Feedback.confirmed == True))
+            pages = max(1, math.ceil(total / self.page_size))
+            current = min(max(page, 1), pages)
+            result = await session.execute(
+                select(Feedback)
+                .where(Feedback.confirmed == True)
+                .order_by(Feedback.created_at.desc(), Feedback.id.desc())
+                .offset((current - 1) * self.page_size)
+                .limit(self.page_size)
+            )
+            feedbacks = result.scalars().all()
+
+        if feedbacks:
+            text = f"📢 Відгуки покупців ({total})\n\n" + "\n\n".join(render_review(fb) for fb in feedbacks)
+        else:
+            text = None
+        rendered = (text, page_keyboard(current, pages), current)
+        # Модерация во время загрузки — страница уже устарела, не кэшируем
+        if version == self.version:
+            self._pages.set(page, rendered)
+        return rendered
+
+    def stats(self) -> dict:
+        return {"pages": len(self._pages), "hits": self._pages.hits, "misses": self._pages.misses}
+
+
+reviews_cache = ReviewsCache(
+    page_size=config.reviews_page_size,
+    maxsize=config.reviews_cache_pages,
+    ttl=config.reviews_cache_ttl,
+)
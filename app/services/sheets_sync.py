@@ -0,0 +1,217 @@
+import asyncio
+import datetime
+import logging
+import uuid
+from typing import Optional, Protocol
+
+from sqlalchemy import or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import load_config
+from app.database.db import AsyncSessionLocal
+from app.database.models import OrderSummary, SyncCursor
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = "google_sheets_orders"
+
+# Строки моложе этого не выгружаются: updated_at ставит приложение, и транзакция, начатая раньше,
+# может закоммититься уже после того, как отметка ушла дальше её времени
+SETTLE_DELAY = datetime.timedelta(seconds=10)
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+HEADER = ["№", "Дата", "Имя", "Телефон", "Адрес", "Оплата", "Товары", "Кол-во", "Сумма", "user_id", "Статус", "ТТН"]
+
+STATUS_NAMES = {
+    "pending": "Ожидает подтверждения",
+    "confirmed": "Подтверждён",
+    "shipped": "Отправлен",
+    "rejected": "Отклонён",
+}
+
+
+class SheetClient(Protocol):
+    # Блокирующий клиент таблицы: вызывается только из пула потоков.
+    # Ключ строки — первая ячейка (№ заказа): строка с таким ключом перезаписывается, иначе дописывается.
+    def upsert_rows(self, rows: list[list]) -> None: ...
+
+
+class GspreadClient:
+    def __init__(self, credentials_file: str, spreadsheet_key: str, worksheet: str, timeout: float = 30.0):
+        self.credentials_file = credentials_file
+        self.spreadsheet_key = spreadsheet_key
+        self.worksheet_name = worksheet
+        self.timeout = timeout
+        self._worksheet = None
+
+    def _open(self):
+        # gspread и oauth2client импортируются лениво: без выгрузки бот работает и без них
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        credentials = ServiceAccountCredentials.from_json_keyfile_name(
+            self.credentials_file,
+            ["https://www.googleapis.com/auth/spreadsheets"],
+        )
+        client = gspread.authorize(credentials)
+        # По умолчанию у gspread нет таймаута HTTP: зависший запрос держал бы поток пула навсегда
+        client.set_timeout(self.timeout)
+        spreadsheet = client.open_by_key(self.spreadsheet_key)
+        return spreadsheet.worksheet(self.worksheet_name)
+
+    def upsert_rows(self, rows: list[list]) -> None:
+        if self._worksheet is None:
+            self._worksheet = self._open()
+        # Номера строк по первому столбцу читаем заново: таблицу могли отсортировать или поправить руками.
+        # API отдаёт значения строками, поэтому и ключи сравниваем как строки.
+        numbers = {value: number for number, value in enumerate(self._worksheet.col_values(1), start=1)}
+        updates, new_rows = [], []
+        for row in rows:
+            number = numbers.get(str(row[0]))
+            if number is None:
+                new_rows.append(row)
+            else:
+                updates.append({"range": f"A{number}", "values": [row]})
+        # Не больше двух запросов к API на всю пачку
+        if updates:
+            self._worksheet.batch_update(updates, value_input_option="USER_ENTERED")
+        if new_rows:
+            self._worksheet.append_rows(new_rows, value_input_option="USER_ENTERED")
+
+
+def order_row(summary: OrderSummary) -> list:
+    return [
+        summary.order_id,
+        summary.created_at.strftime("%Y-%m-%d %H:%M"),
+        summary.name,
+        summary.phone,
+        summary.address,
+        summary.payment,
+        summary.items_text.replace("\n", "; "),
+        summary.item_count,
+        summary.total,
+        summary.user_id,
+        STATUS_NAMES.get(summary.status, summary.status),
+        summary.ttn or "",
+    ]
+
+
+class SheetsSync:
+    # Раз в interval забирает заказы, изменённые после отметки (updated_at, order_id), и ставит их
+    # в таблицу по номеру заказа: новые дописываются, у существующих обновляются статус и ТТН.
+    # Отметка сдвигается только после успешной записи, поэтому сбой API означает повтор, а не пропуск.
+    # Выгружает один процесс за раз — тот, кто взял аренду отметки (owner, lease_until).
+    def __init__(self, client: SheetClient, interval: float = 30.0, batch_size: int = 500, timeout: float = 30.0):
+        self.client = client
+        self.interval = interval
+        self.batch_size = batch_size
+        self.timeout = timeout  # на весь upsert_rows: до трёх запросов к API
+        # Аренда заметно дольше выгрузки, чтобы второй процесс не начал, пока первый ещё пишет
+        self.lease = datetime.timedelta(seconds=timeout * 4)
+        self.synced = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Накопился хвост — дорабатываем его без паузы
+                while await self.sync_once() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Ошибка синхронизации с Google Sheets")
+            await asyncio.sleep(self.interval)
+
+    async def _claim(self, owner: str) -> Optional[SyncCursor]:
+        # Короткая транзакция: аренда отметки. Пока аренда не истекла, другие процессы проход пропускают
+        now = datetime.datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                await session.execute(insert(SyncCursor).values(name=CURSOR_NAME, last_id=0).on_conflict_do_nothing())
+                result = await session.execute(
+                    update(SyncCursor)
+                    .where(
+                        SyncCursor.name == CURSOR_NAME,
+                        or_(SyncCursor.lease_until.is_(None), SyncCursor.lease_until < now),
+                    )
+                    .values(owner=owner, lease_until=now + self.lease)
+                    .returning(SyncCursor)
+                )
+                return result.scalar_one_or_none()
+
+    async def _release(self, owner: str, **values):
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(SyncCursor)
+                .where(SyncCursor.name == CURSOR_NAME, SyncCursor.owner == owner)
+                .values(owner=None, lease_until=None, **values)
+            )
+            await session.commit()
+
+    async def sync_once(self) -> int:
+        # Ни соединение, ни транзакция не держатся во время запроса к Google: аренда берётся короткой
+        # транзакцией, пачка читается и выгружается с таймаутом, отметка сдвигается второй транзакцией.
+        # Если сдвинуть не удалось, повтор перезаписывает те же строки по номеру заказа, а не дублирует.
+        owner = uuid.uuid4().hex
+        cursor = await self._claim(owner)
+        if cursor is None:
+            return 0
+        try:
+            started = cursor.last_updated_at is None
+            since, last_id = (EPOCH, 0) if started else (cursor.last_updated_at, cursor.last_id)
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(OrderSummary)
+                    .where(
+                        tuple_(OrderSummary.updated_at, OrderSummary.order_id) > tuple_(since, last_id),
+                        OrderSummary.updated_at <= datetime.datetime.utcnow() - SETTLE_DELAY,
+                    )
+                    .order_by(OrderSummary.updated_at, OrderSummary.order_id)
+                    .limit(self.batch_size)
+                )
+                summaries = result.scalars().all()
+            if summaries:
+                rows = [order_row(summary) for summary in summaries]
+                if started:
+                    rows.insert(0, HEADER)
+                await asyncio.wait_for(asyncio.to_thread(self.client.upsert_rows, rows), self.timeout)
+        except asyncio.TimeoutError:
+            # Поток с запросом ещё может писать в таблицу: аренду не снимаем, она истечёт сама
+            raise
+        except Exception:
+            await self._release(owner)
+            raise
+
+        if not summaries:
+            await self._release(owner)
+            return 0
+        last = summaries[-1]
+        await self._release(owner, last_id=last.order_id, last_updated_at=last.updated_at)
+        self.synced += len(summaries)
+        return len(summaries)
+
+
+def create_sheets_sync() -> Optional[SheetsSync]:
+    config = load_config()
+    if not config.sheets_sync_enabled or not config.sheets_spreadsheet_key:
+        return None
+    client = GspreadClient(
+        config.google_credentials_file, config.sheets_spreadsheet_key, config.sheets_worksheet,
+        timeout=config.sheets_sync_timeout,
+    )
+    return SheetsSync(
+        client,
+        interval=config.sheets_sync_interval,
+        batch_size=config.sheets_sync_batch_size,
+        timeout=config.sheets_sync_timeout,
+    )
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolRequestHandler(SimpleRequestHandler):
+    # Telegram сразу получает 200, а апдейт кладётся в очередь, которую разбирают N воркеров.
+    # Если очередь переполнена — отвечаем 429, и Telegram повторит доставку позже.
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = 8,
+        queue_size: int = 1000,
+        **kwargs: Any,
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._worker_tasks: list[asyncio.Task] = []
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        app.on_startup.append(self._start_workers)
+        # Очередь дорабатывается первой — до emit_shutdown диспетчера и закрытия сессии бота
+        app.on_shutdown.insert(0, self._stop_workers)
+        super().register(app, path=path, **kwargs)
+
+    async def _start_workers(self, app: web.Application):
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _stop_workers(self, app: web.Application):
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook: при остановке в очереди осталось %d апдейтов", self.queue.qsize())
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+    async def _worker(self):
+        while True:
+            bot, update = await self.queue.get()
+            try:
+                await self._background_feed_update(bot=bot, update=update)
+            except Exception:
+                logger.exception("Webhook: ошибка обработки апдейта %s", update.get("update_id"))
+            finally:
+                self.queue.task_done()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update: Dict[str, Any] = await request.json(loads=bot.session.json_loads)
+        try:
+            self.queue.put_nowait((bot, update))
+        except asyncio.QueueFull:
+            return web.Response(status=429, text="Too many pending updates")
+        return web.json_response({}, dumps=bot.session.json_dumps)
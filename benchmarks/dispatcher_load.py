@@ -0,0 +1,280 @@
+# Нагрузочный прогон всех роутеров через dp.feed_update без Telegram: HTTP-сессия бота
+# подменена фейковым Bot API, который отвечает с задержкой, иногда — 429, и считает вызовы.
+#
+#   python -m benchmarks.dispatcher_load --users 200 --concurrency 50 --latency 0.05 --error-rate 0.01
+#
+# Каждый пользователь проходит сценарий: /start -> каталог и листание -> в корзину -> корзина ->
+# оформление OrderFSM -> статус заказа; затем админ открывает /pending_orders и подтверждает заказы.
+# С включённым планировщиком (scheduler_enabled) feed_update только ставит апдейт в план:
+# порядок шагов внутри чата сохраняется, а время "всех апдейтов" — это время постановки.
+# Нужна Postgres из postgres_dsn в .env (локальная!): схема мигрируется, тестовые товары
+# (sku bench-*) создаются; --cleanup удаляет их и заказы тестовых пользователей.
+import argparse
+import asyncio
+import itertools
+import random
+import time
+import typing
+from collections import Counter, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, TelegramObject, Update
+from sqlalchemy import delete, select
+
+from app.config import load_config
+from app.database.db import AsyncSessionLocal, get_engine
+from app.database.migrations import migrate
+from app.database.models import FSMRecord, Order, OrderItem, OrderSummary, OutboxMessage, Product
+from app.dispatcher import create_dispatcher, create_storage
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_io import ProductRow, import_products
+
+BOT_ID = 123456
+FIRST_USER_ID = 900_000_000
+
+
+class FakeTelegramSession(BaseSession):
+    # Ответ собирается как настоящий JSON Bot API и проходит через check_response,
+    # поэтому 429 превращается в TelegramRetryAfter так же, как в бою.
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+        self.flood_errors = 0
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    def _result(self, method: TelegramMethod) -> Any:
+        returning = method.__returning__
+        if returning is Message or Message in typing.get_args(returning):
+            chat_id = getattr(method, "chat_id", None) or 0
+            return {
+                "message_id": getattr(method, "message_id", None) or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Bench"},
+                "text": getattr(method, "text", None) or "",
+            }
+        return True
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None):
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(random.expovariate(1 / self.latency))
+        if random.random() < self.error_rate:
+            self.flood_errors += 1
+            status, body = 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }
+        else:
+            status, body = 200, {"ok": True, "result": self._result(method)}
+        response = self.check_response(bot, method, status, self.json_dumps(body))
+        return response.result
+
+
+class HandlerTimer(BaseMiddleware):
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+            raise
+        finally:
+            self.latencies[data["handler"].callback.__name__].append(time.perf_counter() - started)
+
+
+class Harness:
+    def __init__(self, dp, bot: Bot):
+        self.dp = dp
+        self.bot = bot
+        self.update_latencies: list[float] = []
+        self._update_ids = itertools.count(1)
+
+    async def feed(self, update: dict):
+        update["update_id"] = next(self._update_ids)
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, Update.model_validate(update, context={"bot": self.bot}))
+        except Exception:
+            # Уже учтено в HandlerTimer; без планировщика исключение долетает сюда
+            pass
+        self.update_latencies.append(time.perf_counter() - started)
+
+    async def settle(self):
+        # Дождаться апдейтов, которые планировщик ещё не доработал
+        scheduler = self.dp.workflow_data.get("scheduler")
+        if scheduler is not None:
+            await scheduler.drain(timeout=None)
+
+    async def message(self, user_id: int, text: str):
+        await self.feed({"message": {
+            "message_id": random.randint(1, 1_000_000),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+            "text": text,
+        }})
+
+    async def callback(self, user_id: int, data: str):
+        await self.feed({"callback_query": {
+            "id": str(random.getrandbits(32)),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": random.randint(1, 1_000_000),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Bench"},
+                "text": "bench",
+            },
+        }})
+
+
+async def customer_journey(harness: Harness, user_id: int, product_ids: list[int]):
+    await harness.message(user_id, "/start")
+    await harness.message(user_id, "📦 Каталог")
+    position = 1
+    product_id = product_ids[0]
+    for _ in range(3):
+        await harness.callback(user_id, f"catalog:next:{product_id}:{position}")
+        position = position % len(product_ids) + 1
+        product_id = product_ids[position - 1]
+    for product_id in random.sample(product_ids, min(2, len(product_ids))):
+        await harness.callback(user_id, f"add_to_cart:{product_id}")
+    await harness.message(user_id, "💰 Корзина")
+    await harness.callback(user_id, "checkout")
+    await harness.message(user_id, "Нагрузочный Тест")
+    await harness.message(user_id, f"+380{user_id % 1_000_000_000:09d}")
+    await harness.message(user_id, "Киев, отделение 1")
+    await harness.message(user_id, "📦 Наложенный платёж")
+    await harness.message(user_id, "да")
+    await harness.message(user_id, "📦 Статус заказа")
+
+
+async def admin_journey(harness: Harness, admin_id: int, user_ids: list[int]):
+    await harness.message(admin_id, "/pending_orders")
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(OrderSummary.order_id)
+            .where(OrderSummary.user_id.in_(user_ids), OrderSummary.status == "pending")
+        )
+        order_ids = result.scalars().all()
+    for order_id in order_ids:
+        await harness.callback(admin_id, f"confirm_order_{order_id}")
+
+
+async def seed_products(count: int) -> list[int]:
+    await import_products([
+        ProductRow(sku=f"bench-{i}", name=f"Тестовый товар {i}", price=100 + i, photo=f"bench-photo-{i}")
+        for i in range(count)
+    ])
+    async with AsyncSessionLocal() as session:
+        # Только товары бенчмарка: рабочий каталог в той же базе не трогаем
+        result = await session.execute(select(Product.id).where(Product.sku.like("bench-%")).order_by(Product.id))
+        return result.scalars().all()
+
+
+async def cleanup(user_ids: list[int]):
+    async with AsyncSessionLocal() as session:
+        order_ids = select(Order.id).where(Order.user_id.in_(user_ids)).scalar_subquery()
+        await session.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+        await session.execute(delete(OrderSummary).where(OrderSummary.user_id.in_(user_ids)))
+        await session.execute(delete(Order).where(Order.user_id.in_(user_ids)))
+        # Уведомления тестовым клиентам и их FSM (если бенчмарк шёл на хранилище в базе)
+        await session.execute(delete(OutboxMessage).where(OutboxMessage.chat_id.in_(user_ids)))
+        await session.execute(delete(FSMRecord).where(FSMRecord.bot_id == BOT_ID, FSMRecord.user_id.in_(user_ids)))
+        # Тестовые товары, иначе клиенты увидят их в каталоге
+        await session.execute(delete(Product).where(Product.sku.like("bench-%")))
+        await session.commit()
+    catalog_cache.invalidate()
+
+
+def percentiles(latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    return f"p50 {p(0.5):7.2f}  p95 {p(0.95):7.2f}  p99 {p(0.99):7.2f} ms"
+
+
+def report(harness: Harness, timer: HandlerTimer, session: FakeTelegramSession, elapsed: float):
+    total = len(harness.update_latencies)
+    print(f"\nАпдейтов: {total} за {elapsed:.2f} с — {total / elapsed:.0f} апдейтов/с")
+    print(f"Все апдейты:            {percentiles(harness.update_latencies)}")
+    print("\nПо хендлерам:")
+    for name, latencies in sorted(timer.latencies.items(), key=lambda item: -len(item[1])):
+        print(f"  {name:<24} n={len(latencies):<6} {percentiles(latencies)}")
+    print(f"\nВызовов Bot API: {sum(session.calls.values())} (429: {session.flood_errors})")
+    for method, count in session.calls.most_common():
+        print(f"  {method:<24} {count}")
+    if timer.errors:
+        print(f"\nИсключения из хендлеров: {dict(timer.errors)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="средняя задержка Bot API, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--memory-storage", action="store_true", help="MemoryStorage вместо настроенного FSM")
+    parser.add_argument("--cleanup", action="store_true", help="удалить тестовые товары и заказы тестовых пользователей")
+    args = parser.parse_args()
+
+    config = load_config()
+    await migrate()
+    product_ids = await seed_products(args.products)
+
+    session = FakeTelegramSession(latency=args.latency, error_rate=args.error_rate)
+    bot = Bot(token=f"{BOT_ID}:bench", session=session)
+    dp = create_dispatcher(MemoryStorage() if args.memory_storage else create_storage())
+    timer = HandlerTimer()
+    dp.message.middleware(timer)
+    dp.callback_query.middleware(timer)
+    harness = Harness(dp, bot)
+
+    user_ids = [FIRST_USER_ID + i for i in range(args.users)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_customer(user_id: int):
+        async with semaphore:
+            await customer_journey(harness, user_id, product_ids)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_customer(user_id) for user_id in user_ids))
+    await harness.settle()
+    await admin_journey(harness, config.admin_ids[0], user_ids)
+    await harness.settle()
+    report(harness, timer, session, time.perf_counter() - started)
+
+    if args.cleanup:
+        await cleanup(user_ids)
+    await dp.storage.close()
+    await get_engine().dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+# EXPLAIN ANALYZE горячих запросов до и после индексов из миграции hot_query_indexes.
+#
+#   python -m benchmarks.explain_indexes --orders 200000 --subscribers 100000 --feedback 50000
+#
+# Данные генерируются во временной схеме внутри одной транзакции, которая в конце
+# откатывается, — рабочие таблицы не затрагиваются.
+import argparse
+import asyncio
+import re
+
+from sqlalchemy import text
+
+from app.database.db import get_engine
+from app.database.migrations import HOT_QUERY_INDEXES
+from app.database.models import Base, Feedback, Order, OrderItem, Subscriber
+
+SCHEMA = "bench_indexes"
+
+SEED = (
+    """
+    INSERT INTO orders (user_id, name, phone, address, total, payment, confirmed, ttn, rejection_reason, created_at)
+    SELECT 100000 + g % 20000, 'Клиент ' || g, '+380' || lpad((500000000 + g % 50000)::text, 9, '0'),
+           'Киев, отделение ' || g % 300, 100 + g % 5000, 'Наложенный платёж',
+           g % 100 >= 2, CASE WHEN g % 100 >= 2 THEN '2045' || g END,
+           CASE WHEN g % 100 = 0 THEN 'Нет в наличии' END,
+           timezone('utc', now()) - (g || ' minutes')::interval
+    FROM generate_series(1, :orders) AS g
+    """,
+    """
+    INSERT INTO order_items (order_id, product_id, product_name, product_price, quantity)
+    SELECT o.id, 1 + k, 'Товар ' || k, 100 * k, 1 + k % 3
+    FROM orders o CROSS JOIN generate_series(1, 3) AS k
+    """,
+    """
+    INSERT INTO subscribers (user_id, subscribed, created_at)
+    SELECT 100000 + g, g % 10 <> 0, timezone('utc', now())
+    FROM generate_series(1, :subscribers) AS g
+    """,
+    """
+    INSERT INTO feedback (user_id, name, feedback, confirmed, created_at)
+    SELECT 100000 + g, 'Клиент ' || g, 'Отличный товар', g % 20 <> 0,
+           timezone('utc', now()) - (g || ' minutes')::interval
+    FROM generate_series(1, :feedback) AS g
+    """,
+)
+
+QUERIES = {
+    "status by phone": "SELECT * FROM orders WHERE phone = '+380500012345' ORDER BY id DESC LIMIT 1",
+    "pending orders": (
+        "SELECT * FROM orders WHERE confirmed = false AND rejection_reason IS NULL ORDER BY id DESC"
+    ),
+    "order items (selectinload)": (
+        "SELECT * FROM order_items WHERE order_id IN (SELECT id FROM orders ORDER BY id DESC LIMIT 5)"
+    ),
+    "latest reviews": "SELECT * FROM feedback WHERE confirmed = true ORDER BY created_at DESC LIMIT 10",
+    "broadcast chunk": (
+        "SELECT user_id FROM subscribers WHERE subscribed = true AND user_id > 150000 ORDER BY user_id LIMIT 500"
+    ),
+}
+
+TABLES = [Order.__table__, OrderItem.__table__, Subscriber.__table__, Feedback.__table__]
+
+
+async def explain(conn, query: str, runs: int) -> tuple[float, str]:
+    best = None
+    plan = ""
+    for _ in range(runs):
+        result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"))
+        lines = [row[0] for row in result.all()]
+        elapsed = float(re.search(r"Execution Time: ([\d.]+) ms", "\n".join(lines)).group(1))
+        if best is None or elapsed < best:
+            best, plan = elapsed, lines[0]
+    return best, plan
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--subscribers", type=int, default=100_000)
+    parser.add_argument("--feedback", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+            sizes = {"orders": args.orders, "subscribers": args.subscribers, "feedback": args.feedback}
+            for statement in SEED:
+                await conn.execute(text(statement), sizes)
+            await conn.execute(text("ANALYZE"))
+
+            before = {name: await explain(conn, query, args.runs) for name, query in QUERIES.items()}
+            for statement in HOT_QUERY_INDEXES:
+                await conn.execute(text(statement))
+            await conn.execute(text("ANALYZE"))
+            after = {name: await explain(conn, query, args.runs) for name, query in QUERIES.items()}
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    print(f"orders={args.orders} subscribers={args.subscribers} feedback={args.feedback}, лучшее из {args.runs}\n")
+    print(f"{'запрос':<28}{'до, мс':>10}{'после, мс':>12}{'ускорение':>11}")
+    for name in QUERIES:
+        (t_before, plan_before), (t_after, plan_after) = before[name], after[name]
+        print(f"{name:<28}{t_before:>10.2f}{t_after:>12.2f}{t_before / max(t_after, 0.001):>10.1f}x")
+        print(f"    до:    {plan_before.strip()}")
+        print(f"    после: {plan_after.strip()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
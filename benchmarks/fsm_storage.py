@@ -0,0 +1,84 @@
+# Сравнение PostgresStorage с MemoryStorage на типичном сценарии одного апдейта:
+# get_state -> get_data -> update_data -> get_data (как в add_to_cart / шагах OrderFSM).
+#
+#   python -m benchmarks.fsm_storage --users 500 --rounds 20 --concurrency 50
+#
+# Нужна доступная Postgres из postgres_dsn в .env; таблица fsm_states создаётся при необходимости.
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.database.db import get_engine
+from app.database.fsm_storage import PostgresStorage
+from app.database.models import Base, FSMRecord
+
+BOT_ID = 42
+
+
+async def one_update(storage, key: StorageKey, step: int):
+    await storage.get_state(key)
+    data = await storage.get_data(key)
+    await storage.update_data(key, {"step": step, "name": "Тарас", "cart_size": len(data)})
+    await storage.get_data(key)
+
+
+async def run(storage, users: int, rounds: int, concurrency: int) -> list[float]:
+    keys = [StorageKey(bot_id=BOT_ID, chat_id=1_000_000 + i, user_id=1_000_000 + i) for i in range(users)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def timed(key: StorageKey, step: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await one_update(storage, key, step)
+            latencies.append(time.perf_counter() - started)
+
+    for step in range(rounds):
+        await asyncio.gather(*(timed(key, step) for key in keys))
+    return latencies
+
+
+def report(name: str, latencies: list[float], elapsed: float):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    print(
+        f"{name:<22} updates/s: {len(latencies) / elapsed:>9.0f}  "
+        f"mean: {statistics.mean(latencies) * 1000:6.2f} ms  "
+        f"p50: {p(0.5):6.2f} ms  p95: {p(0.95):6.2f} ms  p99: {p(0.99):6.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[FSMRecord.__table__])
+        await conn.execute(FSMRecord.__table__.delete().where(FSMRecord.bot_id == BOT_ID))
+
+    storages = [
+        ("MemoryStorage", MemoryStorage()),
+        ("PostgresStorage", PostgresStorage(engine)),
+        ("PostgresStorage/nocache", PostgresStorage(engine, cache_ttl=0)),
+    ]
+    for name, storage in storages:
+        started = time.perf_counter()
+        latencies = await run(storage, args.users, args.rounds, args.concurrency)
+        report(name, latencies, time.perf_counter() - started)
+        await storage.close()
+
+    async with engine.begin() as conn:
+        await conn.execute(FSMRecord.__table__.delete().where(FSMRecord.bot_id == BOT_ID))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+# EXPLAIN ANALYZE горячих запросов к заказам на большой истории: обычные таблицы,
+# затем помесячные партиции (миграция partition_orders), затем архивация закрытых заказов.
+#
+#   python -m benchmarks.partitioning --orders 3000000 --months 36 --pending 200
+#
+# Данные генерируются во временной схеме внутри одной транзакции, которая в конце
+# откатывается, — рабочие таблицы не затрагиваются. VACUUM внутри транзакции невозможен,
+# поэтому в оставшихся партициях лежат мёртвые строки и столбец "архив" — оценка сверху.
+import argparse
+import asyncio
+import datetime
+import re
+
+from sqlalchemy import text
+
+from app.database.db import get_engine
+from app.database.migrations import (
+    ARCHIVE_TABLES, HOT_QUERY_INDEXES, MY_ORDERS, ORDER_SUMMARIES, ORDER_SUMMARIES_ARCHIVE, _partition_orders,
+)
+from app.database.models import Base, Feedback, Order, OrderItem, OrderSummary, UserQuestion
+from app.database.partitions import drop_empty_partitions
+from app.services.retention import archive_orders
+
+SCHEMA = "bench_partitioning"
+
+SEED = (
+    # id растёт со временем; последние :pending заказов ждут подтверждения, каждый десятый отклонён
+    """
+    INSERT INTO orders (id, user_id, name, phone, address, total, payment, confirmed, ttn, rejection_reason, created_at)
+    SELECT g, 100000 + g % 200000, 'Клиент ' || g, '+380' || lpad((500000000 + g % 50000)::text, 9, '0'),
+           'Киев, отделение ' || g % 300, 100 + g % 5000, 'Наложенный платёж',
+           g <= :orders - :pending AND g % 10 <> 0,
+           CASE WHEN g <= :orders - :pending AND g % 10 <> 0 THEN '2045' || g END,
+           CASE WHEN g <= :orders - :pending AND g % 10 = 0 THEN 'Нет в наличии' END,
+           timezone('utc', now()) - make_interval(mins => ((:orders - g)::bigint * :minutes / :orders)::int)
+    FROM generate_series(1, :orders) AS g
+    """,
+    "SELECT setval('orders_id_seq', :orders)",
+    """
+    INSERT INTO order_items (order_id, product_id, product_name, product_price, quantity, created_at)
+    SELECT o.id, k, 'Товар ' || k, 100 * k, 1, o.created_at
+    FROM orders o CROSS JOIN generate_series(1, 2) AS k
+    """,
+    """
+    INSERT INTO order_summaries (
+        order_id, user_id, name, phone, phone_normalized, address, payment, items_text, item_count,
+        total, status, ttn, rejection_reason, created_at, updated_at
+    )
+    SELECT id, user_id, name, phone, regexp_replace(phone, '\\D', '', 'g'), address, payment,
+           'Товар 1 x1\nТовар 2 x1', 2, total,
+           CASE WHEN confirmed THEN 'shipped' WHEN rejection_reason IS NOT NULL THEN 'rejected' ELSE 'pending' END,
+           ttn, rejection_reason, created_at, created_at
+    FROM orders
+    """,
+)
+
+QUERIES = {
+    "pending orders": (
+        "SELECT * FROM orders WHERE confirmed = false AND rejection_reason IS NULL ORDER BY id DESC LIMIT 6"
+    ),
+    "status by phone": "SELECT * FROM orders WHERE phone = '+380500012345' ORDER BY id DESC LIMIT 1",
+    "order items (selectinload)": (
+        "SELECT * FROM order_items WHERE order_id IN (SELECT id FROM orders ORDER BY id DESC LIMIT 5)"
+    ),
+    "orders, last 30 days": (
+        "SELECT count(*) FROM orders WHERE created_at >= timezone('utc', now()) - interval '30 days'"
+    ),
+    # То, что на самом деле читает бот: read model не партиционирована, но архивируется вместе с заказами
+    "pending inbox (read model)": (
+        "SELECT * FROM order_summaries WHERE status = 'pending' ORDER BY order_id DESC LIMIT 6"
+    ),
+    "status (read model)": (
+        "SELECT * FROM order_summaries WHERE phone_normalized = '380500012345' ORDER BY order_id DESC LIMIT 1"
+    ),
+}
+
+# Индексы заказов и read model из прежних миграций — состояние "до"
+INDEXES = [
+    statement for statement in (*HOT_QUERY_INDEXES, *ORDER_SUMMARIES, *MY_ORDERS)
+    if statement.startswith("CREATE INDEX") and " ON order" in statement
+]
+
+TABLES = [Order.__table__, OrderItem.__table__, OrderSummary.__table__, UserQuestion.__table__, Feedback.__table__]
+
+STAGES = ("обычные", "партиции", "архив")
+
+
+async def explain(conn, query: str, runs: int) -> tuple[float, str]:
+    best = None
+    plan = ""
+    for _ in range(runs):
+        result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"))
+        lines = [row[0] for row in result.all()]
+        elapsed = float(re.search(r"Execution Time: ([\d.]+) ms", "\n".join(lines)).group(1))
+        if best is None or elapsed < best:
+            best, plan = elapsed, lines[0]
+    return best, plan
+
+
+async def table_stats(conn) -> str:
+    result = await conn.execute(text("""
+        SELECT count(*) FILTER (WHERE isleaf), pg_size_pretty(sum(pg_total_relation_size(relid)))
+        FROM pg_partition_tree('orders')
+    """))
+    partitions, size = result.one()
+    rows = await conn.scalar(text("SELECT count(*) FROM orders"))
+    return f"orders: {rows} строк, {size}, таблиц {partitions}"
+
+
+async def measure(conn, runs: int) -> dict:
+    await conn.execute(text("ANALYZE"))
+    return {name: await explain(conn, query, runs) for name, query in QUERIES.items()}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=3_000_000)
+    parser.add_argument("--months", type=int, default=36, help="глубина истории")
+    parser.add_argument("--pending", type=int, default=200)
+    parser.add_argument("--archive-after-days", type=int, default=180)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    results, stats = [], []
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+            params = {"orders": args.orders, "pending": args.pending, "minutes": args.months * 30 * 1440}
+            for statement in SEED:
+                await conn.execute(text(statement), params)
+            for statement in INDEXES:
+                await conn.execute(text(statement))
+            results.append(await measure(conn, args.runs))
+            stats.append(await table_stats(conn))
+
+            await _partition_orders(conn)
+            results.append(await measure(conn, args.runs))
+            stats.append(await table_stats(conn))
+
+            for statement in (*ARCHIVE_TABLES, *ORDER_SUMMARIES_ARCHIVE):
+                await conn.execute(text(statement))
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=args.archive_after_days)
+            while await archive_orders(conn, cutoff, args.batch_size) == args.batch_size:
+                pass
+            await drop_empty_partitions(conn, cutoff)
+            results.append(await measure(conn, args.runs))
+            stats.append(await table_stats(conn))
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    print(f"orders={args.orders} за {args.months} мес., pending={args.pending}, "
+          f"архив старше {args.archive_after_days} дн., лучшее из {args.runs}\n")
+    for stage, line in zip(STAGES, stats):
+        print(f"  {stage:<10} {line}")
+    print(f"\n{'запрос':<30}" + "".join(f"{stage + ', мс':>14}" for stage in STAGES))
+    for name in QUERIES:
+        timings = [stage[name] for stage in results]
+        print(f"{name:<30}" + "".join(f"{elapsed:>14.2f}" for elapsed, _ in timings))
+        for stage, (_, plan) in zip(STAGES, timings):
+            print(f"    {stage + ':':<10} {plan.strip()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
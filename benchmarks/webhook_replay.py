@@ -0,0 +1,80 @@
+# Офлайн-проверка вебхука: POST записанных апдейтов на локальный сервер и замер времени ответа.
+#
+#   RUN_MODE=webhook WEBHOOK_SECRET=test python run.py            # webhook_base_url пустой
+#   python -m benchmarks.webhook_replay updates.jsonl --secret test --concurrency 20
+#   python -m benchmarks.webhook_replay --synthetic 1000 --secret test
+#
+# updates.jsonl — по одному JSON-объекту Update на строку (например, из getUpdates).
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import ClientSession
+
+
+def synthetic_updates(count: int, users: int = 50) -> list[dict]:
+    updates = []
+    for i in range(count):
+        user_id = 100_000 + i % users
+        updates.append({
+            "update_id": 1_000_000 + i,
+            "message": {
+                "message_id": i + 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": "Load"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+                "text": "/start" if i % 3 == 0 else "💰 Корзина",
+            },
+        })
+    return updates
+
+
+async def replay(url: str, updates: list[dict], secret: str, concurrency: int) -> list[tuple[int, float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    results: list[tuple[int, float]] = []
+
+    async with ClientSession() as session:
+        async def post(update: dict):
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(url, json=update, headers=headers) as response:
+                    await response.read()
+                    results.append((response.status, time.perf_counter() - started))
+
+        await asyncio.gather(*(post(update) for update in updates))
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", nargs="?")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default="")
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    else:
+        updates = synthetic_updates(args.synthetic or 100)
+
+    started = time.perf_counter()
+    results = await replay(args.url, updates, args.secret, args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    statuses: dict[int, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(latency for _, latency in results)
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    print(f"Отправлено {len(results)} апдейтов за {elapsed:.2f} с ({len(results) / elapsed:.0f}/с)")
+    print(f"Статусы: {statuses}")
+    print(f"Время ответа: p50 {p(0.5):.1f} ms, p95 {p(0.95):.1f} ms, p99 {p(0.99):.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,37 +1,105 @@
-from aiogram import Bot, Dispatcher
+import logging
+
+from aiogram import Bot
 from app.config import load_config
-from app.handlers import main_menu, order, feedback, broadcast, admin, status
 from aiogram.client.default import DefaultBotProperties
-from app.database.create_db import  create_tables
-from sqlalchemy.orm import relationship
-from app.database.db import init_db
-from app.database.functions import get_db
-from app.handlers import user
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
+from app.database.migrations import migrate
+from app.dispatcher import create_dispatcher
+from app.logging_config import setup_logging
+from app.middlewares.metrics import BotApiMetricsMiddleware
+from app.services.admin_notifier import admin_notifier
+from app.services.broadcaster import resume_broadcasts
+from app.services.outbox import outbox_relay
+from app.services.retention import create_retention_job
+from app.services.metrics import start_metrics_server
+from app.services.sheets_sync import create_sheets_sync
+from app.webhook import WorkerPoolRequestHandler
 
 config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
 bot = Bot(
     token=config.bot_token,
     default=DefaultBotProperties(parse_mode="HTML")
 )
 
-dp = Dispatcher()
+if config.metrics_enabled:
+    bot.session.middleware(BotApiMetricsMiddleware())
 
-# Регистрация роутеров
-for router in [main_menu.router, order.router, user.router, feedback.router, broadcast.router, admin.router, status.router]:
-    dp.include_router(router)
+dp = create_dispatcher()
+sheets_sync = create_sheets_sync()
+retention_job = create_retention_job()
+metrics_runner = None
 
-if __name__ == '__main__':
-    import asyncio
+async def on_startup(bot: Bot):
+    global metrics_runner
+    await migrate()
+    await resume_broadcasts(
+        bot,
+        workers=config.broadcast_workers,
+        rate=config.broadcast_rate,
+        chunk_size=config.broadcast_chunk_size,
+        progress_interval=config.broadcast_progress_interval,
+    )
+    if config.run_mode == "webhook":
+        # Пустой webhook_base_url — локальный запуск без регистрации вебхука в Telegram
+        if config.webhook_base_url:
+            await bot.set_webhook(
+                url=config.webhook_base_url.rstrip("/") + config.webhook_path,
+                secret_token=config.webhook_secret or None,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+    else:
+        await bot.delete_webhook()
+    admin_notifier.start(bot)
+    outbox_relay.start(bot)
+    if sheets_sync:
+        sheets_sync.start()
+    if retention_job:
+        retention_job.start()
+    # Метрики — всегда отдельный сервер на METRICS_HOST: публичный порт вебхука их не отдаёт
+    if config.metrics_enabled and config.metrics_port:
+        metrics_runner = await start_metrics_server(config.metrics_host, config.metrics_port)
+    logger.info("База данных готова, бот стартовал (%s)", config.run_mode)
 
+async def on_shutdown():
+    if "scheduler" in dp.workflow_data:
+        await dp["scheduler"].drain()
+    await admin_notifier.stop()
+    await outbox_relay.stop()
+    if sheets_sync:
+        await sheets_sync.stop()
+    if retention_job:
+        await retention_job.stop()
+    if metrics_runner:
+        await metrics_runner.cleanup()
 
-    async def on_startup():
-        await init_db()  # Создаём таблицы
-        print("База данных готова, бот стартовал.")
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
 
-    async def main():
-        await create_tables()
-        async for _ in get_db():
-            pass
-        await dp.start_polling(bot)
+def create_webhook_app() -> web.Application:
+    app = web.Application()
+    handler = WorkerPoolRequestHandler(
+        dp,
+        bot,
+        workers=config.webhook_workers,
+        queue_size=config.webhook_queue_size,
+        secret_token=config.webhook_secret or None,
+    )
+    # setup_application раньше register: при остановке shutdown-хуки диспетчера
+    # должны отработать до того, как обработчик закроет сессию бота
+    setup_application(app, dp, bot=bot)
+    handler.register(app, path=config.webhook_path)
+    return app
+
+if __name__ == '__main__':
+    import asyncio
 
-    asyncio.run(main())
+    if config.run_mode == "webhook":
+        web.run_app(create_webhook_app(), host=config.webhook_host, port=config.webhook_port)
+    else:
+        # С планировщиком апдейт только ставится в план, а при полном бэклоге polling ждёт
+        asyncio.run(dp.start_polling(bot, handle_as_tasks="scheduler" not in dp.workflow_data))
@@ -0,0 +1,41 @@
+import asyncio
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.database.functions import ORDER_FIELDS
+from app.database.models import Order
+from app.handlers.admin import pending_selection, set_pending_selection
+
+
+def test_selection_is_kept_apart_from_checkout_data():
+    async def scenario():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=1, user_id=1))
+        await set_pending_selection(state, {12, 10})
+        # Оформление заказа тем же админом видит только свои данные
+        await state.update_data(name="Иван", phone="+380501234567")
+        data = await state.get_data()
+        selected = await pending_selection(state)
+        await state.clear()
+        return data, selected, await pending_selection(state)
+
+    data, selected, after_clear = asyncio.run(scenario())
+    assert data == {"name": "Иван", "phone": "+380501234567"}
+    assert selected == {10, 12}
+    assert after_clear == {10, 12}
+
+
+def test_selection_mode_off_is_none():
+    async def scenario():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=1, user_id=1))
+        await set_pending_selection(state, set())
+        enabled = await pending_selection(state)
+        await set_pending_selection(state, None)
+        return enabled, await pending_selection(state)
+
+    assert asyncio.run(scenario()) == (set(), None)
+
+
+def test_order_fields_are_order_columns():
+    assert set(ORDER_FIELDS) <= set(Order.__table__.columns.keys())
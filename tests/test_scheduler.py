@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, Update, User
+
+from app.middlewares.scheduler import setup_scheduler
+
+
+class Checkout(StatesGroup):
+    name = State()
+    phone = State()
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.datetime.now(),
+            chat=Chat(id=chat_id, type="private"),
+            from_user=User(id=chat_id, is_bot=False, first_name="Test"),
+            text=text,
+        ),
+    )
+
+
+def make_dispatcher(calls: list, max_per_chat: int = 20) -> Dispatcher:
+    router = Router()
+
+    @router.message(StateFilter(Checkout.name))
+    async def got_name(message: Message, state: FSMContext):
+        # Медленный хендлер: следующий апдейт чата приходит, пока этот ещё не сменил состояние
+        await asyncio.sleep(0.05)
+        calls.append(("name", message.text))
+        await state.set_state(Checkout.phone)
+
+    @router.message(StateFilter(Checkout.phone))
+    async def got_phone(message: Message, state: FSMContext):
+        calls.append(("phone", message.text))
+        await state.clear()
+
+    @router.message()
+    async def fallback(message: Message):
+        calls.append(("fallback", message.text))
+
+    dp = Dispatcher(storage=MemoryStorage())
+    setup_scheduler(dp, max_concurrent=10, max_backlog=100, max_per_chat=max_per_chat)
+    dp.include_router(router)
+    return dp
+
+
+def test_scheduler_is_the_outermost_middleware():
+    dp = make_dispatcher([])
+    assert dp.update.outer_middleware[0] is dp["scheduler"]
+
+
+def test_back_to_back_updates_see_state_set_by_previous_one():
+    async def scenario():
+        calls = []
+        dp = make_dispatcher(calls)
+        bot = Bot("123456:TEST")
+        await dp.fsm.get_context(bot, chat_id=1, user_id=1).set_state(Checkout.name)
+
+        # Оба апдейта ставятся в план до того, как первый успел выполниться
+        await dp.feed_update(bot, make_update(1, 1, "Иван"))
+        await dp.feed_update(bot, make_update(2, 1, "+380501234567"))
+        await dp["scheduler"].drain()
+        await bot.session.close()
+        return calls
+
+    assert asyncio.run(scenario()) == [("name", "Иван"), ("phone", "+380501234567")]
+
+
+def test_other_chats_are_not_blocked_by_a_slow_chat():
+    async def scenario():
+        calls = []
+        dp = make_dispatcher(calls)
+        bot = Bot("123456:TEST")
+        await dp.fsm.get_context(bot, chat_id=1, user_id=1).set_state(Checkout.name)
+
+        await dp.feed_update(bot, make_update(1, 1, "Иван"))
+        await dp.feed_update(bot, make_update(2, 2, "привет"))
+        await dp["scheduler"].drain()
+        await bot.session.close()
+        return calls
+
+    assert asyncio.run(scenario()) == [("fallback", "привет"), ("name", "Иван")]
+
+
+def test_flooding_chat_is_capped_without_taking_the_backlog():
+    async def scenario():
+        calls = []
+        dp = make_dispatcher(calls, max_per_chat=3)
+        bot = Bot("123456:TEST")
+        await dp.fsm.get_context(bot, chat_id=1, user_id=1).set_state(Checkout.name)
+
+        for update_id in range(1, 11):
+            await dp.feed_update(bot, make_update(update_id, 1, f"флуд {update_id}"))
+        await dp.feed_update(bot, make_update(100, 2, "привет"))
+        await dp["scheduler"].drain()
+        await bot.session.close()
+        return calls, dp["scheduler"]._queued
+
+    calls, queued = asyncio.run(scenario())
+    assert [text for _, text in calls if text.startswith("флуд")] == ["флуд 1", "флуд 2", "флуд 3"]
+    assert ("fallback", "привет") in calls
+    assert queued == {}
@@ -0,0 +1,217 @@
+import asyncio
+import datetime
+import os
+import time
+
+import pytest
+from sqlalchemy import delete
+
+from app.database.db import AsyncSessionLocal, get_engine
+from app.database.models import OrderSummary, SyncCursor
+from app.services.sheets_sync import CURSOR_NAME, HEADER, GspreadClient, SheetsSync, order_row
+
+
+class MemorySheetClient:
+    # Таблица в памяти с той же семантикой, что у GspreadClient: ключ строки — первая ячейка
+    def __init__(self, fail_times: int = 0):
+        self.rows: list[list] = []
+        self.calls = 0
+        self.fail_times = fail_times
+
+    def upsert_rows(self, rows: list[list]) -> None:
+        self.calls += 1
+        numbers = {str(row[0]): index for index, row in enumerate(self.rows)}
+        for row in rows:
+            index = numbers.get(str(row[0]))
+            if index is None:
+                numbers[str(row[0])] = len(self.rows)
+                self.rows.append(row)
+            else:
+                self.rows[index] = row
+        if self.fail_times:
+            # Строки уже записаны, но вызов падает — как обрыв связи после ответа API
+            self.fail_times -= 1
+            raise ConnectionError("sheet API timeout")
+
+    def row(self, order_id: int) -> list:
+        return next(row for row in self.rows if row[0] == order_id)
+
+
+class FakeWorksheet:
+    def __init__(self, rows: list[list]):
+        self.rows = rows
+        self.calls = []
+
+    def col_values(self, column: int) -> list[str]:
+        return [str(row[column - 1]) for row in self.rows]
+
+    def batch_update(self, data: list[dict], **kwargs):
+        self.calls.append("batch_update")
+        for item in data:
+            self.rows[int(item["range"][1:]) - 1] = item["values"][0]
+
+    def append_rows(self, rows: list[list], **kwargs):
+        self.calls.append("append_rows")
+        self.rows.extend(rows)
+
+
+def make_summary(order_id: int, status: str = "pending", ttn=None, updated_at=None) -> OrderSummary:
+    created_at = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+    return OrderSummary(
+        order_id=order_id,
+        user_id=100,
+        name="Клиент",
+        phone="+380500000000",
+        phone_normalized="380500000000",
+        address="Киев, отделение 1",
+        payment="Наложенный платёж",
+        items_text="Товар 1 x1\nТовар 2 x2",
+        item_count=3,
+        total=500,
+        status=status,
+        ttn=ttn,
+        created_at=created_at,
+        updated_at=updated_at or created_at,
+    )
+
+
+def test_order_row_has_status_and_ttn():
+    row = order_row(make_summary(7, status="shipped", ttn="20450000000001"))
+    assert len(row) == len(HEADER)
+    assert row[0] == 7
+    assert row[6] == "Товар 1 x1; Товар 2 x2"
+    assert row[-2:] == ["Отправлен", "20450000000001"]
+
+
+def test_gspread_client_updates_existing_rows_and_appends_new():
+    client = GspreadClient("credentials.json", "key", "Заказы")
+    client._worksheet = FakeWorksheet([HEADER, [1, "pending"], [2, "pending"]])
+
+    client.upsert_rows([[2, "shipped"], [3, "pending"]])
+
+    assert client._worksheet.rows == [HEADER, [1, "pending"], [2, "shipped"], [3, "pending"]]
+    assert client._worksheet.calls == ["batch_update", "append_rows"]
+
+
+requires_postgres = pytest.mark.skipif(
+    not os.environ.get("TEST_POSTGRES_DSN"), reason="нужна тестовая база: TEST_POSTGRES_DSN"
+)
+
+
+async def _reset():
+    from app.database.migrations import migrate
+
+    await migrate()
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(OrderSummary))
+        await session.execute(delete(SyncCursor).where(SyncCursor.name == CURSOR_NAME))
+        await session.commit()
+
+
+async def _set_status(order_id: int, status: str, ttn=None):
+    async with AsyncSessionLocal() as session:
+        summary = await session.get(OrderSummary, order_id)
+        summary.status = status
+        summary.ttn = ttn
+        # Изменение старше SETTLE_DELAY, иначе выгрузка его пока не возьмёт
+        summary.updated_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
+        await session.commit()
+
+
+@requires_postgres
+def test_sync_updates_status_in_place_and_replays_without_duplicates():
+    async def scenario():
+        await _reset()
+        async with AsyncSessionLocal() as session:
+            session.add_all([make_summary(order_id) for order_id in (1, 2, 3)])
+            await session.commit()
+
+        client = MemorySheetClient()
+        sync = SheetsSync(client, batch_size=2)
+        assert await sync.sync_once() == 2
+        assert await sync.sync_once() == 1
+        assert await sync.sync_once() == 0
+        assert [row[0] for row in client.rows] == ["№", 1, 2, 3]
+
+        # Смена статуса перезаписывает строку заказа, а не дописывает новую
+        await _set_status(2, "shipped", "20450000000002")
+        assert await sync.sync_once() == 1
+        assert [row[0] for row in client.rows] == ["№", 1, 2, 3]
+        assert client.row(2)[-2:] == ["Отправлен", "20450000000002"]
+
+        # Запись прошла, но отметка не сдвинулась: повтор ставит те же строки на те же места
+        await _set_status(3, "rejected")
+        client.fail_times = 1
+        with pytest.raises(ConnectionError):
+            await sync.sync_once()
+        assert await sync.sync_once() == 1
+        assert [row[0] for row in client.rows] == ["№", 1, 2, 3]
+        assert client.row(3)[-2] == "Отклонён"
+
+        async with AsyncSessionLocal() as session:
+            cursor = await session.get(SyncCursor, CURSOR_NAME)
+            assert cursor.last_id == 3
+
+    async def run():
+        try:
+            await scenario()
+        finally:
+            await get_engine().dispose()
+
+    asyncio.run(run())
+
+
+@requires_postgres
+def test_concurrent_syncs_do_not_upload_twice():
+    async def scenario():
+        await _reset()
+        async with AsyncSessionLocal() as session:
+            session.add_all([make_summary(order_id) for order_id in range(1, 6)])
+            await session.commit()
+
+        client = MemorySheetClient()
+        first, second = SheetsSync(client), SheetsSync(client)
+        # Второй проход видит чужую аренду отметки и ничего не выгружает
+        counts = await asyncio.gather(first.sync_once(), second.sync_once())
+        assert sorted(counts) == [0, 5]
+        assert client.calls == 1
+
+    async def run():
+        try:
+            await scenario()
+        finally:
+            await get_engine().dispose()
+
+    asyncio.run(run())
+
+
+@requires_postgres
+def test_hung_upload_keeps_the_lease_and_releases_the_connection():
+    class HangingClient(MemorySheetClient):
+        def upsert_rows(self, rows):
+            time.sleep(0.5)
+            super().upsert_rows(rows)
+
+    async def scenario():
+        await _reset()
+        async with AsyncSessionLocal() as session:
+            session.add(make_summary(1))
+            await session.commit()
+
+        sync = SheetsSync(HangingClient(), timeout=0.1)
+        with pytest.raises(asyncio.TimeoutError):
+            await sync.sync_once()
+        # Пока длится запрос к API, соединения в пуле свободны, а отметка не сдвинута
+        assert get_engine().pool.checkedout() == 0
+        assert await SheetsSync(MemorySheetClient()).sync_once() == 0
+        async with AsyncSessionLocal() as session:
+            cursor = await session.get(SyncCursor, CURSOR_NAME)
+            assert cursor.last_updated_at is None and cursor.lease_until is not None
+
+    async def run():
+        try:
+            await scenario()
+        finally:
+            await get_engine().dispose()
+
+    asyncio.run(run())